@@ -0,0 +1,4 @@
+"""
+scripts measuring the performance of parts of the framework; run as modules,
+e.g. python -m benchmarks.rule_scaling
+"""
@@ -0,0 +1,45 @@
+"""
+agent_creation.py : how quickly agents (learners, and colour semantics with their
+loggers) can be constructed, as population/generational simulations create
+thousands of them. Also reports how many logging channels were left registered
+by the agents created (which should not grow with the number of agents). Output
+is CSV on stdout: agent,count,seconds,agents_per_sec,new_channels
+
+e.g. python -m benchmarks.agent_creation -N 10000
+"""
+
+import argparse
+import logging
+import timeit
+
+from knowledge.gauss_colour import GaussianColourSemantics
+from knowledge.logger.colour_logger import ColourLogger
+from learner.basic_learner import NPSymbolLearner
+from learner.noisy_learner import NoisySymbolLearner
+
+
+def colour_agent():
+    """a colour semantics agent, logged as in the simulations"""
+    semantics = GaussianColourSemantics("L_0")
+    return ColourLogger(semantics)
+
+
+AGENTS = [("np_learner", NPSymbolLearner),
+          ("noisy_learner", NoisySymbolLearner),
+          ("colour", colour_agent)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time construction of agents")
+    parser.add_argument('-N', '--count', dest="count", type=int, default=5000)
+    parser.add_argument('-R', '--repeats', dest="repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print "agent,count,seconds,agents_per_sec,new_channels"
+    for (name, create) in AGENTS:
+        channels_before = len(logging.Logger.manager.loggerDict)
+        seconds = min(timeit.repeat(lambda: create(), number=args.count, repeat=args.repeats))
+        new_channels = len(logging.Logger.manager.loggerDict) - channels_before
+
+        print "%s,%d,%.4f,%.0f,%d" % (name, args.count, seconds,
+                                      args.count / seconds, new_channels)
@@ -0,0 +1,42 @@
+"""
+gaussian_scoring.py : time GaussianColourSemantics.word_for against vocabulary size
+(e.g. after many words have been invented), vectorised over the words with the
+model's arrays cached, alongside the word-at-a-time loop it replaced. Output is
+CSV on stdout: words,queries,vectorised_ms,loop_ms
+
+e.g. python -m benchmarks.gaussian_scoring -W 10 100 500
+"""
+
+import argparse
+import random
+import timeit
+
+from knowledge.gauss_colour import GaussianColourSemantics
+from knowledge.colour_batch import colour_expression
+
+
+def random_colour(rand):
+    return tuple(rand.randint(0, 255) for i in range(3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time Gaussian colour word queries")
+    parser.add_argument('-W', '--words', dest="words", type=int, nargs="+",
+                        default=[10, 100, 500])
+    parser.add_argument('-Q', '--queries', dest="queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    print "words,queries,vectorised_ms,loop_ms"
+    for count in args.words:
+        semantics = GaussianColourSemantics("benchmark", creative=False)
+        for i in xrange(count):
+            semantics.invent_word(random_colour(rand))
+        queries = [random_colour(rand) for i in xrange(args.queries)]
+        expressions = [colour_expression(point) for point in queries]
+
+        vectorised = timeit.timeit(lambda: [semantics.word_for(expression)
+                                            for expression in expressions], number=1)
+        loop = timeit.timeit(lambda: [semantics._word_for_point(point) for point in queries],
+                             number=1)
+        print "%d,%d,%.1f,%.1f" % (count, args.queries, 1000 * vectorised, 1000 * loop)
@@ -0,0 +1,53 @@
+"""
+knn_queries.py : time KNNColourSemantics.word_for against the number of points
+learned, as in long train_ab/train_gen runs, alongside the sort-every-point query
+it replaced. Output is CSV on stdout: points,queries,grid_ms,sorted_ms
+
+e.g. python -m benchmarks.knn_queries -N 100 1000 10000 100000
+"""
+
+import argparse
+import random
+import timeit
+from collections import Counter
+from itertools import izip
+
+from knowledge.knn_colour import KNNColourSemantics
+from training.expression import Expression
+
+
+def colour(rand):
+    return Expression(["COLOUR", "r_%d" % rand.randint(0, 255), "g_%d" % rand.randint(0, 255),
+                       "b_%d" % rand.randint(0, 255)])
+
+
+def sorted_word_for(semantics, expression):
+    """word_for by sorting the errors of every point"""
+    given = semantics._unpack_expression(expression)
+    errs = tuple(sum((p - x)**2 for p, x in izip(point, given)) for point in semantics.points)
+    min_errs_args = sorted(range(len(errs)), key=lambda k: errs[k])
+    k_nearest_colours = tuple(semantics.words[point] for point in min_errs_args[:semantics.k])
+    return max(name for name, count in Counter(k_nearest_colours).items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time k-nearest colour word queries")
+    parser.add_argument('-N', '--points', dest="points", type=int, nargs="+",
+                        default=[100, 1000, 10000, 100000])
+    parser.add_argument('-Q', '--queries', dest="queries", type=int, default=1000)
+    parser.add_argument('-k', '--knearest', dest="k", type=int, default=3)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    words = ["w%d" % i for i in range(10)]
+    print "points,queries,grid_ms,sorted_ms"
+    for count in args.points:
+        semantics = KNNColourSemantics("benchmark", k=args.k)
+        for i in xrange(count):
+            semantics.learn(rand.choice(words), colour(rand))
+        queries = [colour(rand) for i in xrange(args.queries)]
+
+        grid = timeit.timeit(lambda: [semantics.word_for(query) for query in queries], number=1)
+        brute = timeit.timeit(lambda: [sorted_word_for(semantics, query) for query in queries],
+                              number=1)
+        print "%d,%d,%.1f,%.1f" % (count, args.queries, 1000 * grid, 1000 * brute)
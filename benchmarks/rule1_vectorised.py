@@ -0,0 +1,73 @@
+"""
+rule1_vectorised.py : rule 1 (and rules 2 & 3's hypothesis reductions) over a
+pair with many hypotheses, testing each hypothesis in turn against working over
+the pool's incidence matrix (NumPy). Output is CSV on stdout:
+hypotheses,loop_ms,vector_ms,build_ms,survivors
+
+e.g. python -m benchmarks.rule1_vectorised -H 10 100 1000 5000
+"""
+
+import argparse
+import random
+import timeit
+
+from learner.basic_learner import NPSymbolLearner
+from learner.symbol_table import FiniteSymbolTable
+from training.hypothesis import Hypothesis, HypothesisPool
+from training.pairs import UtteranceMeaningPair
+from training.symbols import popcount
+
+
+def make_pair(num_hypotheses, num_symbols, rand):
+    """learner with N/P entries for a 3 word utterance, whose pair has many hypotheses"""
+    symbols = ["S%d" % i for i in range(num_symbols)] + ["v%d" % i for i in range(num_symbols)]
+    words = ["w0", "w1", "w2"]
+
+    n = FiniteSymbolTable()
+    p = FiniteSymbolTable()
+    for word in words:
+        n.add(word, {rand.choice(symbols)})
+        p.add(word, set(rand.sample(symbols, len(symbols) // 2)).union(n[word]))
+
+    # every hypothesis has the necessary symbols; about half have only possible ones
+    necessary = [symbol for word in words for symbol in n[word]]
+    pool = HypothesisPool(Hypothesis(necessary + rand.sample(symbols, 4))
+                          for h in range(num_hypotheses))
+    learner = NPSymbolLearner(necessary=n, possible=p)
+    return learner, UtteranceMeaningPair(" ".join(words), pool)
+
+
+def time_rules(learner, pair, vectorise, repeats):
+    learner.vectorise_min_hypotheses = 0 if vectorise else float("inf")
+    everything = (1 << len(pair.pool)) - 1
+
+    def rules():
+        pair.active = everything
+        learner._rule1(pair)
+        learner._rule2(pair)
+        learner._rule3(pair)
+
+    return 1000.0 * min(timeit.repeat(rules, number=1, repeat=repeats))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time rule 1 against number of hypotheses")
+    parser.add_argument('-H', '--hypotheses', dest="hypotheses", type=int, nargs="+",
+                        default=[10, 50, 100, 500, 1000, 5000])
+    parser.add_argument('-S', '--symbols', dest="symbols", type=int, default=40)
+    parser.add_argument('-R', '--repeats', dest="repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    print "hypotheses,loop_ms,vector_ms,build_ms,survivors"
+    for num_hypotheses in args.hypotheses:
+        (learner, pair) = make_pair(num_hypotheses, args.symbols, rand)
+
+        build_ms = 1000.0 * timeit.timeit(pair.pool.incidence, number=1)
+        loop_ms = time_rules(learner, pair, False, args.repeats)
+        loop_survivors = pair.active
+        vector_ms = time_rules(learner, pair, True, args.repeats)
+        assert pair.active == loop_survivors
+
+        print "%d,%.3f,%.3f,%.3f,%d" % (len(pair.pool), loop_ms, vector_ms, build_ms,
+                                        popcount(pair.active))
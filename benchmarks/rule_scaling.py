@@ -0,0 +1,91 @@
+"""
+rule_scaling.py : how NPSymbolLearner rules 3 & 4 scale with utterance length.
+
+Builds one synthetic utterance of L words (each word with a small N/P entry, and a
+handful of hypotheses mentioning every word's symbols), then times rules 3 & 4,
+alongside the pairwise (word x other word) formulation they replaced. Output is
+CSV on stdout: words,rule3_ms,rule4_ms,pairwise3_ms,pairwise4_ms
+
+e.g. python -m benchmarks.rule_scaling -L 10 50 100 200 400
+"""
+
+import argparse
+import random
+import timeit
+
+from learner.basic_learner import NPSymbolLearner
+from learner.symbol_table import FiniteSymbolTable
+from learner.symbol_set import SymbolSet
+from training.hypothesis import Hypothesis
+from training.pairs import UtteranceMeaningPair
+
+
+def make_utterance(length, num_hypotheses, rand):
+    """learner with entries for L words, and an utterance containing all of them"""
+    words = ["w%d" % i for i in range(length)]
+    n = FiniteSymbolTable()
+    p = FiniteSymbolTable()
+    for (i, word) in enumerate(words):
+        n.add(word, {"v%d" % i})
+        p.add(word, {"v%d" % i, "C%d" % i, "C%d" % rand.randrange(length)})
+
+    hypotheses = set()
+    for h in range(num_hypotheses):
+        symbols = ["v%d" % i for i in range(length)] + \
+                  ["C%d" % rand.randrange(length) for i in range(length // 2)]
+        rand.shuffle(symbols)
+        hypotheses.add(Hypothesis(symbols))
+
+    learner = NPSymbolLearner(necessary=n, possible=p)
+    return learner, UtteranceMeaningPair(" ".join(words), hypotheses)
+
+
+def pairwise_rule3(learner, pair):
+    """rule 3 as a test of all word combinations"""
+    common = SymbolSet.from_mask(-1)
+    for hypothesis in pair.hypotheses:
+        common = common.intersection(SymbolSet.from_mask(hypothesis.symbol_mask))
+    for word in pair.words:
+        symbols = common.copy()
+        for other_word in pair.words:
+            if word != other_word:
+                symbols.difference_update(learner.possible[other_word])
+        learner.necessary[word].update(symbols)
+
+
+def pairwise_rule4(learner, pair):
+    """rule 4 as a test of all word combinations"""
+    once = 0
+    for hypothesis in pair.hypotheses:
+        once |= hypothesis.once_mask
+    once_symbols = SymbolSet.from_mask(once)
+    for word in pair.words:
+        for other_word in pair.words:
+            if other_word != word:
+                learner.possible[word].difference_update(
+                    once_symbols.intersection(learner.necessary[other_word]))
+
+
+def time_ms(function, repeats):
+    return 1000.0 * min(timeit.repeat(function, number=1, repeat=repeats))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time rules 3 & 4 against utterance length")
+    parser.add_argument('-L', '--lengths', dest="lengths", type=int, nargs="+",
+                        default=[10, 25, 50, 100, 200, 400])
+    parser.add_argument('-H', '--hypotheses', dest="hypotheses", type=int, default=5)
+    parser.add_argument('-R', '--repeats', dest="repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    print "words,rule3_ms,rule4_ms,pairwise3_ms,pairwise4_ms"
+    for length in args.lengths:
+        (learner, pair) = make_utterance(length, args.hypotheses, rand)
+
+        # rules are idempotent once applied, so repeated timings see the same state
+        times = (time_ms(lambda: learner._rule3(pair), args.repeats),
+                 time_ms(lambda: learner._rule4(pair), args.repeats),
+                 time_ms(lambda: pairwise_rule3(learner, pair), args.repeats),
+                 time_ms(lambda: pairwise_rule4(learner, pair), args.repeats))
+        print "%d,%.3f,%.3f,%.3f,%.3f" % ((length,) + times)
@@ -0,0 +1,73 @@
+"""
+synthetic_training.py : throughput & convergence of a learner trained on a stream
+of synthetic pairs (see training.sample.synthetic), reported at each of a number
+of corpus sizes. A word counts as learned if its N & P entries have converged on
+exactly the symbol of its (single) sense; for the noisy learner, senses are
+counted instead. Output is CSV on stdout:
+pairs,seconds,pairs_per_sec,words_seen,converged,learned
+
+e.g. python -m benchmarks.synthetic_training -N 1000 10000 100000 -V 1000 -L 4
+"""
+
+import argparse
+import time
+
+from learner.basic_learner import NPSymbolLearner
+from learner.noisy_learner import NoisySymbolLearner
+from training.sample.synthetic import SyntheticCorpus
+
+
+def lexicon_progress(learner, corpus):
+    """(words seen, words converged, words learned correctly) of an NPSymbolLearner"""
+    (seen, converged, learned) = (0, 0, 0)
+    for word in corpus.lexicon:
+        if word not in learner:
+            continue
+        seen += 1
+        if learner.converged(word):
+            converged += 1
+            if set(learner.necessary[word]) == corpus.symbols(word):
+                learned += 1
+    return (seen, converged, learned)
+
+
+def sense_progress(learner):
+    """(senses, senses converged, -) of a NoisySymbolLearner"""
+    senses = set()
+    for word_senses in learner.sense_table.table.values():
+        senses.update(word_senses)
+    converged = sum(1 for sense in senses if learner.np_learner.converged(sense))
+    return (len(senses), converged, "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="train a learner on synthetic pairs")
+    parser.add_argument('-N', '--pairs', dest="pairs", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument('-V', '--vocabulary', dest="vocabulary", type=int, default=1000)
+    parser.add_argument('-L', '--length', dest="length", type=int, default=3)
+    parser.add_argument('-H', '--hypotheses', dest="hypotheses", type=int, default=3)
+    parser.add_argument('--noise', dest="noise", type=float, default=0.0)
+    parser.add_argument('--homonymy', dest="homonymy", type=float, default=0.0)
+    parser.add_argument('--seed', dest="seed", type=int, default=0)
+    parser.add_argument('--noisy', dest="noisy", action="store_true",
+                        help="train a NoisySymbolLearner (much slower) instead")
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(args.vocabulary, args.length, args.hypotheses,
+                             args.noise, args.homonymy, args.seed)
+    learner = NoisySymbolLearner() if args.noisy else NPSymbolLearner()
+
+    print "pairs,seconds,pairs_per_sec,words_seen,converged,learned"
+    (processed, seconds) = (0, 0.0)
+    for checkpoint in sorted(args.pairs):
+        pairs = corpus.pairs(checkpoint - processed)
+        start = time.time()
+        for pair in pairs:
+            learner.process(pair)
+        seconds += time.time() - start
+        processed = checkpoint
+
+        progress = sense_progress(learner) if args.noisy else lexicon_progress(learner, corpus)
+        print "%d,%.3f,%.1f,%s,%s,%s" % ((processed, seconds, processed / max(seconds, 1e-9))
+                                         + progress)
@@ -0,0 +1,68 @@
+"""
+colour_batch.py - helpers for the colour semantics' word_for_many: classifying a
+whole batch of colour points at once, with the per-word densities/distances of
+every point computed as NumPy array operations rather than one Expression (and
+one Python-level loop over the words) per point.
+
+NumPy is optional: if it isn't installed, available is False, and word_for_many
+falls back to calling word_for on each point in turn.
+"""
+
+import random
+from itertools import izip
+
+from training.expression import Expression
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+available = numpy is not None
+
+
+def colour_expression(rgb):
+    """The <COLOUR r_X g_Y b_Z> expression for an (r, g, b) point"""
+    return Expression(["COLOUR", "r_%d" % rgb[0], "g_%d" % rgb[1], "b_%d" % rgb[2]])
+
+
+def word_for_each(semantics, points):
+    """words for some points, by querying semantics.word_for with each in turn"""
+    return [semantics.word_for(colour_expression(point)) for point in points]
+
+
+def as_points(points):
+    """an (N, 3) float array of points (from an array, or any sequence of (r, g, b))"""
+    return numpy.asarray(points, dtype=float).reshape(-1, 3)
+
+
+def sample_words(weights, words):
+    """
+    For each row of an (N, W) array of (unnormalised) weights over words, pick a
+    word with probability proportional to its weight, as word_for does: by one
+    random.random() per row (so a seeded run picks the same words either way),
+    and a search of the cumulative sums of the weights. Rows with no weight get
+    "WAT".
+    """
+    draws = [random.random() for i in xrange(len(weights))]
+    if not words:
+        return ["WAT"] * len(draws)
+
+    cumulative = numpy.cumsum(weights, axis=1)
+    thresholds = numpy.array(draws) * cumulative[:, -1]
+    above = cumulative > thresholds[:, None]
+    chosen = above.argmax(axis=1)
+    found = above[numpy.arange(len(chosen)), chosen]
+    return [words[choice] if ok else "WAT" for (choice, ok) in izip(chosen, found)]
+
+
+def sample_log_words(log_weights, words):
+    """
+    sample_words, for weights given as logs (e.g. log densities): each row is
+    shifted by its greatest weight before being exponentiated, so that weights
+    far too small (or large) to represent directly are still sampled in proportion
+    """
+    if not words:
+        return sample_words(log_weights, words)
+    greatest = log_weights.max(axis=1)[:, None]
+    return sample_words(numpy.exp(log_weights - greatest), words)
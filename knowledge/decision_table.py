@@ -0,0 +1,101 @@
+"""
+decision_table.py - a precomputed lookup table from colour to word, for colour
+semantics that have stopped learning (e.g. the teacher in an iterated learning
+simulation). The RGB cube is divided into resolution^3 voxels, and for each the
+table holds the (at most) top most likely words at the voxel's centre, with their
+cumulative probabilities (renormalised over those words), so that a query is one
+array lookup and one random.random(). The table is an approximation: every
+colour in a voxel gets the distribution at its centre, less its unlikeliest words.
+
+Needs NumPy (see knowledge.colour_batch).
+"""
+
+import random
+
+from knowledge.colour_batch import numpy, as_points
+
+
+class DecisionTable:
+    """Quantised colour => word distribution lookup table"""
+
+    # voxels whose distributions are computed at once when building a table
+    build_chunk = 4096
+
+    def __init__(self, word_weights, resolution=32, top=4):
+        """
+        word_weights: function from an (N, 3) array of points to (words, (N, W)
+        array of the weight of each of those W words at each point), e.g. the
+        _word_weights of a colour semantics
+        """
+        if numpy is None:
+            raise ImportError("decision tables need NumPy")
+
+        self.resolution = resolution
+        ids = dict()        # word => word id
+
+        voxels = resolution ** 3
+        self.word_ids = numpy.zeros((voxels, top), dtype=numpy.uint16)
+        self.cumulative = numpy.zeros((voxels, top), dtype=numpy.float32)
+
+        centres = _voxel_centres(resolution)
+        for start in xrange(0, voxels, self.build_chunk):
+            (words, weights) = word_weights(centres[start:start + self.build_chunk])
+            word_ids = numpy.array([ids.setdefault(word, len(ids)) for word in words],
+                                   dtype=numpy.uint16)
+            self._fill(start, word_ids, weights, top)
+
+        self.words = [None] * len(ids)     # word id => word
+        for (word, word_id) in ids.iteritems():
+            self.words[word_id] = word
+
+    def _fill(self, start, word_ids, weights, top):
+        """store the top words & cumulative probabilities for voxels from start"""
+        count = min(top, weights.shape[1])
+        if count == 0:
+            return
+        rows = numpy.arange(len(weights))[:, None]
+        likeliest = numpy.argsort(-weights, axis=1, kind="mergesort")[:, :count]
+        top_weights = weights[rows, likeliest]
+
+        totals = top_weights.sum(axis=1)
+        cumulative = numpy.cumsum(top_weights, axis=1) / numpy.where(totals > 0, totals, 1)[:, None]
+        # (exactly 1 at the end, despite rounding; voxels with no weight at all stay 0)
+        cumulative[:, -1] = totals > 0
+
+        end = start + len(weights)
+        self.word_ids[start:end, :count] = word_ids[likeliest]
+        self.cumulative[start:end, :count] = cumulative
+
+    def voxel(self, point):
+        """index of the voxel containing an (r, g, b) point (clamped to 0..255)"""
+        resolution = self.resolution
+        (r, g, b) = [min(max(int(x), 0), 255) * resolution // 256 for x in point]
+        return (r * resolution + g) * resolution + b
+
+    def word_for(self, point):
+        """A word for an (r, g, b) point, picked from its voxel's distribution"""
+        voxel = self.voxel(point)
+        draw = random.random()
+        for (word_id, cumulative) in zip(self.word_ids[voxel], self.cumulative[voxel]):
+            if cumulative > draw:
+                return self.words[word_id]
+        return "WAT"
+
+    def words_for(self, points):
+        """words for a batch of points (an (N, 3) array, or sequence of (r, g, b))"""
+        points = numpy.clip(as_points(points).astype(int), 0, 255) * self.resolution // 256
+        voxels = (points[:, 0] * self.resolution + points[:, 1]) * self.resolution + points[:, 2]
+
+        draws = numpy.array([random.random() for i in xrange(len(voxels))])
+        above = self.cumulative[voxels] > draws[:, None]
+        chosen = above.argmax(axis=1)
+        found = above[numpy.arange(len(chosen)), chosen]
+        word_ids = self.word_ids[voxels, chosen]
+        return [self.words[word_id] if ok else "WAT" for (word_id, ok) in zip(word_ids, found)]
+
+
+def _voxel_centres(resolution):
+    """(resolution^3, 3) array of the (integer) centres of the voxels, in voxel order"""
+    centres = (numpy.arange(resolution) * 256 + 128) // resolution
+    (r, g, b) = numpy.meshgrid(centres, centres, centres, indexing="ij")
+    return numpy.column_stack((r.ravel(), g.ravel(), b.ravel())).astype(float)
@@ -1,6 +1,8 @@
-from itertools import izip
 from training.expression import Expression
 from knowledge.logger.colour_logger import ColourLogger
+from knowledge import colour_batch
+from knowledge.colour_batch import numpy
+from knowledge.decision_table import DecisionTable
 
 import random
 import math
@@ -16,9 +18,19 @@ class GaussianColourSemantics:
     examples.
     """
 
-    def __init__(self, agent_name, creative=True):
+    # words are scored with variances of at least this: a word learned only from
+    # identical points (with zero variance) is then, in effect, a point mass
+    min_variance = 1e-6
+
+    def __init__(self, agent_name, creative=True, normalised=False):
+        """
+        normalised: whether word densities include their Gaussians' normalising
+        constants (so that broad words are less likely than narrow ones at their
+        means); by default they don't, & each word's density is 1 at its mean
+        """
         self.agent_name = agent_name
         self.creative = creative
+        self.normalised = normalised
 
         self.n = dict()             # word => num training examples
         self.mean = dict()         # word => (m_x, m_y, m_z)
@@ -26,6 +38,9 @@ class GaussianColourSemantics:
 
         self._M2 = dict()   # sum squares diff from current mean
 
+        self.table = None   # DecisionTable, while frozen (see freeze)
+        self._arrays = None # the model as arrays (see _model)
+
     def _unpack_expression(self, expression):
         """Abstract away unpacking of numerical (R,G,B) tuple from expressions of the
         form <COLOUR r_X g_Y b_Z>"""
@@ -40,6 +55,8 @@ class GaussianColourSemantics:
         # http://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Online_algorithm
 
         point = self._unpack_expression(expression)
+        self.table = None   # (no longer frozen)
+        self._arrays = None
 
         if word not in self.mean.keys():
             self.n[word] = 0
@@ -67,6 +84,29 @@ class GaussianColourSemantics:
         for a single colour value, so a random word will be selected. 
         """
         point = self._unpack_expression(expression)
+        if self.table is not None:
+            return self.table.word_for(point)
+        if not colour_batch.available:
+            return self._word_for_point(point)
+
+        # (as word_for_many, for a single point)
+        (vocabulary, means) = self._model()[:2]
+        sq_diff = (numpy.array(point, dtype=float) - means) ** 2
+        if self.creative and (not vocabulary or sq_diff.sum(axis=1).min() > 35000):
+            self.invent_word(point)
+            (vocabulary, means) = self._model()[:2]
+            sq_diff = (numpy.array(point, dtype=float) - means) ** 2
+
+        draw = random.random()
+        if not vocabulary:
+            return "WAT"
+        log_densities = self._log_densities(sq_diff[None, :, :])[0]
+        cumulative = numpy.exp(log_densities - log_densities.max()).cumsum()
+        choice = cumulative.searchsorted(draw * cumulative[-1], side="right")
+        return vocabulary[choice] if choice < len(vocabulary) else "WAT"
+
+    def _word_for_point(self, point):
+        """word_for, one word at a time (without NumPy)"""
         prob_density = dict()
 
         # if there are no nearby prototypes, make up a word
@@ -74,26 +114,109 @@ class GaussianColourSemantics:
                         for word in self.n]
         if self.creative and all(x > 35000 for x in distances):
             self.invent_word(point)
+        vocabulary = sorted(self.n)     # (sampled in this order, as by word_for_many)
 
         # calculate probability density at point for each word
-        for word in self.n:
+        for word in vocabulary:
             mean = self.mean[word]
-            variance = self.variance[word]
+            variance = [max(float(var), self.min_variance) for var in self.variance[word]]
 
             sq_diff = map(lambda x,mu,var: ((x-mu)**2)/var, point, mean, variance)
             prob_density[word] = math.exp(-0.5 * sum(sq_diff))
+            if self.normalised:
+                prob_density[word] /= math.sqrt((2 * math.pi) ** 3 *
+                                                variance[0] * variance[1] * variance[2])
 
         # pick random number 0..sum(densities)
         # build cumulative sum of densities for words until sum > random number
         s = 0
-        random_num = random.random() * sum(prob_density[x] for x in prob_density) 
+        random_num = random.random() * sum(prob_density[x] for x in vocabulary) 
 
-        for word in prob_density:
+        for word in vocabulary:
             s += prob_density[word] 
             if s > random_num:
                 return word
         return "WAT"
 
+    def word_for_many(self, points):
+        """Words for each of a batch of colour points (an (N, 3) array, or sequence
+        of (r, g, b)), scoring every word at once: the same as word_for on each
+        point in turn, inventing words (if creative) where word_for would."""
+        if not colour_batch.available:
+            return colour_batch.word_for_each(self, points)
+        if self.table is not None:
+            return self.table.words_for(points)
+
+        points = colour_batch.as_points(points)
+        words = []
+        start = 0
+        while start < len(points):
+            (vocabulary, means) = self._model()[:2]
+            sq_diff = (points[start:, None, :] - means[None, :, :]) ** 2
+
+            # classify up to the first point with no nearby prototypes (if any)
+            end = len(points)
+            if self.creative:
+                novel = (sq_diff.sum(axis=2) > 35000).all(axis=1)
+                if novel.any():
+                    end = start + novel.argmax()
+
+            if end > start:
+                log_densities = self._log_densities(sq_diff[:end - start])
+                words.extend(colour_batch.sample_log_words(log_densities, vocabulary))
+
+            if end < len(points):
+                self.invent_word(tuple(int(x) for x in points[end]))
+            start = end
+
+        return words
+
+    def _model(self):
+        """
+        (words, in sorted order, then arrays of their means, variances (at least
+        min_variance), inverse variances and log normalisers); kept until a word is
+        learned or invented
+        """
+        if self._arrays is None:
+            vocabulary = sorted(self.n)
+            means = numpy.array([self.mean[word] for word in vocabulary], dtype=float)
+            variances = numpy.array([self.variance[word] for word in vocabulary], dtype=float)
+            (means, variances) = (means.reshape(-1, 3), variances.reshape(-1, 3))
+            variances = numpy.maximum(variances, self.min_variance)
+
+            if self.normalised:
+                log_normalisers = -0.5 * numpy.log(2 * math.pi * variances).sum(axis=1)
+            else:
+                log_normalisers = numpy.zeros(len(vocabulary))
+            self._arrays = (vocabulary, means, variances, 1 / variances, log_normalisers)
+        return self._arrays
+
+    def _log_densities(self, sq_diff):
+        """
+        (N, W) array of the log probability density of each word (in _model order)
+        at N points, given the (N, W, 3) squared differences from their means
+        """
+        (vocabulary, means, variances, inverses, log_normalisers) = self._model()
+        return log_normalisers - 0.5 * (sq_diff * inverses).sum(axis=2)
+
+    def _word_weights(self, points):
+        """(words, (N, W) array of their densities at an (N, 3) array of points, up
+        to a factor for each point)"""
+        (vocabulary, means) = self._model()[:2]
+        log_densities = self._log_densities((points[:, None, :] - means[None, :, :]) ** 2)
+        if not vocabulary:
+            return (vocabulary, log_densities)
+        return (vocabulary, numpy.exp(log_densities - log_densities.max(axis=1)[:, None]))
+
+    def freeze(self, resolution=32, top=4):
+        """
+        Once learning has finished: answer queries from a precomputed table of
+        the (top) likeliest words in each of resolution^3 voxels of colour space
+        (see knowledge.decision_table). Frozen semantics don't invent words;
+        learning anything more unfreezes them.
+        """
+        self.table = DecisionTable(self._word_weights, resolution, top)
+
     def expression_for(self, word):
         """Return a typical colour value (point) belonging to a colour label"""
 
@@ -119,6 +242,7 @@ class GaussianColourSemantics:
         self.n[new_word] = 1
         self.mean[new_word] = point
         self.variance[new_word] = (1600, 1600, 1600) # arbitrary variance
+        self._arrays = None
 
     def say_something(self):
         """Return a random UTM pair"""
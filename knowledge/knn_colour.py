@@ -1,7 +1,10 @@
-from itertools import izip
 from collections import Counter
 from training.expression import Expression
 from knowledge.logger.colour_logger import ColourLogger
+from knowledge.spatial_index import GridIndex
+from knowledge import colour_batch
+from knowledge.colour_batch import numpy
+from knowledge.decision_table import DecisionTable
 
 import random
 
@@ -12,14 +15,28 @@ class KNNColourSemantics:
     subspace of RGB/HSV colour-space.
 
     This is achieved by using a k-Nearest Neighbour classifier on all previously
-    learned points.
+    learned points, which are held in a grid (GridIndex) so that queries only
+    measure the distance to points near the given one.
     """
 
-    def __init__(self, agent_name, k=3):
+    # word_for_many measures the distance to every point at once (as array operations)
+    # with up to this many points; beyond that, querying the grid for each is quicker
+    vectorise_max_points = 16384
+
+    def __init__(self, agent_name, k=3, jitter=0):
+        """
+        jitter: standard deviation of the (Gaussian) noise added to the learned
+        points that expression_for gives (0: give the points exactly)
+        """
         self.agent_name = agent_name
         self.k = k
+        self.jitter = jitter
         self.points = []
         self.words = []
+        self.word_points = dict()   # word => indices of its points
+        self.index = GridIndex()
+        self._arrays = None     # (points, vote ranks, voting words) for word_for_many
+        self.table = None       # DecisionTable, while frozen (see freeze)
 
     def _unpack_expression(self, expression):
         """Abstract away unpacking of numerical (R,G,B) tuple from expressions of the
@@ -33,8 +50,11 @@ class KNNColourSemantics:
 
         # maintain two (ordered) lists of points & colour words
         point = self._unpack_expression(expression)
+        self.table = None   # (no longer frozen)
         self.points.append(point)
         self.words.append(word)
+        self.word_points.setdefault(word, []).append(len(self.points) - 1)
+        self.index.add(point)
 
     def word_for(self, expression):
         """Query to get a word for a certain colour value (point). This may
@@ -43,34 +63,104 @@ class KNNColourSemantics:
         k-nearest neighbour will produce a unique result."""
 
         given = self._unpack_expression(expression)
+        if self.table is not None:
+            return self.table.word_for(given)
 
-        # create tuple of sum of squared errors for each known colour point
-        errs = tuple(sum((p - x)**2 for p,x in izip(point, given)) for point in self.points)
-
-        # errors sorted low->high and the point indicies from errs used here (i.e. argsort)
-        min_errs_args = sorted(range(len(errs)), key=lambda k: errs[k])
+        # indices of the k known colour points with least sum of squared errors
+        # (ties broken by the order they were learned)
+        min_errs_args = self.index.nearest(given, self.k)
+        return self._vote(min_errs_args)
 
+    def _vote(self, min_errs_args):
+        """the word chosen by the points with the given indices"""
         # return colour label with most votes (modal average from k nearest
-        k_nearest_colours = tuple(self.words[point] for point in min_errs_args[:self.k])
+        k_nearest_colours = tuple(self.words[point] for point in min_errs_args)
         colour_counts = Counter(k_nearest_colours)
         most_common = max(name for name, count in colour_counts.items())
 
         return most_common
 
+    def word_for_many(self, points):
+        """Words for each of a batch of colour points (an (N, 3) array, or sequence
+        of (r, g, b)): the same as word_for on each point"""
+        if self.table is not None:
+            return self.table.words_for(points)
+        return self._nearest_words(points)
+
+    def _nearest_words(self, points):
+        """word_for_many from the learned points themselves (even while frozen)"""
+        if not colour_batch.available or not self.points or \
+                len(self.points) > self.vectorise_max_points:
+            return [self._vote(self.index.nearest(tuple(int(x) for x in point), self.k))
+                    for point in points]
+
+        (stored, ranks, voting_words) = self._batch_arrays()
+        queries = colour_batch.as_points(points)
+        count = len(stored)
+        if self.k >= count:
+            # every point votes, wherever the query
+            return [voting_words[ranks.max()]] * len(queries)
+
+        order = numpy.arange(count)
+        stored_squares = (stored ** 2).sum(axis=1)
+        words = []
+        chunk = max(1, 2 ** 20 // count)
+        for start in xrange(0, len(queries), chunk):
+            batch = queries[start:start + chunk]
+            # squared errors (exact, for integer points), made unique as error * count + index
+            # so that the k least are those word_for finds
+            errors = (batch ** 2).sum(axis=1)[:, None] - 2 * batch.dot(stored.T) + stored_squares
+            nearest = numpy.argpartition(errors * count + order, self.k - 1, axis=1)[:, :self.k]
+            words.extend(voting_words[rank] for rank in ranks[nearest].max(axis=1))
+        return words
+
+    def _word_weights(self, points):
+        """(words, (N, W) array: 1 for the word chosen for each of N points, else 0)"""
+        vocabulary = sorted(set(self.words))
+        columns = dict((word, column) for (column, word) in enumerate(vocabulary))
+        weights = numpy.zeros((len(points), len(vocabulary)))
+        for (row, word) in enumerate(self._nearest_words(points)):
+            weights[row, columns[word]] = 1
+        return (vocabulary, weights)
+
+    def freeze(self, resolution=32):
+        """
+        Once learning has finished: answer queries from a precomputed table of
+        the word chosen at the centre of each of resolution^3 voxels of colour
+        space (see knowledge.decision_table). Learning anything more unfreezes.
+        """
+        self.table = DecisionTable(self._word_weights, resolution, top=1)
+
+    def _batch_arrays(self):
+        """
+        (array of the points, array of the rank of each point's word amongst the
+        sorted words, those sorted words); the k nearest points vote for the word
+        of highest rank (see _vote). Rebuilt when points have been learned.
+        """
+        if self._arrays is None or len(self._arrays[0]) != len(self.points):
+            voting_words = sorted(set(self.words))
+            rank_of = dict((word, rank) for (rank, word) in enumerate(voting_words))
+            self._arrays = (numpy.array(self.points, dtype=float).reshape(-1, 3),
+                            numpy.array([rank_of[word] for word in self.words]),
+                            voting_words)
+        return self._arrays
+
     def expression_for(self, word):
-        """Return a typical colour value (point) belonging to a colour label"""
+        """Return a typical colour value (point) belonging to a colour label: one
+        of the points learned for it, chosen at random (plus jitter, if any)"""
 
         # first check colour label exists, otherwise return MISUNDERSTOOD expression
-        if word not in self.words:
+        if word not in self.word_points:
             return Expression("MISUNDERSTOOD")
-        else:
-            # terrible solution! bad Sam!
-            for i in range(50):
-                point = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255) )
-                expression = Expression(["COLOUR", "r_%d" % point[0], "g_%d" % point[1], "b_%d" % point[2]])
-                if self.word_for(expression) is word:
-                    return expression
-            pass
+
+        point = self.points[random.choice(self.word_points[word])]
+        if self.jitter:
+            point = [round(random.gauss(x, self.jitter)) for x in point]
+
+            # makeshift bounds handling: clamp co-ords to 0..255 range
+            point = [min(max(x, 0), 255) for x in point]
+
+        return Expression(["COLOUR", "r_%d" % point[0], "g_%d" % point[1], "b_%d" % point[2]])
 
     def say_something(self):
         """Return a random UTM pair"""
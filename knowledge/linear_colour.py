@@ -1,6 +1,9 @@
 from itertools import izip
 from training.expression import Expression
 from knowledge.logger.colour_logger import ColourLogger
+from knowledge import colour_batch
+from knowledge.colour_batch import numpy
+from knowledge.decision_table import DecisionTable
 
 import random
 import math
@@ -18,10 +21,12 @@ class LinearColourSemantics:
     """
 
     def __init__(self, agent_name):
+        self.agent_name = agent_name
         self.n = dict()             # word => num training examples
         self.mean = dict()         # word => (m_x, m_y, m_z)
+        self.table = None          # DecisionTable, while frozen (see freeze)
 
-        self.log = ColourLogger(agent_name)
+        self.log = ColourLogger(self)
 
     def _unpack_expression(self, expression):
         """Abstract away unpacking of numerical (R,G,B) tuple from expressions of the
@@ -34,6 +39,7 @@ class LinearColourSemantics:
         learning algorithm in the framework)."""
         
         point = self._unpack_expression(expression)
+        self.table = None   # (no longer frozen)
 
         if word not in self.mean.keys():
             self.n[word] = 0
@@ -54,11 +60,14 @@ class LinearColourSemantics:
         for a single colour value, so a random word will be selected. 
         """
         point = self._unpack_expression(expression)
+        if self.table is not None:
+            return self.table.word_for(point)
         distance = dict()
         prob_density = dict()
+        vocabulary = sorted(self.n)     # (sampled in this order, as by word_for_many)
 
         # calculate probability density at point for each word
-        for word in self.n:
+        for word in vocabulary:
             mean = self.mean[word]
 
             dist = map(lambda x,mu: ((x-mu)**2), point, mean )
@@ -66,20 +75,53 @@ class LinearColourSemantics:
 
         norm_const = sum(distance[x] for x in distance)
 
-        for word in distance:
+        for word in vocabulary:
             prob_density[word] = distance[word]/norm_const
 
         # pick random number 0..sum(densities)
         # build cumulative sum of densities for words until sum > random number
         s = 0
-        random_num = random.random() * sum(prob_density[x] for x in prob_density) 
+        random_num = random.random() * sum(prob_density[x] for x in vocabulary) 
 
-        for word in prob_density:
+        for word in vocabulary:
             s += prob_density[word] 
             if s > random_num:
                 return word
         return "WAT"
 
+    def word_for_many(self, points):
+        """Words for each of a batch of colour points (an (N, 3) array, or sequence
+        of (r, g, b)), in one pass over the words. A point exactly on a prototype
+        (where word_for would divide by zero) gets that prototype's word."""
+        if not colour_batch.available:
+            return colour_batch.word_for_each(self, points)
+
+        if self.table is not None:
+            return self.table.words_for(points)
+
+        (vocabulary, weights) = self._word_weights(colour_batch.as_points(points))
+        return colour_batch.sample_words(weights, vocabulary)
+
+    def _word_weights(self, points):
+        """(words, (N, W) array of their probabilities at an (N, 3) array of points)"""
+        vocabulary = sorted(self.n)
+        means = numpy.array([self.mean[word] for word in vocabulary], dtype=float).reshape(-1, 3)
+        sq_dist = ((points[:, None, :] - means[None, :, :]) ** 2).sum(axis=2)
+
+        # inverse squared distances, normalised for each point
+        on_prototype = (sq_dist == 0).any(axis=1)
+        sq_dist[on_prototype] = numpy.where(sq_dist[on_prototype] == 0, 1.0, numpy.inf)
+        inverse = 1 / sq_dist
+        return (vocabulary, inverse / inverse.sum(axis=1)[:, None])
+
+    def freeze(self, resolution=32, top=4):
+        """
+        Once learning has finished: answer queries from a precomputed table of
+        the (top) likeliest words in each of resolution^3 voxels of colour space
+        (see knowledge.decision_table). Learning anything more unfreezes.
+        """
+        self.table = DecisionTable(self._word_weights, resolution, top)
+
     def expression_for(self, word):
         """Return a typical colour value (point) belonging to a colour label"""
 
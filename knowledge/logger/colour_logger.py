@@ -1,5 +1,4 @@
 from utils.logger import Logger
-from training.expression import Expression
 
 class ColourLogger(Logger):
     def __init__(self, learner):
@@ -26,11 +25,8 @@ class ColourLogger(Logger):
 
     def log_points(self, lang_name, test_colours):
         """output words for a set of sample points in self.learner"""
-        for rgb in test_colours:
-            expression = Expression(["COLOUR", "r_%d" % rgb[0],
-                                 "g_%d" % rgb[1],
-                                 "b_%d" % rgb[2] ])
-            self.probe_logger.info("%s,%s" % (lang_name, self.learner.word_for(expression)))
+        for word in self.learner.word_for_many(test_colours):
+            self.probe_logger.info("%s,%s" % (lang_name, word))
     
     def mean(self, lang_name):
         """output mean values for each word the language"""
@@ -0,0 +1,110 @@
+"""
+spatial_index.py - a uniform grid over colour space (or any space of small
+integer-valued points), giving exact k-nearest-neighbour queries without
+measuring the distance to every stored point.
+
+Points are numbered in the order they were added. The grid's cells are cubes of
+side cell_size; a query searches the cells in growing shells around the query's
+cell, and stops once no point outside the searched cells could be nearer than the
+k nearest found so far.
+"""
+
+import heapq
+from itertools import izip, product
+
+
+class GridIndex:
+    """Incrementally built grid of points, for exact k-nearest queries"""
+    # with fewer points than this, measuring every distance is quicker than searching cells
+    brute_force_below = 256
+
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        self.points = []    # index => point
+        self.cells = dict() # cell (tuple of cell coordinates) => indices of its points
+        self.lowest = None  # least & greatest cell coordinates (per dimension) used
+        self.highest = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def add(self, point):
+        """Add a point (a tuple); returns its index"""
+        index = len(self.points)
+        self.points.append(point)
+
+        cell = self._cell(point)
+        self.cells.setdefault(cell, []).append(index)
+        if self.lowest is None:
+            (self.lowest, self.highest) = (cell, cell)
+        else:
+            self.lowest = tuple(map(min, self.lowest, cell))
+            self.highest = tuple(map(max, self.highest, cell))
+        return index
+
+    def nearest(self, point, k):
+        """
+        Indices of the (at most) k points nearest to a point by squared error,
+        nearest first; points at the same distance in the order they were added
+        (i.e. as the first k of every index sorted by (error, index))
+        """
+        if k <= 0 or not self.points:
+            return []
+
+        if len(self.points) < self.brute_force_below:
+            errors = ((sum((p - x) ** 2 for (p, x) in izip(stored, point)), index)
+                      for (index, stored) in enumerate(self.points))
+            return [index for (error, index) in heapq.nsmallest(k, errors)]
+
+        centre = self._cell(point)
+        # searching beyond this many shells would only find cells with no points
+        max_radius = max(max(abs(c - low), abs(c - high))
+                         for (c, low, high) in izip(centre, self.lowest, self.highest))
+
+        heap = []   # the k nearest so far, as (-error, -index): the furthest on top
+        for radius in xrange(max_radius + 1):
+            for cell in self._shell(centre, radius):
+                for index in self.cells.get(cell, ()):
+                    error = sum((p - x) ** 2 for (p, x) in izip(self.points[index], point))
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-error, -index))
+                    elif (-error, -index) > heap[0]:
+                        heapq.heapreplace(heap, (-error, -index))
+
+            # unsearched points are at least as far away as the edge of the searched cells
+            if len(heap) == k and -heap[0][0] < self._clearance(point, centre, radius) ** 2:
+                break
+
+        return [-index for (error, index) in sorted(heap, reverse=True)]
+
+    def _cell(self, point):
+        return tuple(int(x) // self.cell_size for x in point)
+
+    def _shell(self, centre, radius):
+        """generate the cells (within the extent of the grid) at Chebyshev distance radius from a cell"""
+        if radius == 0:
+            yield centre
+            return
+
+        # offsets from centre that stay within the extent of the grid, per dimension
+        lows = [low - c for (c, low) in izip(centre, self.lowest)]
+        highs = [high - c for (c, high) in izip(centre, self.highest)]
+
+        # each cell once: by the first dimension d in which it's radius cells away
+        dimensions = len(centre)
+        for d in xrange(dimensions):
+            for edge in (-radius, radius):
+                if not lows[d] <= edge <= highs[d]:
+                    continue
+                ranges = [xrange(max(-radius + (i < d), lows[i]),
+                                 min(radius - (i < d), highs[i]) + 1)
+                          for i in xrange(dimensions)]
+                ranges[d] = (edge,)
+                for offset in product(*ranges):
+                    yield tuple(c + o for (c, o) in izip(centre, offset))
+
+    def _clearance(self, point, centre, radius):
+        """distance from a point to the nearest face of the cells within radius of centre"""
+        size = self.cell_size
+        return min(min(x - (c - radius) * size, (c + radius + 1) * size - x)
+                   for (x, c) in izip(point, centre))
@@ -0,0 +1,81 @@
+import unittest
+import random
+
+from knowledge import knn_colour, gauss_colour, linear_colour, colour_batch
+from knowledge.colour_batch import colour_expression
+
+
+def random_colours(rand, count):
+    return [tuple(rand.randint(0, 255) for i in range(3)) for j in range(count)]
+
+
+@unittest.skipUnless(colour_batch.available, "needs NumPy")
+class KNNBatch(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(0)
+        self.semantics = knn_colour.KNNColourSemantics("example", k=3)
+        for colour in random_colours(rand, 300) * 2:   # repeated points: tied distances
+            self.semantics.learn(rand.choice(["red", "green", "blue", "black"]),
+                                 colour_expression(colour))
+        self.probes = random_colours(rand, 200)
+
+    def test_same_words(self):
+        expected = [self.semantics.word_for(colour_expression(colour)) for colour in self.probes]
+        self.assertEqual(self.semantics.word_for_many(self.probes), expected)
+
+        # (as an array, and with the grid queried for each point)
+        self.assertEqual(self.semantics.word_for_many(colour_batch.numpy.array(self.probes)),
+                         expected)
+        self.semantics.vectorise_max_points = 0
+        self.assertEqual(self.semantics.word_for_many(self.probes), expected)
+
+    def test_all_vote(self):
+        self.semantics.k = 1000
+        self.assertEqual(set(self.semantics.word_for_many(self.probes)), {"red"})
+
+
+@unittest.skipUnless(colour_batch.available, "needs NumPy")
+class GaussianBatch(unittest.TestCase):
+    def semantics(self):
+        semantics = gauss_colour.GaussianColourSemantics("example")
+        rand = random.Random(1)
+        # few words, in a corner: many probes are far enough away to invent words
+        for word in ["red", "orange", "brown"]:
+            for colour in random_colours(rand, 5):
+                semantics.learn(word, colour_expression([x // 3 for x in colour]))
+        return semantics
+
+    def test_same_words(self):
+        probes = random_colours(random.Random(2), 300)
+
+        one_by_one = self.semantics()
+        random.seed(3)
+        expected = [one_by_one.word_for(colour_expression(colour)) for colour in probes]
+
+        batched = self.semantics()
+        random.seed(3)
+        self.assertEqual(batched.word_for_many(probes), expected)
+        self.assertEqual(batched.mean, one_by_one.mean)
+        self.assertTrue(any(word.startswith("new_") for word in expected))
+
+
+@unittest.skipUnless(colour_batch.available, "needs NumPy")
+class LinearBatch(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(4)
+        self.semantics = linear_colour.LinearColourSemantics("example")
+        for word in ["red", "green", "blue", "black", "white"]:
+            for colour in random_colours(rand, 3):
+                self.semantics.learn(word, colour_expression(colour))
+        self.probes = random_colours(rand, 300)
+
+    def test_same_words(self):
+        random.seed(5)
+        expected = [self.semantics.word_for(colour_expression(colour)) for colour in self.probes]
+        random.seed(5)
+        self.assertEqual(self.semantics.word_for_many(self.probes), expected)
+
+    def test_on_prototype(self):
+        # (where word_for would divide by zero)
+        self.semantics.learn("grey", colour_expression((128, 128, 128)))
+        self.assertEqual(self.semantics.word_for_many([(128, 128, 128)] * 10), ["grey"] * 10)
@@ -51,5 +51,31 @@ class TestAddingExpressions(unittest.TestCase):
 
         self.knowledge.expression_for("red")
 
+class Exemplars(unittest.TestCase):
+    def setUp(self):
+        self.knowledge = knn_colour.KNNColourSemantics("example")
+        self.reds = [(125, 0, 0), (250, 25, 30)]
+        self.knowledge.learn("black", Expression(["COLOUR", "r_0", "g_0", "b_0"]))
+        for (r, g, b) in self.reds:
+            self.knowledge.learn("red", Expression(["COLOUR", "r_%d" % r, "g_%d" % g, "b_%d" % b]))
+
+    def testLearnedPoint(self):
+        self.assertEqual(self.knowledge.word_points, {"black": [0], "red": [1, 2]})
+        for i in range(20):
+            point = self.knowledge._unpack_expression(self.knowledge.expression_for("red"))
+            self.assertIn(point, self.reds)
+
+    def testJitter(self):
+        self.knowledge.jitter = 10
+        for i in range(20):
+            point = self.knowledge._unpack_expression(self.knowledge.expression_for("red"))
+            self.assertTrue(all(0 <= x <= 255 for x in point))
+            self.assertTrue(any(max(abs(x - y) for (x, y) in zip(point, red)) <= 60
+                                for red in self.reds))
+
+    def testMisunderstood(self):
+        self.assertEqual(self.knowledge.expression_for("blue"), Expression("MISUNDERSTOOD"))
+
+
 if __name__ == '__main__':
     unittest.main()
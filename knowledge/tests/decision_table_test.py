@@ -0,0 +1,89 @@
+import unittest
+import random
+from collections import Counter
+
+from knowledge import knn_colour, gauss_colour, linear_colour, colour_batch
+from knowledge.colour_batch import colour_expression
+
+
+def random_colours(rand, count):
+    return [tuple(rand.randint(0, 255) for i in range(3)) for j in range(count)]
+
+
+@unittest.skipUnless(colour_batch.available, "needs NumPy")
+class Frozen(unittest.TestCase):
+    def knn(self):
+        semantics = knn_colour.KNNColourSemantics("example", k=3)
+        rand = random.Random(0)
+        for colour in random_colours(rand, 200):
+            semantics.learn(rand.choice(["red", "green", "blue"]), colour_expression(colour))
+        return semantics
+
+    def test_voxel_centres(self):
+        semantics = self.knn()
+        semantics.freeze(resolution=16)
+        # voxels of 16 points along each axis: centres at 8, 24, ...
+        probes = random_colours(random.Random(1), 200)
+        centres = [tuple(16 * (x // 16) + 8 for x in colour) for colour in probes]
+        (semantics.table, table) = (None, semantics.table)
+        expected = semantics.word_for_many(centres)
+        semantics.table = table
+
+        self.assertEqual(semantics.word_for_many(probes), expected)
+        self.assertEqual([semantics.word_for(colour_expression(colour)) for colour in probes],
+                         expected)
+
+    def test_learn_unfreezes(self):
+        semantics = self.knn()
+        semantics.freeze(resolution=8)
+        self.assertIsNotNone(semantics.table)
+        semantics.learn("white", colour_expression((255, 255, 255)))
+        self.assertIsNone(semantics.table)
+        self.assertEqual(semantics.word_for(colour_expression((255, 255, 255))), "white")
+
+    def test_refreeze(self):
+        # a second freeze is built from the learned points, not the first table
+        semantics = self.knn()
+        semantics.freeze(resolution=16)
+        fine = semantics.table
+        semantics.freeze(resolution=4)
+        semantics.freeze(resolution=16)
+        self.assertEqual(semantics.table.words, fine.words)
+        self.assertTrue((semantics.table.word_ids == fine.word_ids).all())
+
+    def test_linear(self):
+        semantics = linear_colour.LinearColourSemantics("example")
+        for (word, colour) in [("dark", (40, 40, 40)), ("light", (200, 200, 200)),
+                               ("red", (200, 20, 20))]:
+            semantics.learn(word, colour_expression(colour))
+        semantics.freeze(resolution=16, top=2)
+        self.assertEqual(semantics.table.cumulative.shape, (16 ** 3, 2))
+        self.assertEqual(set(semantics.table.words), {"dark", "light", "red"})
+
+        # near a prototype (& at its voxel's centre), its word is by far the likeliest
+        self.assertEqual(Counter(semantics.word_for_many([(40, 40, 40)] * 100)).most_common(1),
+                         [("dark", 100)])
+        self.assertEqual(semantics.word_for(colour_expression((200, 24, 24))), "red")
+
+        semantics.learn("white", colour_expression((255, 255, 255)))
+        self.assertIsNone(semantics.table)
+
+    def test_distribution(self):
+        semantics = gauss_colour.GaussianColourSemantics("example", creative=False)
+        for (word, colour) in [("dark", (40, 40, 40)), ("dark", (60, 60, 60)),
+                               ("light", (200, 200, 200)), ("light", (220, 220, 220))]:
+            semantics.learn(word, colour_expression(colour))
+        semantics.freeze(resolution=32, top=2)
+        self.assertEqual(semantics.table.cumulative.shape, (32 ** 3, 2))
+
+        # at a voxel's centre: the same words, with about the same frequencies, as unfrozen
+        probe = (132, 132, 132)
+        random.seed(0)
+        frozen = Counter(semantics.word_for_many([probe] * 2000))
+        semantics.table = None
+        random.seed(0)
+        unfrozen = Counter(semantics.word_for_many([probe] * 2000))
+
+        self.assertEqual(set(frozen), set(unfrozen))
+        for word in unfrozen:
+            self.assertAlmostEqual(frozen[word] / 2000.0, unfrozen[word] / 2000.0, delta=0.05)
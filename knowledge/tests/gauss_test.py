@@ -1,8 +1,9 @@
 import unittest
+import math
 import utils.logger
 
 from training.expression import Expression
-from knowledge import gauss_colour
+from knowledge import gauss_colour, colour_batch
 
 utils.logger.display_log("langframe.data.ColourLogger")
 
@@ -40,5 +41,55 @@ class Training(unittest.TestCase):
         self.knowledge.learn("mycol", p2)
         self.assertEqual(self.knowledge.variance["mycol"], (144.5,1512.5,18.0))
 
+@unittest.skipUnless(colour_batch.available, "needs NumPy")
+class Scoring(unittest.TestCase):
+    def setUp(self):
+        self.knowledge = gauss_colour.GaussianColourSemantics("example", creative=False)
+        for (word, point) in [("dark", (10, 10, 10)), ("dark", (12, 12, 12)),
+                              ("light", (250, 250, 250)), ("light", (252, 252, 252))]:
+            self.knowledge.learn(word, Expression(["COLOUR", "r_%d" % point[0],
+                                                   "g_%d" % point[1], "b_%d" % point[2]]))
+
+    def testFarPoint(self):
+        # every density underflows (the word-at-a-time loop would give "WAT"),
+        # but scoring in log space still picks the (far) nearer word
+        point = Expression(["COLOUR", "r_120", "g_120", "b_120"])
+        self.assertEqual(self.knowledge._word_for_point((120, 120, 120)), "WAT")
+        self.assertEqual(self.knowledge.word_for(point), "dark")
+
+    def testModelCached(self):
+        model = self.knowledge._model()
+        self.assertIs(self.knowledge._model(), model)
+
+        self.knowledge.learn("red", Expression(["COLOUR", "r_255", "g_0", "b_0"]))
+        self.assertIsNot(self.knowledge._model(), model)
+        self.assertEqual(self.knowledge.word_for(Expression(["COLOUR", "r_255", "g_0", "b_0"])),
+                         "red")
+
+    def testNormalised(self):
+        self.assertEqual(list(self.knowledge._model()[4]), [0, 0])
+
+        normalised = gauss_colour.GaussianColourSemantics("example", creative=False,
+                                                          normalised=True)
+        normalised.learn("dark", Expression(["COLOUR", "r_10", "g_10", "b_10"]))
+        log_normaliser = normalised._model()[4][0]
+        self.assertAlmostEqual(log_normaliser, -1.5 * math.log(2 * math.pi * 5))
+
+    def testZeroVariance(self):
+        # a word learned from identical points scores as a point mass at them,
+        # leaving the other words' scores alone
+        for i in range(3):
+            self.knowledge.learn("black", Expression(["COLOUR", "r_0", "g_0", "b_0"]))
+        self.assertEqual(self.knowledge.variance["black"], (0.0, 0.0, 0.0))
+
+        black = Expression(["COLOUR", "r_0", "g_0", "b_0"])
+        near_light = Expression(["COLOUR", "r_248", "g_248", "b_248"])
+        self.assertEqual(self.knowledge.word_for(black), "black")
+        self.assertEqual(self.knowledge.word_for(near_light), "light")
+        self.assertEqual(self.knowledge.word_for_many([(11, 11, 11), (251, 251, 251)]),
+                         ["dark", "light"])
+        self.assertEqual(self.knowledge._word_for_point((11, 11, 11)), "dark")
+
+
 if __name__ == '__main__':
     unittest.main()
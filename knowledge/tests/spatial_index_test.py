@@ -0,0 +1,65 @@
+import unittest
+import random
+from collections import Counter
+
+from training.expression import Expression
+from knowledge import knn_colour
+from knowledge.spatial_index import GridIndex
+
+
+def sorted_nearest(points, point, k):
+    """the k nearest by sorting every point (as KNNColourSemantics did)"""
+    errs = [sum((p - x) ** 2 for (p, x) in zip(stored, point)) for stored in points]
+    return sorted(range(len(errs)), key=lambda i: errs[i])[:k]
+
+
+class Grid(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(0)
+
+    def random_point(self, low=0, high=255):
+        return tuple(self.random.randint(low, high) for i in range(3))
+
+    def test_exact(self):
+        for brute_force_below in (0, 256):
+            index = GridIndex()
+            index.brute_force_below = brute_force_below
+            points = [self.random_point() for i in range(500)]
+            points += points[:100]  # repeated points: ties are broken by index
+            for point in points:
+                index.add(point)
+
+            for i in range(100):
+                query = self.random_point(-30, 285)
+                for k in (1, 3, 10):
+                    self.assertEqual(index.nearest(query, k), sorted_nearest(points, query, k))
+
+    def test_sparse(self):
+        index = GridIndex()
+        index.brute_force_below = 0
+        self.assertEqual(index.nearest((0, 0, 0), 3), [])
+
+        points = [(255, 255, 255), (0, 0, 0)]
+        for point in points:
+            index.add(point)
+        self.assertEqual(index.nearest((10, 10, 10), 1), [1])
+        self.assertEqual(index.nearest((200, 200, 200), 5), [0, 1])
+
+
+class KNNQueries(unittest.TestCase):
+    def colour(self, point):
+        return Expression(["COLOUR", "r_%d" % point[0], "g_%d" % point[1], "b_%d" % point[2]])
+
+    def test_same_words(self):
+        rand = random.Random(1)
+        words = ["red", "green", "blue", "black", "white"]
+        semantics = knn_colour.KNNColourSemantics("example", k=3)
+        for i in range(400):
+            point = tuple(rand.randint(0, 255) for j in range(3))
+            semantics.learn(rand.choice(words), self.colour(point))
+
+        for i in range(200):
+            point = tuple(rand.randint(0, 255) for j in range(3))
+            nearest = [semantics.words[index] for index in sorted_nearest(semantics.points, point, 3)]
+            expected = max(name for (name, count) in Counter(nearest).items())
+            self.assertEqual(semantics.word_for(self.colour(point)), expected)
@@ -10,20 +10,69 @@ the necessary and the possible. Also contains a lexicon object that manages thes
 and can train on utterance-meaning pairs).
 """
 
-import copy
+import collections
 from learner.logger.np_logger import NPLogger
 from training.expression import BottomExpression
-from symbol_set import SymbolSet
-from symbol_table import FiniteSymbolTable, UniversalSymbolTable
-
-
-class NPSymbolLearner:
-    def __init__(self, necessary=FiniteSymbolTable(), possible=UniversalSymbolTable()):
-        self.necessary = necessary
-        self.possible = possible
-        self.expressions = UniversalSymbolTable()
+from training import incidence
+from training.symbols import popcount
+from symbol_set import SymbolSet, ExpressionSet
+from symbol_table import FiniteSymbolTable, UniversalSymbolTable, UndoJournal
+import snapshot
+
+
+def _count_twice(masks):
+    """
+    Bit-sliced count of how many of the masks have each bit set, saturating at two:
+    returns (bits set in at least one mask, bits set in more than one mask)
+    """
+    at_least_one = 0
+    more_than_one = 0
+    for mask in masks:
+        more_than_one |= at_least_one & mask
+        at_least_one |= mask
+    return (at_least_one, more_than_one)
+
+
+def _lexicon_table(name):
+    """
+    Property for one of the learner's symbol tables: replacing a whole table (e.g.
+    restoring a backup) means the cached status of every entry must be recomputed.
+    """
+    attribute = "_%s" % name
+
+    def get_table(self):
+        return getattr(self, attribute)
+
+    def set_table(self, table):
+        setattr(self, attribute, table)
+        self._reset_status()
+
+    return property(get_table, set_table)
+
+
+class NPSymbolLearner(object):
+    # with fewer active hypotheses than this, testing each in turn is quicker than
+    # setting up array operations over the pool's incidence matrix
+    vectorise_min_hypotheses = 64
+
+    necessary = _lexicon_table("necessary")
+    possible = _lexicon_table("possible")
+    expressions = _lexicon_table("expressions")
+
+    def __init__(self, necessary=None, possible=None):
+        # words whose entries are inconsistent/have converged, kept up to date
+        # incrementally from the tables' dirty entries (see _refresh_status)
+        self._inconsistent = set()
+        self._converged = set()
+
+        # each learner needs its own tables (not a shared default instance)
+        self._necessary = necessary if necessary is not None else FiniteSymbolTable()
+        self._possible = possible if possible is not None else UniversalSymbolTable()
+        self._expressions = UniversalSymbolTable(ExpressionSet)
+        self._reset_status()
 
         self.log = NPLogger()
+        self.journal = None
 
     def __str__(self):
         """String representation of symbol learner state (show N and P tables by word index)"""
@@ -36,25 +85,141 @@ class NPSymbolLearner:
         """Is there an entry in this learner for some word?"""
         return word in self.necessary
 
+    def save(self, path):
+        """Write the lexicon (N, P & expression tables) to a binary snapshot file"""
+        snapshot.save(path, self)
+
+    @classmethod
+    def load(cls, path):
+        """Create a learner with the lexicon from a snapshot file (see save)"""
+        (necessary, possible, expressions) = snapshot.load(path)[:3]
+        learner = cls(necessary=necessary, possible=possible)
+        learner.expressions = expressions
+        return learner
+
     def process(self, pair):
         """Perform one learning iteration, from an utterance -> meaning pair"""
-        self.log.info("[~~>] %s" % pair)
+        self.log.info("[~~>] %s", pair)
         self._rule1(pair)
         self._rule2(pair)
         self._rule3(pair)
         self._rule4(pair)
         self._rule5(pair)
 
+    def train(self, corpus):
+        """
+        Process a whole corpus of utterance-meaning pairs to a fixed point. Pairs are
+        processed in order; whenever processing changes a word's N or P entry, every
+        pair containing that word is queued to be processed again (as it may now be
+        pruned further), until no entry changes. Returns the number of pairs processed.
+        """
+        pairs = list(corpus)
+
+        # inverted index: word => indices of the pairs it appears in
+        pairs_for_word = collections.defaultdict(list)
+        for (index, pair) in enumerate(pairs):
+            for word in pair.words:
+                pairs_for_word[word].append(index)
+
+        worklist = collections.deque(range(len(pairs)))
+        queued = set(worklist)
+        processed = 0
+
+        while worklist:
+            index = worklist.popleft()
+            queued.discard(index)
+            pair = pairs[index]
+
+            words = list(pair.words)
+            before = [self._entry_state(word) for word in words]
+            self.process(pair)
+            processed += 1
+
+            # dirty words: re-queue the pairs they appear in
+            for (word, state) in zip(words, before):
+                if self._entry_state(word) != state:
+                    for dirty_index in pairs_for_word[word]:
+                        if dirty_index not in queued:
+                            queued.add(dirty_index)
+                            worklist.append(dirty_index)
+
+        return processed
+
+    def _entry_state(self, word):
+        """Comparable snapshot of a word's N and P entries (P is None while universal)"""
+        possible = self.possible[word]
+        return (self.necessary[word].mask,
+                None if possible.is_universal() else possible.mask)
+
+    def begin_trial(self):
+        """
+        Start a transaction: every change made to the N/P/expression tables from
+        now on is journalled, so it can be undone with rollback() (or kept with
+        commit()).
+        """
+        self.journal = UndoJournal()
+        self._set_journal(self.journal)
+
+    def rollback(self):
+        """Undo all table changes made since begin_trial()"""
+        self.journal.rollback()
+        self._set_journal(None)
+
+    def commit(self):
+        """Keep all table changes made since begin_trial()"""
+        self._set_journal(None)
+
+    def _set_journal(self, journal):
+        self.journal = journal
+        for table in self._tables():
+            table.journal = journal
+
     def converged(self, word):
         """Have the symbol sets converged on the same symbol sets for an entry?"""
-        return self.necessary[word] == self.possible[word]
+        self._refresh_status()
+        return word in self._converged
 
     def all_consistent(self):
         """Checks all lexical entries for consistency"""
-        for word in self.necessary:
-            if not self.consistent(word):
-                return False 
-        return True
+        self._refresh_status()
+        return not self._inconsistent
+
+    def inconsistent_words(self):
+        """The words whose lexical entries are currently inconsistent"""
+        self._refresh_status()
+        return frozenset(self._inconsistent)
+
+    def _tables(self):
+        return (self._necessary, self._possible, self._expressions)
+
+    def _reset_status(self):
+        """forget all cached entry status: every entry will be rechecked"""
+        self._inconsistent.clear()
+        self._converged.clear()
+        for table in self._tables():
+            table.dirty.update(table.mapping)
+
+    def _refresh_status(self):
+        """
+        Recheck consistency/convergence of only those words whose entries may have
+        changed since the last check (i.e. marked dirty in any of the tables).
+        """
+        dirty = set()
+        for table in self._tables():
+            if table.dirty:
+                dirty.update(table.take_dirty())
+
+        for word in dirty:
+            # all_consistent() is defined over the words with an N entry
+            if word in self._necessary.mapping and not self.consistent(word):
+                self._inconsistent.add(word)
+            else:
+                self._inconsistent.discard(word)
+
+            if self._necessary.peek(word) == self._possible.peek(word):
+                self._converged.add(word)
+            else:
+                self._converged.discard(word)
 
     def consistent(self, word):
         """
@@ -62,20 +227,21 @@ class NPSymbolLearner:
         UTM pair) or homonymy (multiple disparate meanings for the same word)
         """
 
+        # (entries are only peeked at: checking doesn't create or dirty them)
+        possible = self.possible.peek(word)
+
         # universal possible set trivially consistent (non-empty and n is subset)
-        if self.possible[word].is_universal():
+        if possible.is_universal():
             return True
 
         # if conceptual expressions for sense empty => corrupted
         # words with semantically null meaning (e.g. "the") have BottomExpression
-        if (not self.expressions[word].is_universal()) and len(self.expressions[word]) is 0:
+        expressions = self.expressions.peek(word)
+        if (not expressions.is_universal()) and len(expressions) is 0:
             return False
 
         # consistency: necessary is subset of possible
-        for symbol in self.necessary[word]:
-            if symbol not in self.possible[word]:
-                return False
-        return True
+        return self.necessary.peek(word).issubset(possible)
             
 
     def _rule1(self, pair):
@@ -85,40 +251,48 @@ class NPSymbolLearner:
         self.log.rule_debug("", symbol="1")
         self.log.rule_debug(pair, indent=1, symbol="->")
 
-        # create sets p,n as the union of the possible, necessary  sets for each word in the utterance
+        # create bitmasks p,n as the union of the possible, necessary sets for each word in the utterance
         p_universal = False
-        p = set()
-        n = set()
+        p = 0
+        n = 0
         for word in pair.words:
-            if self.possible[word].is_universal():
+            possible = self.possible[word]
+            if possible.is_universal():
                 p_universal = True
 
             # if any possible set for a word is universal, then the union of p's is universal..
             if not p_universal:
-                p = p.union(self.possible[word])
-            n = n.union(self.necessary[word])
+                p |= possible.mask
+            n |= self.necessary[word].mask
 
         def test(hypothesis):
             # remove hypotheses that contain a symbol ruled out for all words
             # NB. if p is universal, this trivally passes
-            if not p_universal and not hypothesis.symbols.issubset(p):
-                debug_msg = "Sym/s Not Poss: %s for %s" % (hypothesis,
-                    hypothesis.symbols.difference(p))
-                self.log.rule_debug(debug_msg, symbol="-", indent=2)
-
+            if not p_universal and hypothesis.symbol_mask & ~p:
+                self.log.rule_debug("Sym/s Not Poss: %s for %s", hypothesis,
+                                    SymbolSet.from_mask(hypothesis.symbol_mask & ~p),
+                                    symbol="-", indent=2)
                 return False
 
             # filter out hypotheses that are missing a necessary symbol for a word
-            if not n.issubset(hypothesis.symbols):
-                debug_msg = "Sym/s in N missing: %s for %s" % (hypothesis,
-                   n.difference(hypothesis.symbols))
-                self.log.rule_debug(debug_msg, symbol="-", indent=2)
-
+            if n & ~hypothesis.symbol_mask:
+                self.log.rule_debug("Sym/s in N missing: %s for %s", hypothesis,
+                                    SymbolSet.from_mask(n & ~hypothesis.symbol_mask),
+                                    symbol="-", indent=2)
                 return False
 
             return True
 
-        pair.hypotheses = {hyp for hyp in pair.hypotheses if test(hyp)}
+        # hypotheses are shared & immutable: just deactivate (in the pair) those that fail;
+        # many at once over the pool's incidence matrix, unless each is to be reported
+        if self._vectorise(pair) and not self.log.debugging():
+            pair.active = pair.pool.incidence().filter(pair.active, None if p_universal else p, n)
+        else:
+            survivors = 0
+            for (index, hypothesis) in pair.indexed_hypotheses():
+                if test(hypothesis):
+                    survivors |= 1 << index
+            pair.active = survivors
         self.log.rule_debug(pair, indent=1, symbol="<-")
 
     def _rule2(self, pair):
@@ -132,13 +306,24 @@ class NPSymbolLearner:
         self.log.rule_debug(self, indent=3)
 
         # find all the symbols in each of the remaining hypotheses...
-        remaining_symbols = set()
-        for hypothesis in pair.hypotheses:
-            remaining_symbols = remaining_symbols.union(hypothesis.symbols)
+        if self._vectorise(pair):
+            remaining_mask = pair.pool.incidence().union(pair.active)
+        else:
+            remaining_mask = 0
+            for hypothesis in pair.hypotheses:
+                remaining_mask |= hypothesis.symbol_mask
+        remaining_symbols = SymbolSet.from_mask(remaining_mask)
 
         # remove from the possible entry for each word, those symbols not in the above set
+        tracer = self.log.tracer
         for word in pair.words:
-            self.possible[word] = self.possible[word].intersection(remaining_symbols)
+            possible = self.possible[word]
+            self.possible[word] = possible.intersection(remaining_symbols)
+
+            if tracer is not None:
+                removed = -1 if possible.is_universal() else possible.mask & ~remaining_mask
+                if removed:
+                    tracer.record(2, word, removed=removed)
 
         self.log.rule_debug("", symbol="<-", indent=2)
         self.log.rule_debug(self,  indent=2)
@@ -150,37 +335,41 @@ class NPSymbolLearner:
         that is in all hypotheses for an utterance, and it is impossible for all words but one => that must be part
         of the definition for that remaining word.
         """
-        
-        # NOTE: could be optimised by breaking loop as symbol set becomes negative/
-        # identity
 
         self.log.rule_debug("", symbol="3", indent=1)
 
         # which symbols are in all remaining hypotheses?
-        if len(pair.hypotheses) > 0:
-            element = pair.hypotheses.pop()
-            pair.hypotheses.add(element)
-            common_symbols = element.symbols
-
-            for expression in pair.hypotheses:
-                common_symbols.intersection_update(expression.symbols)
+        if pair.active:
+            if self._vectorise(pair):
+                common_mask = pair.pool.incidence().intersection(pair.active)
+            else:
+                common_mask = -1    # all bits set; narrowed by each hypothesis
+                for hypothesis in pair.hypotheses:
+                    common_mask &= hypothesis.symbol_mask
+            common_symbols = SymbolSet.from_mask(common_mask)
 
         else: # empty hypothesis set
             return
 
-        self.log.rule_debug("Common: %s" % common_symbols,
-                            symbol="", indent=3)
+        self.log.rule_debug("Common: %s", common_symbols, symbol="", indent=3)
+
+        # rather than test all word combinations (Cartesian product), count how many
+        # words allow (have in P) each symbol: bit-sliced, as the symbols allowed by
+        # at least one word & by more than one word. Linear in utterance length.
+        (allowed_any, allowed_several) = _count_twice(
+            self._possible_mask(word) for word in pair.words)
 
-        # test all word combinations (Cartesian product)
+        tracer = self.log.tracer
         for word in pair.words:
-            symbols = copy.copy(common_symbols)
-            self.log.rule_debug(word, symbol="", indent=2)
+            # symbols allowed by some other word: by several words, or by one that isn't this
+            allowed_by_others = allowed_several | (allowed_any & ~self._possible_mask(word))
+            symbols = SymbolSet.from_mask(common_mask & ~allowed_by_others)
 
-            for other_word in pair.words:
-                if word != other_word:
-                    symbols.difference_update(self.possible[other_word])
-                    self.log.rule_debug("P(%s):\t\t %s" % (other_word, symbols), indent=3)
-            self.necessary[word].update(symbols)
+            self.log.rule_debug("%s:\t\t %s", word, symbols, indent=2)
+            necessary = self.necessary[word]
+            if tracer is not None and symbols.mask & ~necessary.mask:
+                tracer.record(3, word, added=symbols.mask & ~necessary.mask)
+            necessary.update(symbols)
 
         self.log.rule_debug("", symbol="<-", indent=2)
         self.log.rule_debug(self,  indent=2)
@@ -199,30 +388,42 @@ class NPSymbolLearner:
         self.log.rule_debug("", symbol="4", indent=1)
 
         # find symbols that appear only once
-        once_symbols = set()
+        once_mask = 0
         for hypothesis in pair.hypotheses:
-            for symbol in hypothesis.symbols:
-                if hypothesis.symbol_count[symbol] <= 1:
-                    once_symbols.add(symbol)
+            once_mask |= hypothesis.once_mask
+        once_symbols = SymbolSet.from_mask(once_mask)
 
-        self.log.rule_debug("once: %s" % once_symbols,
-                            indent=2)
+        self.log.rule_debug("once: %s", once_symbols, indent=2)
 
-        # remove the appropriate symbols
+        # which of these are claimed (in N) by at least one word, & by more than one
+        (claimed_any, claimed_several) = _count_twice(
+            self.necessary[word].mask & once_mask for word in pair.words)
+
+        # remove the appropriate symbols: those claimed by some other word
+        tracer = self.log.tracer
         for word in pair.words:
-            self.log.rule_debug("%s:\tP:%s" % (word, self.possible[word]),
-                                indent=2)
-            for other_word in pair.words:
-                if other_word != word:
-                    self.log.rule_debug("%s:" % other_word, indent=3)
-                    for symbol in self.necessary[other_word]:
-                        symbols = once_symbols.intersection(self.necessary[other_word])
-                        self.possible[word].difference_update(symbols)
-                        self.log.rule_debug("%s:\tP(%s=%s" % (symbol, word, self.possible[word]),
-                                            indent=4)
+            claimed = self.necessary[word].mask & once_mask
+            claimed_by_others = claimed_several | (claimed_any & ~claimed)
+
+            possible = self.possible[word]
+            if tracer is not None and possible.mask & claimed_by_others:
+                tracer.record(4, word, removed=possible.mask & claimed_by_others)
+
+            possible.difference_update(SymbolSet.from_mask(claimed_by_others))
+            self.log.rule_debug("%s:\tP:%s", word, possible, indent=2)
+
         self.log.rule_debug("", symbol="<-", indent=2)
         self.log.rule_debug(self,  indent=2)
 
+    def _vectorise(self, pair):
+        """should rules work over the pair's hypotheses all at once (incidence matrix)?"""
+        return incidence.available and popcount(pair.active) >= self.vectorise_min_hypotheses
+
+    def _possible_mask(self, word):
+        """bitmask of a word's P entry; all bits set (-1) if it is still universal"""
+        possible = self.possible[word]
+        return -1 if possible.is_universal() else possible.mask
+
     def _rule5(self, pair):
         """
         Generate conceptual expressions if a word in the utterance has converged
@@ -231,35 +432,34 @@ class NPSymbolLearner:
         for word in pair.words:
             # has the word converged?
             if self.converged(word):
-                self.log.rule_debug("convergence: %s" % word, indent=1)
+                self.log.rule_debug("convergence: %s", word, indent=1)
 
                 # empty => BottomExpression
                 #   both N and P empty => semantically null but non-corrupt entry
                 if len(self.necessary[word]) is 0 and len(self.possible[word]) is 0:
                     self.log.rule_debug("empty", indent=2)
-                    self.expressions[word] = SymbolSet({BottomExpression()})
+                    self.expressions[word] = ExpressionSet({BottomExpression()})
 
                 # variables => variables
                 elif self.necessary[word] == self.necessary[word].variables():
-                    self.log.rule_debug("variable: %s" % self.necessary[word],
-                                          indent=2)
-                    self.expressions[word] = self.expressions[word].intersection( self.necessary[word] )
+                    self.log.rule_debug("variable: %s", self.necessary[word], indent=2)
+                    self.expressions[word] = self.expressions[word].intersection( set(self.necessary[word]) )
 
                 # compare constant terms
                 else:
                     valid_subexpressions = set()
                     word_constants = set(symbol for symbol in self.necessary[word] if symbol.isupper())
 
-                    self.log.rule_debug("constants: %s" % word_constants,
-                                                      indent=2)
+                    self.log.rule_debug("constants: %s", word_constants, indent=2)
 
                     for hypothesis in pair.hypotheses:
                        valid_subexpressions = valid_subexpressions.union(
                            hypothesis.subexpressions_for_constants(word_constants) )
 
-                    self.log.rule_debug("compatible exprs:", indent=2)
-                    self.log.rule_debug("\n".join("%s" % str(expr)
-                                                  for expr in valid_subexpressions),
-                                        indent=2)
+                    if self.log.debugging():
+                        self.log.rule_debug("compatible exprs:", indent=2)
+                        self.log.rule_debug("\n".join("%s" % str(expr)
+                                                      for expr in valid_subexpressions),
+                                            indent=2)
 
                     self.expressions[word] = self.expressions[word].intersection(valid_subexpressions)
\ No newline at end of file
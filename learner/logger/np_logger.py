@@ -1,29 +1,42 @@
+import logging
+
 from utils.logger import Logger
 
 class NPLogger(Logger):
     def __init__(self):
         """
-         Underlying channel name is given based on its classname (e.g. NPLogger)
-         and an individual, unique instance name, assigned at runtime. This
-         instance channel is a subchannel of the class channel, so all messages
-         are routed through both channels.
+         Underlying channel name is given based on its classname (e.g. NPLogger).
+         Every instance shares the class channel: a channel per instance would
+         never be released by the logging module, and learners are created by
+         the thousand in population simulations.
         """
-        class_name = self.__class__.__name__
-        instance_name = id(self)
-        full_name = "%s.%s" % (class_name, instance_name)
+        Logger.__init__(self, self.__class__.__name__)
+
+        # structured rule events go to this (e.g. a rule_trace.TraceWriter) if set
+        self.tracer = None
 
-        Logger.__init__(self, full_name)
+    def debugging(self):
+        """Would rule_debug output anything? (check before building costly messages)"""
+        return self.debug_logger.isEnabledFor(logging.INFO)
 
-    def rule_debug(self, debug_string, indent=0, symbol=""):
+    def rule_debug(self, debug_string, *args, **options):
         """
         Format rule flow in a standardised way (symbol display, level of
-        indentation).
+        indentation: indent & symbol options). As with logging, any args are
+        %-formatted into debug_string, and nothing (not even str(debug_string))
+        is formatted unless the debug channel is enabled.
         """
+        if not self.debug_logger.isEnabledFor(logging.INFO):
+            return
+
+        symbol = options.get("symbol", "")
         if symbol:
             symbol = "[%s]" % str(symbol)
-        tabs = "\t" * indent
+        tabs = "\t" * options.get("indent", 0)
 
+        if args:
+            debug_string = debug_string % args
         debug_string = str(debug_string)
         debug_string = debug_string.replace("\n", "\n%s" % tabs, 50)
 
-        self.debug_logger.info("%s %s %s" % (tabs, symbol, debug_string) )
\ No newline at end of file
+        self.debug_logger.info("%s %s %s" % (tabs, symbol, debug_string) )
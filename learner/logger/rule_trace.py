@@ -0,0 +1,124 @@
+"""
+rule_trace.py - structured tracing of the NP learner's rules. Each change a rule
+makes to a lexical entry is a small record (rule number, word, symbols removed,
+symbols added) rather than formatted text, written to a compact binary file.
+
+Tracing is enabled by giving a learner's logger a tracer:
+
+    with TraceWriter("rules.trace") as tracer:
+        learner.log.tracer = tracer
+        learner.train(corpus)
+
+and the file read back as TraceEvents with read_trace("rules.trace").
+
+File format (little-endian): a header of magic "LFRT" and a version byte, then
+a sequence of records, each starting with a one-byte tag:
+    'S' id:uint32 length:uint16 utf-8 bytes     defines a string (word/symbol)
+    'E' rule:uint8 flags:uint8 word:uint32
+        removed:uint16 added:uint16 ids:uint32*  a rule event
+Strings are defined the first time they're used, so traces are self-contained
+(ids aren't the interner's). Flag bit 0 marks an entry that was universal
+before the rule: everything but what remains was removed, so removed is None.
+"""
+
+import collections
+import struct
+
+from training.symbols import interner
+
+MAGIC = "LFRT"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sB")
+_STRING = struct.Struct("<cIH")
+_EVENT = struct.Struct("<cBBIHH")
+
+_FROM_UNIVERSAL = 1
+
+TraceEvent = collections.namedtuple("TraceEvent", "rule word removed added")
+
+
+class TraceWriter:
+    """Writes rule events to a binary trace file (see module docstring)"""
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, VERSION))
+        self.ids = dict()   # string => trace id
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def record(self, rule, word, removed=0, added=0):
+        """
+        Record a rule changing a word's entry. removed/added are symbol bitmasks;
+        removed=-1 means the entry was universal (so "everything else" went).
+        """
+        flags = 0
+        if removed == -1:
+            flags |= _FROM_UNIVERSAL
+            removed = 0
+
+        removed_ids = [self._id_for(symbol) for symbol in interner.symbols_for(removed)]
+        added_ids = [self._id_for(symbol) for symbol in interner.symbols_for(added)]
+        ids = removed_ids + added_ids
+
+        self.file.write(_EVENT.pack("E", rule, flags, self._id_for(word),
+                                    len(removed_ids), len(added_ids)))
+        self.file.write(struct.pack("<%dI" % len(ids), *ids))
+
+    def _id_for(self, string):
+        """trace id of a word/symbol, writing its definition the first time"""
+        try:
+            return self.ids[string]
+        except KeyError:
+            string_id = len(self.ids)
+            self.ids[string] = string_id
+
+            data = str(string).encode("utf-8")
+            self.file.write(_STRING.pack("S", string_id, len(data)))
+            self.file.write(data)
+            return string_id
+
+
+def read_trace(path):
+    """Generate the TraceEvents recorded in a trace file, in order"""
+    with open(path, "rb") as trace_file:
+        data = trace_file.read()
+
+    (magic, version) = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a (version %d) rule trace" % (path, VERSION))
+
+    strings = dict()
+    offset = _HEADER.size
+    while offset < len(data):
+        tag = data[offset]
+        if tag == "S":
+            (tag, string_id, length) = _STRING.unpack_from(data, offset)
+            offset += _STRING.size
+            strings[string_id] = data[offset:offset + length].decode("utf-8")
+            offset += length
+
+        elif tag == "E":
+            (tag, rule, flags, word_id, removed_count, added_count) = \
+                _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            count = removed_count + added_count
+            ids = struct.unpack_from("<%dI" % count, data, offset)
+            offset += 4 * count
+
+            removed = tuple(strings[i] for i in ids[:removed_count])
+            if flags & _FROM_UNIVERSAL:
+                removed = None
+            added = tuple(strings[i] for i in ids[removed_count:])
+            yield TraceEvent(rule, strings[word_id], removed, added)
+
+        else:
+            raise ValueError("corrupt rule trace %s (at byte %d)" % (path, offset))
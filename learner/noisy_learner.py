@@ -10,7 +10,11 @@ import itertools
 import basic_learner
 from training.expression import VariableExpression, BottomExpression
 import training.pairs
-from symbol_set import SymbolSet
+from training.hypothesis import HypothesisPool
+from symbol_set import ExpressionSet
+from sense_search import SenseAssignmentSearch
+import sense_pool
+import snapshot
 
 class ConfidenceTable:
     """Maps a sense symbol to a non-negative integer representing the confidence """
@@ -19,7 +23,7 @@ class ConfidenceTable:
 
     def __getitem__(self, key):
         """override usage of [] for getting an entry; so default is 0, not keyerror"""
-        if key in self.table.keys():
+        if key in self.table:
             return self.table[key]
         else:
             return 0
@@ -57,7 +61,7 @@ class SenseSymbolTable:
     def __contains__(self, word):
         """Does a word have a mapping? WARNING: will return False if it has single sense"""
 
-        return word in self.table.keys()
+        return word in self.table
 
     def add_sense(self, word):
         """ Add a new sense for a word (i.e. automatically increment subscript)"""
@@ -78,7 +82,7 @@ class SenseSymbolTable:
 
     def manual_add(self, word, sense):
         """Usage not recommended! Should really only be used for tests"""
-        if word in self.table.keys():
+        if word in self.table:
             self.table[word].add(sense)
         else:
             self.table[word] = {sense}
@@ -107,10 +111,19 @@ class NoisySymbolLearner:
     symbols -- processes all combinations of sense assignment in NPLearner to determine which would be consistent,
     and if none would be, determine minimal subset of extra sense assignments necessary to make it consistent.
     """
-    def __init__(self, np_learner=basic_learner.NPSymbolLearner()):
-        self.np_learner = np_learner
+    # below this many candidate assignments, starting worker processes costs more than it saves
+    parallel_min_candidates = 16
+
+    def __init__(self, np_learner=None, processes=None):
+        """
+        processes: if > 1, candidate sense assignments are evaluated across a pool of
+        this many worker processes (opt-in; results are identical to serial evaluation)
+        """
+        self.np_learner = np_learner if np_learner is not None else basic_learner.NPSymbolLearner()
         self.sense_table = SenseSymbolTable()
         self.confidence = ConfidenceTable()
+        self.processes = processes
+        self.last_search = None     # SenseAssignmentSearch for the latest utterance (stats)
 
     def __repr__(self):
         """string representation (of internal NPLearner)"""
@@ -120,6 +133,22 @@ class NoisySymbolLearner:
         """is a sense (not word!) contained in this learner?"""
         return sense in self.np_learner
 
+    def save(self, path):
+        """Write the lexicon, sense & confidence tables to a binary snapshot file"""
+        snapshot.save(path, self.np_learner, self.sense_table.table, self.confidence.table)
+
+    @classmethod
+    def load(cls, path, processes=None):
+        """Create a learner with the lexicon, senses & confidences from a snapshot file"""
+        (necessary, possible, expressions, senses, confidence) = snapshot.load(path)
+        np_learner = basic_learner.NPSymbolLearner(necessary=necessary, possible=possible)
+        np_learner.expressions = expressions
+
+        learner = cls(np_learner, processes)
+        learner.sense_table.table = senses
+        learner.confidence.table = confidence
+        return learner
+
     def _backup(self):
         """return a copy of the current NP tables, to be restored if any entries become inconsistent"""
         return (copy.deepcopy(self.np_learner.necessary),
@@ -144,11 +173,11 @@ class NoisySymbolLearner:
             p_var = p_set.pop()
             n_var = n_set.pop()
             if n_var.islower() and p_var.islower() and n_var is p_var:
-                self.np_learner.expressions[sense] = SymbolSet(VariableExpression(n_var))
+                self.np_learner.expressions[sense] = ExpressionSet(VariableExpression(n_var))
 
         # calculate "empty" expressions
         if len(n_set) is 0 and len(p_set) is 0:
-            self.np_learner.expressions[sense] = SymbolSet(BottomExpression())
+            self.np_learner.expressions[sense] = ExpressionSet(BottomExpression())
 
         # sort out sense table
         word = sense[:-2]
@@ -156,26 +185,41 @@ class NoisySymbolLearner:
         if sense_count > 0:
             self.sense_table.manual_add(word, sense)
 
-    def _consider_sense_assignments(self, senses, hypotheses):
+    def _consider_sense_assignments(self, senses, hypotheses, workers=None):
         """
         checks to see which of the possible sense symbol assignments, when processed, will produce
-        consistent lexical entries; returns those which do produce consistent lexical entries
+        consistent lexical entries; returns those which do produce consistent lexical entries.
+        workers: SensePool to evaluate them with, if in parallel (default: one just for this call)
         """
-        # backup the current state of the lexical tables
-        # TODO: optimisation; only backup relevant senses
-
         consistent_senses = list()
 
-        # cartesian product; i.e. all combinations of sense symbols: which are consistent?
-        senses_tuple = tuple( [tuple(senses[k]) for k in senses.keys() ] )
+        # every trial shares one pool of the (immutable) hypotheses; each only
+        # deactivates hypotheses within its own pair
+        if not isinstance(hypotheses, HypothesisPool):
+            hypotheses = HypothesisPool(hypotheses)
+
+        # all combinations of sense symbols (cartesian product): which are consistent?
+        # search prunes the combinations that provably can't be, without processing them
+        self.last_search = SenseAssignmentSearch(self.np_learner, senses, hypotheses)
+
+        if self.processes and self.processes > 1:
+            candidates = list(self.last_search.candidates())
+            if len(candidates) >= self.parallel_min_candidates:
+                if workers is not None:
+                    return self._consider_in_parallel(candidates, hypotheses, workers)
+                with sense_pool.SensePool(self.processes) as workers:
+                    return self._consider_in_parallel(candidates, hypotheses, workers)
+        else:
+            candidates = self.last_search.candidates()
 
-        for sense_assignment in itertools.product(*senses_tuple):
-            (n, p) = self._backup()
+        for sense_assignment in candidates:
+            # journal every change to the lexical tables made by this trial, so only
+            # the touched entries need restoring (rather than copying whole tables)
+            self.np_learner.begin_trial()
 
             # create new utterance-meaning pair using sense symbols instead of words
             new_utterance = " ".join(sense_assignment)
-            hyp_copy = copy.deepcopy(hypotheses)
-            sense_pair = training.pairs.UtteranceMeaningPair(new_utterance, hyp_copy)
+            sense_pair = training.pairs.UtteranceMeaningPair(new_utterance, hypotheses)
 
             # apply NP learner rules 1-4
             self.np_learner.process(sense_pair)
@@ -185,11 +229,31 @@ class NoisySymbolLearner:
                 consistent_senses.append(sense_pair)
 
             # restore the lexical table
-            self._restore(n,p)
+            self.np_learner.rollback()
         return consistent_senses
 
+    def _consider_in_parallel(self, candidates, hypotheses, workers):
+        """
+        as _consider_sense_assignments, but evaluate the candidate sense assignments
+        across a SensePool's worker processes; consistent ones are returned in candidate order
+        """
+        consistent = workers.evaluate(self.np_learner, candidates, hypotheses)
+
+        return [training.pairs.UtteranceMeaningPair(" ".join(sense_assignment), hypotheses)
+                for (sense_assignment, is_consistent) in zip(candidates, consistent)
+                if is_consistent]
+
     def process(self, pair):
         """process an utterance/meaning pair"""
+        if not (self.processes and self.processes > 1):
+            return self._process(pair, None)
+
+        # one pool of workers (started if needed) for every search of this utterance's senses
+        with sense_pool.SensePool(self.processes) as workers:
+            return self._process(pair, workers)
+
+    def _process(self, pair, workers):
+        """process, evaluating sense assignments with a SensePool (or None: serially)"""
 
         # all sense symbols for the words in this utterance
         senses = dict()
@@ -198,7 +262,7 @@ class NoisySymbolLearner:
 
         # returns a list of the sense assignments that would be consistent after
         # processing the utterance
-        consistent_senses = self._consider_sense_assignments(senses, pair.hypotheses)
+        consistent_senses = self._consider_sense_assignments(senses, pair.hypotheses, workers)
 
         # analyse results
         if len(consistent_senses) == 1:
@@ -239,7 +303,8 @@ class NoisySymbolLearner:
                     sense_names[word].add(new_sense)
                     new_sense_names.append(new_sense) # keep track of new senses, in case we want to delete
 
-                consistent_senses = self._consider_sense_assignments(sense_names, pair.hypotheses)
+                consistent_senses = self._consider_sense_assignments(sense_names, pair.hypotheses,
+                                                                     workers)
 
                 # finish if this sense assignment is consistent
                 if len(consistent_senses) > 0:
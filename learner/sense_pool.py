@@ -0,0 +1,153 @@
+"""
+sense_pool.py - evaluates candidate sense assignments for an utterance across a
+pool of worker processes. Each candidate is independent: it is processed
+against the same starting lexicon and only its consistency is needed. So a
+read-only snapshot of the lexical entries for the utterance's senses is sent to
+each worker once per evaluation, batches of candidates are spread over the
+workers, and the results are gathered in submission order so they stay
+deterministic.
+
+Starting (forking) & stopping workers costs far more than evaluating a few
+candidates, so a SensePool's workers are started when first needed and then kept
+for every evaluation until it's closed; a NoisySymbolLearner keeps one for each
+utterance it processes (see NoisySymbolLearner.process).
+"""
+
+import multiprocessing
+
+from learner.basic_learner import NPSymbolLearner
+from learner.symbol_table import FiniteSymbolTable, UniversalSymbolTable
+from training.hypothesis import HypothesisPool
+from training.pairs import UtteranceMeaningPair
+from training.symbols import interner
+
+
+def snapshot(np_learner, senses):
+    """Copy out the N/P/expression entries (where they exist) for some senses"""
+    tables = (np_learner.necessary, np_learner.possible, np_learner.expressions)
+    return tuple(dict((sense, table.mapping[sense])
+                      for sense in senses if sense in table.mapping)
+                 for table in tables)
+
+
+class SensePool(object):
+    """Worker processes (started when first used) evaluating sense assignments"""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.pool = None
+        self.symbol_count = None    # symbols interned when the workers started
+        self.arrived = None         # semaphores for broadcasting to every worker
+        self.released = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """stop the workers (if started); a closed SensePool can't evaluate any more"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def evaluate(self, np_learner, assignments, hypotheses):
+        """
+        For each sense assignment (tuple of senses), would processing it against the
+        learner's current lexicon leave every entry consistent? Returns a list of
+        bools in the same order as assignments.
+        """
+        senses = set()
+        for assignment in assignments:
+            senses.update(assignment)
+
+        # entries for other words aren't touched by processing these senses; so
+        # their consistency is fixed for every assignment
+        if not np_learner.inconsistent_words().issubset(senses):
+            return [False] * len(assignments)
+
+        if self.pool is None:
+            self.symbol_count = len(interner)
+            self.arrived = multiprocessing.Semaphore(0)
+            self.released = multiprocessing.Semaphore(0)
+            self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                             initargs=(interner.symbols[:], self.arrived,
+                                                       self.released))
+
+        # every worker gets the lexicon the assignments are evaluated against (and
+        # any symbols interned since it started) once; batches carry only assignments
+        self._broadcast((interner.symbols[self.symbol_count:], snapshot(np_learner, senses),
+                         list(hypotheses)))
+        chunk_size = max(1, len(assignments) // (self.processes * 4))
+        batches = [assignments[start:start + chunk_size]
+                   for start in xrange(0, len(assignments), chunk_size)]
+
+        consistent = []
+        for results in self.pool.map(_evaluate_batch, batches):
+            consistent.extend(results)
+        return consistent
+
+    def _broadcast(self, state):
+        """send state to every worker (once each), for the batches evaluated next"""
+        tasks = self.pool.map_async(_receive_state, [state] * self.processes, chunksize=1)
+        # a worker holds on to its task until all have arrived, so it can't take two
+        for worker in xrange(self.processes):
+            self.arrived.acquire()
+        for worker in xrange(self.processes):
+            self.released.release()
+        tasks.get()
+
+
+# this worker's semaphores for broadcasts, & the state last broadcast to it:
+# a small learner, holding just the snapshot entries, & the hypotheses
+_arrived = None
+_released = None
+_learner = None
+_hypotheses = None
+
+
+def _init_worker(symbols, arrived, released):
+    """give this worker the same symbol ids as the parent"""
+    global _arrived, _released
+    # (a forked interpreter has them already; a fresh one needs them interning)
+    for symbol in symbols:
+        interner.id_for(symbol)
+    (_arrived, _released) = (arrived, released)
+
+
+def _receive_state(state):
+    """keep a broadcast snapshot of the lexicon to evaluate the next batches against"""
+    global _learner, _hypotheses
+    (new_symbols, entries, hypotheses) = state
+    for symbol in new_symbols:
+        interner.id_for(symbol)
+
+    _learner = NPSymbolLearner(necessary=FiniteSymbolTable(), possible=UniversalSymbolTable())
+    (necessary, possible, expressions) = entries
+    _learner.necessary.mapping.update(necessary)
+    _learner.possible.mapping.update(possible)
+    _learner.expressions.mapping.update(expressions)
+    _hypotheses = HypothesisPool(hypotheses)
+
+    _arrived.release()
+    _released.acquire()
+
+
+def _evaluate_batch(assignments):
+    """evaluate a batch of sense assignments against the last snapshot broadcast"""
+    return [_evaluate_assignment(_learner, _hypotheses, assignment)
+            for assignment in assignments]
+
+
+def _evaluate_assignment(learner, hypotheses, assignment):
+    """process one sense assignment as a trial, and report whether it's consistent"""
+    learner.begin_trial()
+
+    sense_pair = UtteranceMeaningPair(" ".join(assignment), hypotheses)
+    learner.process(sense_pair)
+    consistent = learner.all_consistent()
+
+    learner.rollback()
+    return consistent
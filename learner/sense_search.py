@@ -0,0 +1,107 @@
+"""
+sense_search.py - branch-and-bound search over the sense assignments for an
+utterance. Rather than processing every combination in the Cartesian product of
+each word's senses, senses are assigned word by word, and a partial assignment
+is abandoned (along with every assignment that extends it) as soon as the N/P
+entries of the senses chosen so far show that no completion could be consistent.
+
+Pruning is conservative: every assignment that survives still has to be
+processed to check that it really is consistent, but no consistent assignment is
+ever pruned. Assignments are generated in the same order as itertools.product.
+"""
+
+
+class SenseAssignmentSearch:
+    def __init__(self, np_learner, senses, hypotheses):
+        """senses maps each word in the utterance to the set of its sense symbols"""
+        self.np_learner = np_learner
+        self.words = list(senses.keys())
+        self.senses = [tuple(senses[word]) for word in self.words]
+        self.hypothesis_masks = [hypothesis.symbol_mask for hypothesis in hypotheses]
+
+        self.product_size = 1
+        for word_senses in self.senses:
+            self.product_size *= len(word_senses)
+
+        self.nodes_expanded = 0     # partial (or full) assignments checked
+        self.candidate_count = 0    # full assignments that weren't pruned
+
+    def __repr__(self):
+        return "<%d nodes expanded, %d/%d candidate assignments>" % \
+               (self.nodes_expanded, self.candidate_count, self.product_size)
+
+    def candidates(self):
+        """Generate the (unpruned) full sense assignments, as tuples in word order"""
+        for assignment in self._extend((), 0, self.hypothesis_masks, []):
+            self.candidate_count += 1
+            yield assignment
+
+    def _extend(self, assignment, n_mask, hypothesis_masks, bounds):
+        """
+        depth-first: try each sense of the next word after the given partial
+        assignment. n_mask is the union of the chosen senses' necessary sets,
+        hypothesis_masks the hypotheses still able to survive rule 1, and bounds
+        the (N mask, P mask) entries of the chosen senses.
+        """
+        depth = len(assignment)
+        if depth == len(self.words):
+            yield assignment
+            return
+
+        for sense in self.senses[depth]:
+            self.nodes_expanded += 1
+
+            entry = self._entry(sense)
+            if entry is None:
+                continue
+
+            sense_n_mask = n_mask | entry[0]
+            if sense_n_mask != n_mask:
+                # hypotheses missing a necessary symbol are removed by rule 1
+                sense_hypotheses = [mask for mask in hypothesis_masks
+                                    if not sense_n_mask & ~mask]
+            else:
+                sense_hypotheses = hypothesis_masks
+
+            sense_bounds = bounds + [entry]
+            if self._feasible(sense_hypotheses, sense_bounds):
+                for full_assignment in self._extend(assignment + (sense,), sense_n_mask,
+                                                    sense_hypotheses, sense_bounds):
+                    yield full_assignment
+
+    def _entry(self, sense):
+        """
+        (N mask, P mask or None if universal) for a sense, or None if the entry
+        can never become consistent again. Reads the tables without creating entries.
+        """
+        necessary = self.np_learner.necessary.mapping.get(sense)
+        possible = self.np_learner.possible.mapping.get(sense)
+        expressions = self.np_learner.expressions.mapping.get(sense)
+
+        # expression sets only ever shrink: an empty one stays inconsistent
+        if expressions is not None and not expressions.is_universal() \
+                and len(expressions) == 0:
+            return None
+
+        n_mask = necessary.mask if necessary is not None else 0
+        if possible is None or possible.is_universal():
+            return (n_mask, None)
+        return (n_mask, possible.mask)
+
+    def _feasible(self, hypothesis_masks, bounds):
+        """
+        Processing can only grow N entries and shrink P entries, and rule 2 cuts
+        each P down to the symbols of the surviving hypotheses (a subset of those
+        given here). So if some chosen sense's N isn't within its P restricted to
+        these hypotheses' symbols, no completion of the assignment is consistent.
+        """
+        remaining_mask = 0
+        for mask in hypothesis_masks:
+            remaining_mask |= mask
+
+        for (n_mask, p_mask) in bounds:
+            if p_mask is None:
+                p_mask = remaining_mask
+            if n_mask & ~(p_mask & remaining_mask):
+                return False
+        return True
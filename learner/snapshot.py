@@ -0,0 +1,444 @@
+"""
+snapshot.py - compact, versioned binary snapshots of a learner's lexicon (the N, P
+and conceptual expression tables, and for a NoisySymbolLearner its sense and
+confidence tables), so experiments can warm-start from a trained lexicon rather
+than retraining. A snapshot is either loaded in full (load(), into a learner's
+ordinary, mutable tables), or opened read-only through a memory map (open_mapped()),
+so processes reading the same snapshot share its pages; then only the entries
+looked up are decoded.
+
+Layout (little-endian):
+    header      magic "LFLX", version uint16, flags uint8 (bit 0: sense tables follow)
+    strings     count uint32, symbol count uint32, then each: length uint16, bytes
+    N table     count uint32, then each: word uint32, bitmap
+    P table     universal table uint8, count uint32,
+                then each: word uint32, universal uint8 [, bitmap]
+    expressions count uint32, then each: word uint32, universal uint8
+                [, size uint32, then each: kind uint8 + element]
+    senses      count uint32, then each: word uint32, size uint32, sense uint32*
+    confidence  count uint32, then each: sense uint32, confidence uint32
+
+Words, senses and symbols are all ids into the strings. The first (symbol count)
+strings are the interned symbols with ids 0..n-1 when saved; a bitmap (byte
+count uint32, then the mask as big-endian bytes) is a mask over those ids, so it
+is used as-is whenever the loading process's interner agrees with the file, and
+remapped otherwise. Expression set elements are a symbol (string id), bottom, or
+an expression: length uint32, then int32s in prefix order, where a node with k
+subexpressions is -(k + 1) and a leaf is its name's string id.
+"""
+
+import binascii
+import mmap
+import struct
+
+from training.expression import Expression, RootExpression, ConstantExpression, \
+    VariableExpression, BottomExpression
+from training.symbols import interner
+from symbol_set import SymbolSet, ExpressionSet, UniversalSymbolSet
+from symbol_table import FiniteSymbolTable, UniversalSymbolTable
+
+MAGIC = "LFLX"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHB")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+_HAS_SENSES = 1
+
+# kinds of expression set element
+_SYMBOL = 0
+_BOTTOM = 1
+_EXPRESSION = 2
+
+
+def save(path, np_learner, senses=None, confidence=None):
+    """
+    Write an NPSymbolLearner's tables to a snapshot file; senses (word => set of
+    senses) and confidence (sense => int) are the dicts behind a NoisySymbolLearner's
+    sense and confidence tables, if it's one of those being saved.
+    """
+    necessary = np_learner.necessary.mapping
+    possible = np_learner.possible.mapping
+    expressions = np_learner.expressions.mapping
+
+    # only the symbols up to the highest one used need to be in the dictionary
+    symbol_count = 0
+    for entry in necessary.values() + possible.values():
+        if not entry.is_universal():
+            symbol_count = max(symbol_count, entry.mask.bit_length())
+
+    writer = _Writer(symbol_count)
+
+    writer.u32(len(necessary))
+    for (word, entry) in necessary.iteritems():
+        writer.u32(writer.string_id(word))
+        writer.bitmap(entry.mask)
+
+    writer.u8(isinstance(np_learner.possible, UniversalSymbolTable))
+    writer.u32(len(possible))
+    for (word, entry) in possible.iteritems():
+        writer.u32(writer.string_id(word))
+        writer.u8(entry.is_universal())
+        if not entry.is_universal():
+            writer.bitmap(entry.mask)
+
+    writer.u32(len(expressions))
+    for (word, entry) in expressions.iteritems():
+        writer.u32(writer.string_id(word))
+        writer.u8(entry.is_universal())
+        if not entry.is_universal():
+            writer.u32(len(entry))
+            for element in entry:
+                writer.element(element)
+
+    flags = 0
+    if senses is not None:
+        flags |= _HAS_SENSES
+        writer.u32(len(senses))
+        for (word, word_senses) in senses.iteritems():
+            writer.u32(writer.string_id(word))
+            writer.u32(len(word_senses))
+            for sense in word_senses:
+                writer.u32(writer.string_id(sense))
+
+        writer.u32(len(confidence))
+        for (sense, level) in confidence.iteritems():
+            writer.u32(writer.string_id(sense))
+            writer.u32(level)
+
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(MAGIC, VERSION, flags))
+        snapshot_file.write(_U32.pack(len(writer.strings)))
+        snapshot_file.write(_U32.pack(symbol_count))
+        for string in writer.strings:
+            snapshot_file.write(_U16.pack(len(string)))
+            snapshot_file.write(string)
+        snapshot_file.write("".join(writer.chunks))
+
+
+def load(path):
+    """
+    Read a snapshot file, returning (necessary, possible, expressions, senses,
+    confidence): the three symbol tables, and the sense/confidence dicts (empty
+    if the snapshot wasn't of a NoisySymbolLearner). Raises ValueError if the
+    file isn't a (whole) snapshot.
+    """
+    with open(path, "rb") as snapshot_file:
+        data = snapshot_file.read()
+    try:
+        return _Reader(data, path).read()
+    except struct.error:
+        raise ValueError("%s is a truncated learner snapshot" % path)
+
+
+def open_mapped(path):
+    """
+    Open a snapshot file read-only, through a memory map: returns a MappedSnapshot,
+    whose entries are decoded from the map when they're looked up. Raises
+    ValueError if the file isn't a (whole) snapshot.
+    """
+    with open(path, "rb") as snapshot_file:
+        try:
+            buffer = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # (empty)
+            raise ValueError("%s is not a learner snapshot" % path)
+    try:
+        return MappedSnapshot(buffer, path)
+    except struct.error:
+        buffer.close()
+        raise ValueError("%s is a truncated learner snapshot" % path)
+    except ValueError:
+        buffer.close()
+        raise
+
+
+class MappedSnapshot(object):
+    """
+    A snapshot opened read-only through a memory map (see open_mapped): necessary,
+    possible & expressions are read-only mappings from words to entries, each
+    entry decoded (as a new set, which the caller may change) when it's looked up;
+    senses & confidence are dicts. Close it (or use it in a with statement) when
+    done, to unmap the file.
+    """
+
+    def __init__(self, buffer, path):
+        self.buffer = buffer
+        reader = _Reader(buffer, path)
+        (necessary, self.universal, possible, expressions,
+         self.senses, self.confidence) = reader.index()
+
+        self.necessary = MappedTable(necessary, reader.necessary_entry)
+        self.possible = MappedTable(possible, reader.possible_entry)
+        self.expressions = MappedTable(expressions, reader.expression_entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+
+
+class MappedTable(object):
+    """read-only mapping from words to the entries of one table of a MappedSnapshot"""
+
+    def __init__(self, offsets, decode):
+        self.offsets = offsets  # word => where its entry is in the map
+        self.decode = decode
+
+    def __getitem__(self, word):
+        return self.decode(self.offsets[word])
+
+    def get(self, word, default=None):
+        return self[word] if word in self.offsets else default
+
+    def __contains__(self, word):
+        return word in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class _Writer:
+    """accumulates the body of a snapshot, and the strings it refers to"""
+
+    def __init__(self, symbol_count):
+        self.chunks = []
+        self.strings = []
+        self.ids = dict()   # string => id
+
+        for symbol in interner.symbols[:symbol_count]:
+            self.string_id(symbol)
+
+    def string_id(self, string):
+        try:
+            return self.ids[string]
+        except KeyError:
+            if not isinstance(string, str):
+                raise TypeError("can't snapshot non-string symbol %r" % (string,))
+            self.ids[string] = len(self.strings)
+            self.strings.append(string)
+            return self.ids[string]
+
+    def u8(self, value):
+        self.chunks.append(_U8.pack(value))
+
+    def u32(self, value):
+        self.chunks.append(_U32.pack(value))
+
+    def bitmap(self, mask):
+        data = "%x" % mask
+        data = binascii.unhexlify("0" * (len(data) % 2) + data)
+        self.u32(len(data))
+        self.chunks.append(data)
+
+    def element(self, element):
+        """one element of an expression set"""
+        if isinstance(element, BottomExpression):
+            self.u8(_BOTTOM)
+        elif isinstance(element, (Expression, RootExpression)):
+            stream = []
+            self._flatten(element, stream)
+            self.u8(_EXPRESSION)
+            self.u32(len(stream))
+            self.chunks.append(struct.pack("<%di" % len(stream), *stream))
+        else:
+            self.u8(_SYMBOL)
+            self.u32(self.string_id(element))
+
+    def _flatten(self, expression, stream):
+        """append an expression to stream, in prefix order"""
+        if isinstance(expression, RootExpression):
+            stream.append(self.string_id(expression.name))
+        else:
+            stream.append(-(len(expression.subexpressions) + 1))
+            for subexpression in expression.subexpressions:
+                self._flatten(subexpression, stream)
+
+
+class _Reader:
+    """decodes a snapshot from a buffer (a string of the file's contents, or a map of it)"""
+
+    def __init__(self, buffer, path):
+        self.buffer = buffer
+        self.path = path
+        self.offset = 0
+
+    def read(self):
+        """decode the whole snapshot"""
+        (necessary_offsets, universal, possible_offsets, expression_offsets,
+         senses, confidence) = self.index()
+
+        necessary = FiniteSymbolTable()
+        for (word, offset) in necessary_offsets.iteritems():
+            necessary.mapping[word] = self.necessary_entry(offset)
+
+        possible = UniversalSymbolTable() if universal else FiniteSymbolTable()
+        for (word, offset) in possible_offsets.iteritems():
+            possible.mapping[word] = self.possible_entry(offset)
+
+        expressions = UniversalSymbolTable(ExpressionSet)
+        for (word, offset) in expression_offsets.iteritems():
+            expressions.mapping[word] = self.expression_entry(offset)
+
+        return (necessary, possible, expressions, senses, confidence)
+
+    def index(self):
+        """
+        Read the strings, and find the entries without decoding them: returns
+        (necessary, universal, possible, expressions, senses, confidence), where
+        each table is a dict word => the offset of its entry (None for universal
+        entries), universal is whether P is a universal table, and senses &
+        confidence are decoded dicts.
+        """
+        if len(self.buffer) < _HEADER.size:
+            raise ValueError("%s is not a learner snapshot" % self.path)
+        (magic, version, flags) = self.unpack(_HEADER)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a (version %d) learner snapshot" % (self.path, VERSION))
+
+        string_count = self.u32()
+        symbol_count = self.u32()
+        self.strings = []
+        for i in xrange(string_count):
+            self.strings.append(self.data(self.unpack(_U16)[0]))
+        self._map_symbols(self.strings[:symbol_count])
+
+        necessary = dict()
+        for i in xrange(self.u32()):
+            word = self.strings[self.u32()]
+            necessary[word] = self.offset
+            self.skip(self.u32())
+
+        universal = bool(self.u8())
+        possible = dict()
+        for i in xrange(self.u32()):
+            word = self.strings[self.u32()]
+            if self.u8():
+                possible[word] = None
+            else:
+                possible[word] = self.offset
+                self.skip(self.u32())
+
+        expressions = dict()
+        for i in xrange(self.u32()):
+            word = self.strings[self.u32()]
+            if self.u8():
+                expressions[word] = None
+            else:
+                expressions[word] = self.offset
+                for j in xrange(self.u32()):
+                    self.skip_element()
+
+        senses = dict()
+        confidence = dict()
+        if flags & _HAS_SENSES:
+            for i in xrange(self.u32()):
+                word = self.strings[self.u32()]
+                senses[word] = set(self.strings[self.u32()] for j in xrange(self.u32()))
+            for i in xrange(self.u32()):
+                sense = self.strings[self.u32()]
+                confidence[sense] = self.u32()
+
+        return (necessary, universal, possible, expressions, senses, confidence)
+
+    def necessary_entry(self, offset):
+        self.offset = offset
+        return SymbolSet.from_mask(self.bitmap())
+
+    def possible_entry(self, offset):
+        if offset is None:
+            return UniversalSymbolSet()
+        return self.necessary_entry(offset)
+
+    def expression_entry(self, offset):
+        if offset is None:
+            return UniversalSymbolSet(ExpressionSet)
+        self.offset = offset
+        return ExpressionSet(self.element() for j in xrange(self.u32()))
+
+    def _map_symbols(self, symbols):
+        """
+        Make sure the file's symbols are interned. If the interner agrees with the
+        file (as when saved & loaded by runs over the same data), bitmaps are used
+        as they are; otherwise each file symbol id is mapped to its interner id.
+        """
+        known = interner.symbols
+        if known[:len(symbols)] == symbols[:len(known)]:
+            for symbol in symbols[len(known):]:
+                interner.id_for(symbol)
+            self.symbol_ids = None
+        else:
+            self.symbol_ids = [interner.id_for(symbol) for symbol in symbols]
+
+    def unpack(self, unpacker):
+        values = unpacker.unpack_from(self.buffer, self.offset)
+        self.offset += unpacker.size
+        return values
+
+    def skip(self, length):
+        """move past the next length bytes"""
+        if self.offset + length > len(self.buffer):
+            raise struct.error("unexpected end of data")
+        self.offset += length
+
+    def data(self, length):
+        """the next length bytes"""
+        self.skip(length)
+        return self.buffer[self.offset - length:self.offset]
+
+    def u8(self):
+        return self.unpack(_U8)[0]
+
+    def u32(self):
+        return self.unpack(_U32)[0]
+
+    def bitmap(self):
+        mask = int(binascii.hexlify(self.data(self.u32())), 16)
+
+        if self.symbol_ids is None:
+            return mask
+
+        remapped = 0
+        while mask:
+            low_bit = mask & -mask
+            remapped |= 1 << self.symbol_ids[low_bit.bit_length() - 1]
+            mask ^= low_bit
+        return remapped
+
+    def element(self):
+        """one element of an expression set"""
+        kind = self.u8()
+        if kind == _BOTTOM:
+            return BottomExpression()
+        elif kind == _EXPRESSION:
+            length = self.u32()
+            stream = struct.unpack_from("<%di" % length, self.buffer, self.offset)
+            self.offset += 4 * length
+            return self._unflatten(iter(stream))
+        else:
+            return self.strings[self.u32()]
+
+    def skip_element(self):
+        """move past one element of an expression set"""
+        kind = self.u8()
+        if kind == _EXPRESSION:
+            self.skip(4 * self.u32())
+        elif kind != _BOTTOM:
+            self.u32()
+
+    def _unflatten(self, stream):
+        """rebuild an expression from (an iterator over) its prefix order stream"""
+        token = next(stream)
+        if token >= 0:
+            name = self.strings[token]
+            return ConstantExpression(name) if name.isupper() else VariableExpression(name)
+
+        return Expression([self._unflatten(stream) for i in xrange(-token - 1)])
@@ -1,11 +1,48 @@
-from training.expression import VariableExpression, ConstantExpression
+from training.symbols import interner, popcount
 
 
-class SymbolSet(set):
+class SymbolSet(object):
     """
+    Finite set of symbols, stored as a bitmask over the shared symbol interner
+    (bit i set <=> symbol with id i is a member), so unions/intersections/subset
+    tests are single integer operations. Behaves like a set of the symbols
+    themselves: iterating, membership etc. work in terms of the original strings.
+
     Has slightly different interface for adding element to set (as we want to be able
     to add a string, which is an Iterable, and would otherwise add each character.
+
+    A set held as an entry of a symbol table knows its owner (table, key), and
+    tells the table before it's changed in place (so the change is journalled and
+    the entry's status rechecked, see symbol_table.SymbolTable).
     """
+    __slots__ = ("mask", "owner")
+
+    def __init__(self, symbols=()):
+        self.owner = None
+        if isinstance(symbols, SymbolSet):
+            self.mask = symbols.mask
+        else:
+            self.mask = interner.mask_for(symbols)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Create a symbol set directly from a bitmask of symbol ids"""
+        symbol_set = cls.__new__(cls)
+        symbol_set.mask = mask
+        symbol_set.owner = None
+        return symbol_set
+
+    def __reduce__(self):
+        # (without the owner: a copy belongs to no table)
+        return (_from_mask, (self.mask,))
+
+    def _set_mask(self, mask):
+        """change the set in place, telling its owning table (if any) first"""
+        if mask != self.mask:
+            if self.owner is not None:
+                (table, key) = self.owner
+                table._touch(key)
+            self.mask = mask
 
     def is_universal(self):
         """Finite symbol set cannot be infinite in size"""
@@ -15,24 +52,187 @@ class SymbolSet(set):
         """String representation"""
         return "{ %s }" % ", ".join(repr(symbol) for symbol in self)
 
+    def __repr__(self):
+        return "SymbolSet([%s])" % ", ".join(repr(symbol) for symbol in self)
+
     def variables(self):
         """Return list of variables in this set"""
-        return {symbol for symbol in self
-                if isinstance(symbol, VariableExpression) or symbol.islower()}
+        return SymbolSet.from_mask(self.mask & interner.variable_mask)
 
     def constants(self):
         """Return list of constants in this set"""
-        return {symbol for symbol in self
-                if isinstance(symbol, ConstantExpression) or symbol.isupper()}
+        return SymbolSet.from_mask(self.mask & interner.constant_mask)
+
+    # --- set interface, in terms of the underlying bitmask ---
+
+    def __iter__(self):
+        return interner.symbols_for(self.mask)
+
+    def __len__(self):
+        return popcount(self.mask)
+
+    def __nonzero__(self):
+        return self.mask != 0
+    __bool__ = __nonzero__
+
+    def __contains__(self, symbol):
+        symbol_id = interner.ids.get(symbol)
+        return symbol_id is not None and (self.mask >> symbol_id) & 1 == 1
+
+    def __eq__(self, other):
+        if isinstance(other, SymbolSet):
+            return self.mask == other.mask
+        elif isinstance(other, (set, frozenset)):
+            return len(other) == len(self) and all(symbol in self for symbol in other)
+        elif isinstance(other, UniversalSymbolSet):
+            return False
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __copy__(self):
+        return SymbolSet.from_mask(self.mask)
+
+    def __deepcopy__(self, memo):
+        # the mask is an immutable int; symbols themselves live in the interner
+        return SymbolSet.from_mask(self.mask)
+
+    def copy(self):
+        return SymbolSet.from_mask(self.mask)
+
+    def union(self, *others):
+        mask = self.mask
+        for other in others:
+            if isinstance(other, UniversalSymbolSet):
+                return other
+            mask |= _mask(other, add=True)
+        return SymbolSet.from_mask(mask)
+
+    def intersection(self, *others):
+        mask = self.mask
+        for other in others:
+            if not isinstance(other, UniversalSymbolSet):
+                mask &= _mask(other)
+        return SymbolSet.from_mask(mask)
+
+    def difference(self, *others):
+        mask = self.mask
+        for other in others:
+            if isinstance(other, UniversalSymbolSet):
+                return SymbolSet()
+            mask &= ~_mask(other)
+        return SymbolSet.from_mask(mask)
+
+    def issubset(self, other):
+        if isinstance(other, UniversalSymbolSet):
+            return True
+        return self.mask & ~_mask(other) == 0
+
+    def issuperset(self, other):
+        if isinstance(other, SymbolSet):
+            return other.mask & ~self.mask == 0
+        return all(symbol in self for symbol in other)
+
+    def isdisjoint(self, other):
+        return self.mask & _mask(other) == 0
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __le__ = issubset
+    __ge__ = issuperset
+
+    def add(self, symbol):
+        self._set_mask(self.mask | interner.bit_for(symbol))
+
+    def discard(self, symbol):
+        symbol_id = interner.ids.get(symbol)
+        if symbol_id is not None:
+            self._set_mask(self.mask & ~(1 << symbol_id))
+
+    def remove(self, symbol):
+        if symbol not in self:
+            raise KeyError(symbol)
+        self.discard(symbol)
+
+    def pop(self):
+        if not self.mask:
+            raise KeyError("pop from an empty set")
+        low_bit = self.mask & -self.mask
+        self._set_mask(self.mask ^ low_bit)
+        return interner.symbols[low_bit.bit_length() - 1]
+
+    def clear(self):
+        self._set_mask(0)
+
+    def update(self, *others):
+        mask = self.mask
+        for other in others:
+            mask |= _mask(other, add=True)
+        self._set_mask(mask)
+
+    def intersection_update(self, *others):
+        self._set_mask(self.intersection(*others).mask)
+
+    def difference_update(self, *others):
+        self._set_mask(self.difference(*others).mask)
+
+
+def _from_mask(mask):
+    """(for unpickling)"""
+    return SymbolSet.from_mask(mask)
+
+
+def _mask(symbols, add=False):
+    """
+    Bitmask for any iterable of symbols. Symbols that have never been interned
+    can't be members of any SymbolSet, so unless we're adding them they are
+    simply ignored (rather than growing the interner).
+    """
+    if isinstance(symbols, SymbolSet):
+        return symbols.mask
+    if add:
+        return interner.mask_for(symbols)
+
+    mask = 0
+    ids = interner.ids
+    for symbol in symbols:
+        symbol_id = ids.get(symbol)
+        if symbol_id is not None:
+            mask |= 1 << symbol_id
+    return mask
+
+
+class ExpressionSet(set):
+    """
+    Finite set of conceptual expressions (as stored in the learner's expression
+    table). Expressions aren't atomic symbols, so they're kept in an ordinary set
+    rather than being interned into a bitmask.
+    """
+
+    def is_universal(self):
+        """Finite expression set cannot be infinite in size"""
+        return False
+
+    def __str__(self):
+        """String representation"""
+        return "{ %s }" % ", ".join(repr(expression) for expression in self)
 
 
 class UniversalSymbolSet:
     """
     This is like a typical set, but is initialised as universal... which is
     just a "token" state, until it is intersected with a finite set, returning
-    that finite set.
+    that finite set (as finite_type, e.g. SymbolSet or ExpressionSet).
     """
 
+    def __init__(self, finite_type=SymbolSet):
+        self.finite_type = finite_type
+
     def is_universal(self):
         return True
 
@@ -50,6 +250,5 @@ class UniversalSymbolSet:
         return
 
     def intersection(self, other_set):
-        """Return other_set as finite SymbolSet"""
-        finite_set = SymbolSet()
-        return finite_set.union(other_set)
\ No newline at end of file
+        """Return other_set as finite set"""
+        return self.finite_type(other_set)
@@ -3,11 +3,85 @@ from abc import ABCMeta, abstractmethod
 from training.expression import VariableExpression, ConstantExpression
 
 
+# marks a journalled entry that didn't exist before the trial began
+_MISSING = object()
+
+
+class UndoJournal:
+    """
+    Records the state of every symbol table entry as it is first touched during a
+    trial, so that all changes made in the trial can be undone; undoing costs
+    O(entries touched), rather than copying whole tables up front.
+    """
+    def __init__(self):
+        self.entries = []       # (table, key, entry object, entry's bitmask)
+        self.recorded = set()   # (table id, key) pairs already in entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def record(self, table, key):
+        """remember an entry's current state (first time it's touched only)"""
+        marker = (id(table), key)
+        if marker in self.recorded:
+            return
+        self.recorded.add(marker)
+
+        # finite symbol sets are changed in place, so keep their mask too;
+        # other entries (universal/expression sets) are only ever replaced
+        entry = table.mapping.get(key, _MISSING)
+        self.entries.append((table, key, entry, getattr(entry, "mask", None)))
+
+    def rollback(self):
+        """restore every recorded entry to its state before the trial"""
+        for (table, key, entry, mask) in reversed(self.entries):
+            if entry is _MISSING:
+                table.mapping.pop(key, None)
+            else:
+                if mask is not None:
+                    entry.mask = mask
+                table.mapping[key] = entry
+            table.dirty.add(key)
+
+        self.entries = []
+        self.recorded = set()
+
+
 class SymbolTable:
+    """
+    Mapping from words to symbol sets, which keeps track of the entries that may
+    have changed (for incremental status checks) and journals them during trials.
+
+    Entries are tracked when they change: when set or added to through the table,
+    or (finite SymbolSets, which are changed in place) by the entry itself, which
+    knows the table & key it's held under once the table has handed it out. So a
+    reference to an entry may be kept across status checks and trials. (Other
+    entries, i.e. universal & expression sets, are only ever replaced.)
+    """
     __metaclass__ = ABCMeta
 
     def __init__(self):
         self.mapping = dict()
+        self.journal = None     # UndoJournal, while a trial is in progress
+        self.dirty = set()      # keys whose entries may have changed since last checked
+
+    def _touch(self, key):
+        """An entry may be about to change: journal its current state & mark it dirty"""
+        if self.journal is not None:
+            self.journal.record(self, key)
+        self.dirty.add(key)
+
+    def _adopt(self, key, entry):
+        """make an entry (about to be handed out or stored) report its changes to this table"""
+        if isinstance(entry, SymbolSet):
+            entry.owner = (self, key)
+        return entry
+
+    def take_dirty(self):
+        """Return (and reset) the set of keys whose entries may have changed"""
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
 
     def __iter__(self):
         """iterate through all symbols, i.e. all keys in internal dict"""
@@ -15,7 +89,8 @@ class SymbolTable:
 
     def __setitem__(self, key, value):
         """override usage of [] operator for setting a set for a word"""
-        self.mapping[key] = value
+        self._touch(key)
+        self.mapping[key] = self._adopt(key, value)
 
     @abstractmethod
     def __contains__(self, item):
@@ -30,6 +105,11 @@ class SymbolTable:
     def add(self, word, symbols):
         pass
 
+    @abstractmethod
+    def peek(self, key):
+        """get the entry for a key without creating it or marking it dirty"""
+        pass
+
 class FiniteSymbolTable(SymbolTable):
     def add(self, word, symbols):
         """add a word and symbol string/set of symbol strings to the table"""
@@ -39,11 +119,12 @@ class FiniteSymbolTable(SymbolTable):
             else:
                 symbols = VariableExpression(symbols)
 
+        self._touch(word)
+
         try:
-            self.mapping[word] = self.mapping[word].union(symbols)
+            self.mapping[word] = self._adopt(word, self.mapping[word].union(symbols))
         except KeyError:  # no entry exists for word: create one
-            self.mapping[word] = SymbolSet()
-            self.mapping[word] = self.mapping[word].union(symbols)
+            self.mapping[word] = self._adopt(word, SymbolSet().union(symbols))
 
     def __str__(self):
         """String representation"""
@@ -52,27 +133,41 @@ class FiniteSymbolTable(SymbolTable):
                                         for word in self.mapping]  )
 
     def __contains__ (self, element):
-        return element in self.mapping.keys()
+        return element in self.mapping
+
+    def peek(self, key):
+        entry = self.mapping.get(key)
+        return entry if entry is not None else SymbolSet()
 
     def __getitem__(self, key):
         """override usage of [] operator for getting a set for a word"""
-        if key in self.mapping.keys():
-            return self.mapping[key]
+        # (the entry reports any changes made to it in place, see SymbolTable)
+        if key in self.mapping:
+            return self._adopt(key, self.mapping[key])
         else:
-            self.mapping[key] = SymbolSet()
+            self._touch(key)
+            self.mapping[key] = self._adopt(key, SymbolSet())
             return self.mapping[key]
 
 
 class UniversalSymbolTable(SymbolTable):
-    """Symbol table with UniversalSymbolSet as a default for a new entry"""
+    """
+    Symbol table with UniversalSymbolSet as a default for a new entry; once an entry
+    is intersected with something finite it becomes a finite_type set.
+    """
+    def __init__(self, finite_type=SymbolSet):
+        SymbolTable.__init__(self)
+        self.finite_type = finite_type
+
     def add(self, word, symbols):
         # if given symbol is single string, add to singleton set otherwise
         # it would add each individual letter as a symbol
+        self._touch(word)
 
         try:
-            self.mapping[word].add(symbols)
+            self._adopt(word, self.mapping[word]).add(symbols)
         except KeyError:
-            self.mapping[word] = UniversalSymbolSet()
+            self.mapping[word] = UniversalSymbolSet(self.finite_type)
 
     def __repr__(self):
         return "UNIVERSAL"
@@ -81,10 +176,16 @@ class UniversalSymbolTable(SymbolTable):
         """Universal symbol table would trivially have any key"""
         return True
 
+    def peek(self, key):
+        entry = self.mapping.get(key)
+        return entry if entry is not None else UniversalSymbolSet(self.finite_type)
+
     def __getitem__(self, key):
         """override usage of [] operator for getting a set for a word"""
-        if key in self.mapping.keys():
-            return self.mapping[key]
+        # (the entry reports any changes made to it in place, see SymbolTable)
+        if key in self.mapping:
+            return self._adopt(key, self.mapping[key])
         else:
-            self.mapping[key] = UniversalSymbolSet()
+            self._touch(key)
+            self.mapping[key] = self._adopt(key, UniversalSymbolSet(self.finite_type))
             return self.mapping[key]
\ No newline at end of file
@@ -1,5 +1,10 @@
 import unittest
-from training.expression import Expression, BottomExpression
+import random
+import logging
+import os
+import tempfile
+from training.expression import Expression, BottomExpression, ConstantExpression, \
+    VariableExpression
 from training.hypothesis import Hypothesis
 
 import training.pairs
@@ -7,6 +12,8 @@ import training.sample.siskind_basic
 import utils.logger
 
 from learner import basic_learner, symbol_set
+from learner.logger import rule_trace
+from training import incidence
 
 # logging configuration (display all from "langframe.np_learner")
 utils.logger.display_log("langframe.root.NPLogger", "langframe.debug.NPLogger")
@@ -112,6 +119,56 @@ class SymbolTable(unittest.TestCase):
         self.assertIn("john", variables)
         self.assertIn("ball", variables)
 
+class BitmaskSymbolSet(unittest.TestCase):
+    def testSetOperations(self):
+        a = symbol_set.SymbolSet({"CAUSE", "john", "GO"})
+        b = symbol_set.SymbolSet({"GO", "ball"})
+
+        self.assertEqual(a.union(b), {"CAUSE", "john", "GO", "ball"})
+        self.assertEqual(a.intersection(b), {"GO"})
+        self.assertEqual(a.difference(b), {"CAUSE", "john"})
+        self.assertTrue(a.intersection(b).issubset(a))
+        self.assertFalse(a.issubset(b))
+        self.assertEqual(len(a), 3)
+
+    def testInPlaceOperations(self):
+        a = symbol_set.SymbolSet({"CAUSE", "john"})
+        a.update({"GO"})
+        a.difference_update({"john", "never_interned"})
+        self.assertEqual(a, {"CAUSE", "GO"})
+        self.assertNotIn("never_interned", a)
+
+    def testMaskView(self):
+        """the string-set interface is a view over the bitmask"""
+        a = symbol_set.SymbolSet({"CAUSE", "john"})
+        b = symbol_set.SymbolSet.from_mask(a.mask)
+        self.assertEqual(set(b), {"CAUSE", "john"})
+
+        b.add("ball")
+        self.assertNotEqual(a, b)
+        self.assertEqual(b.mask & a.mask, a.mask)
+
+    def testConstantsVariables(self):
+        a = symbol_set.SymbolSet({"CAUSE", "john", "GO", "ball"})
+        self.assertEqual(a.constants(), {"CAUSE", "GO"})
+        self.assertEqual(a.variables(), {"john", "ball"})
+
+    def testExpressionMembers(self):
+        """constant/variable expressions are classified too (& interned as their names)"""
+        a = symbol_set.SymbolSet({ConstantExpression("EXPRESSION_MEMBER_TEST"),
+                                  VariableExpression("expression_member_test")})
+        self.assertEqual(a.constants(), {"EXPRESSION_MEMBER_TEST"})
+        self.assertEqual(a.variables(), {"expression_member_test"})
+        self.assertTrue(all(isinstance(symbol, str) for symbol in a))
+        self.assertIn(VariableExpression("expression_member_test"), a)
+
+    def testUniversalIntersection(self):
+        universal = symbol_set.UniversalSymbolSet()
+        finite = symbol_set.SymbolSet({"A", "b"})
+        self.assertEqual(universal.intersection(finite), finite)
+        self.assertIsNot(universal.intersection(finite), finite)
+        self.assertTrue(finite.issubset(universal))
+
 class NPTables(unittest.TestCase):
     """ Siskind 1996, p57 example """
 
@@ -145,6 +202,19 @@ class NPTables(unittest.TestCase):
         self.assertNotIn(training.sample.siskind_basic.hyp2, self.pair.hypotheses)
         self.assertNotIn(training.sample.siskind_basic.hyp3, self.pair.hypotheses)
 
+    def test_rule1_shared_pool(self):
+        self.IndividualSetUp()
+        other_pair = self.pair.with_utterance("john took a ball")
+        symbols = training.sample.siskind_basic.hyp2.symbols
+
+        self.learner._rule1(self.pair)
+
+        # only this pair's view of the (shared, unchanged) hypotheses is narrowed
+        self.assertIs(other_pair.pool, self.pair.pool)
+        self.assertEqual(len(other_pair.hypotheses), 3)
+        self.assertEqual(self.pair.hypotheses, {training.sample.siskind_basic.hyp1})
+        self.assertIs(training.sample.siskind_basic.hyp2.symbols, symbols)
+
     def test_rule2(self):
         self.IndividualSetUp()
 
@@ -185,6 +255,93 @@ class NPTables(unittest.TestCase):
         self.assertNotIn("ball", self.learner.possible["john"])
 
 
+class LinearRules(unittest.TestCase):
+    """rules 3 & 4 (aggregate-based) agree with the pairwise definitions"""
+
+    def setUp(self):
+        self.random = random.Random(4)
+        self.symbols = ["S%d" % i for i in range(12)] + ["s%d" % i for i in range(12)]
+
+        self.words = ["w%d" % i for i in range(15)]
+        n = basic_learner.FiniteSymbolTable()
+        p = basic_learner.FiniteSymbolTable()
+        for word in self.words:
+            possible = set(self.random.sample(self.symbols, 6))
+            n.add(word, set(self.random.sample(sorted(possible), 2)))
+            p.add(word, possible)
+        self.learner = basic_learner.NPSymbolLearner(necessary=n, possible=p)
+
+        self.pair = training.pairs.UtteranceMeaningPair(" ".join(self.words),
+            {Hypothesis(self.random.sample(self.symbols, 18)) for i in range(3)})
+
+    def testRule3(self):
+        common = set.intersection(*[set(h.symbols) for h in self.pair.hypotheses])
+        expected = dict()
+        for word in self.words:
+            symbols = set(common)
+            for other_word in self.words:
+                if other_word != word:
+                    symbols.difference_update(self.learner.possible[other_word])
+            expected[word] = set(self.learner.necessary[word]).union(symbols)
+
+        self.learner._rule3(self.pair)
+        for word in self.words:
+            self.assertEqual(self.learner.necessary[word], expected[word])
+
+    def testRule4(self):
+        once = set(symbol for h in self.pair.hypotheses for symbol in h.symbols
+                   if h.symbol_count[symbol] <= 1)
+        expected = dict()
+        for word in self.words:
+            symbols = set(self.learner.possible[word])
+            for other_word in self.words:
+                if other_word != word:
+                    symbols.difference_update(once.intersection(self.learner.necessary[other_word]))
+            expected[word] = symbols
+
+        self.learner._rule4(self.pair)
+        for word in self.words:
+            self.assertEqual(self.learner.possible[word], expected[word])
+
+@unittest.skipUnless(incidence.available, "needs NumPy")
+class VectorisedRules(unittest.TestCase):
+    def setUp(self):
+        # per-hypothesis debugging keeps rule 1 testing each hypothesis in turn
+        debug_logger = basic_learner.NPLogger().debug_logger
+        self.addCleanup(debug_logger.setLevel, debug_logger.level)
+        debug_logger.setLevel(logging.WARNING)
+
+    def learner_and_pair(self, seed):
+        rand = random.Random(seed)
+        symbols = ["V%d" % i for i in range(30)] + ["v%d" % i for i in range(30)]
+        words = ["w%d" % i for i in range(3)]
+
+        n = basic_learner.FiniteSymbolTable()
+        p = basic_learner.FiniteSymbolTable() if seed % 2 else basic_learner.UniversalSymbolTable()
+        for word in words:
+            n.add(word, {rand.choice(symbols)})
+            if seed % 2:
+                p.add(word, set(rand.sample(symbols, 40)).union(n[word]))
+
+        necessary = [symbol for word in words for symbol in n[word]]
+        hypotheses = [Hypothesis(necessary[:rand.randint(1, 3)] + rand.sample(symbols, 4))
+                      for h in range(100)]
+        return (basic_learner.NPSymbolLearner(necessary=n, possible=p),
+                training.pairs.UtteranceMeaningPair(" ".join(words), hypotheses))
+
+    def testSameAsLoop(self):
+        for seed in range(6):
+            results = []
+            for vectorise_min_hypotheses in (0, float("inf")):
+                (learner, pair) = self.learner_and_pair(seed)
+                learner.vectorise_min_hypotheses = vectorise_min_hypotheses
+                learner._rule1(pair)
+                learner._rule2(pair)
+                learner._rule3(pair)
+                results.append((pair.active, [learner._entry_state(word) for word in pair.words]))
+
+            self.assertEqual(results[0], results[1])
+
 class ConvergenceMeasure(unittest.TestCase):
     def setUp(self):
         """ Create midway symbol tables as per Siskind 1996 """
@@ -223,6 +380,131 @@ class ConvergenceMeasure(unittest.TestCase):
         for word in self.learner.necessary:
             self.assertTrue(self.learner.converged(word))
 
+class FixedPointTraining(unittest.TestCase):
+    def setUp(self):
+        self.learner = basic_learner.NPSymbolLearner(necessary=basic_learner.FiniteSymbolTable(),
+                                                     possible=basic_learner.UniversalSymbolTable())
+
+    def corpus(self):
+        """the meaning of "walked" (and then "mary") is only pinned down by revisiting pair 1"""
+        return [training.pairs.UtteranceMeaningPair("john walked",
+                    {Hypothesis(["WALK", "john"]), Hypothesis(["RUN", "john"])}),
+                training.pairs.UtteranceMeaningPair("john", {Hypothesis(["john"])}),
+                training.pairs.UtteranceMeaningPair("mary walked", {Hypothesis(["WALK", "mary"])})]
+
+    def testSinglePass(self):
+        for pair in self.corpus():
+            self.learner.process(pair)
+        self.assertFalse(self.learner.converged("walked"))
+
+    def testFixedPoint(self):
+        processed = self.learner.train(self.corpus())
+
+        for word in ("john", "walked", "mary"):
+            self.assertTrue(self.learner.converged(word))
+        self.assertEqual(self.learner.necessary["walked"], {"WALK"})
+        self.assertEqual(self.learner.necessary["mary"], {"mary"})
+
+        # at a fixed point, another pass changes nothing
+        states = [self.learner._entry_state(word) for word in ("john", "walked", "mary")]
+        self.assertEqual(self.learner.train(self.corpus()), 3)
+        self.assertEqual(states, [self.learner._entry_state(word) for word in ("john", "walked", "mary")])
+        self.assertTrue(processed > 3)
+
+class IncrementalStatus(unittest.TestCase):
+    def setUp(self):
+        n = basic_learner.FiniteSymbolTable()
+        n.add("john", "john")
+        n.add("ball", "ball")
+
+        p = basic_learner.FiniteSymbolTable()
+        p.add("john", "john")
+        p.add("ball", {"ball", "arm"})
+
+        self.learner = basic_learner.NPSymbolLearner(necessary=n, possible=p)
+
+    def testTracksChanges(self):
+        self.assertTrue(self.learner.all_consistent())
+        self.assertTrue(self.learner.converged("john"))
+        self.assertFalse(self.learner.converged("ball"))
+
+        # corrupt an entry, then repair it
+        self.learner.necessary["ball"].add("CAUSE")
+        self.assertFalse(self.learner.all_consistent())
+        self.assertEqual(self.learner.inconsistent_words(), {"ball"})
+
+        self.learner.possible["ball"] = self.learner.possible["ball"].union({"CAUSE"})
+        self.assertTrue(self.learner.all_consistent())
+
+        self.learner.possible["ball"].difference_update({"arm", "CAUSE"})
+        self.learner.necessary["ball"].discard("CAUSE")
+        self.assertTrue(self.learner.converged("ball"))
+
+    def testRollbackAndReplacedTables(self):
+        self.learner.begin_trial()
+        self.learner.necessary["john"].add("JOHN")
+        self.assertFalse(self.learner.all_consistent())
+        self.learner.rollback()
+        self.assertTrue(self.learner.all_consistent())
+
+        n = basic_learner.FiniteSymbolTable()
+        n.add("john", "mary")
+        self.learner.necessary = n
+        self.assertFalse(self.learner.all_consistent())
+        self.assertFalse(self.learner.converged("ball"))
+
+    def testSeparateDefaultTables(self):
+        learner1 = basic_learner.NPSymbolLearner()
+        learner2 = basic_learner.NPSymbolLearner()
+        learner1.necessary.add("john", "john")
+        self.assertNotIn("john", learner2)
+
+class RuleTracing(unittest.TestCase):
+    def setUp(self):
+        self.learner = basic_learner.NPSymbolLearner(necessary=basic_learner.FiniteSymbolTable(),
+                                                     possible=basic_learner.UniversalSymbolTable())
+        (handle, self.path) = tempfile.mkstemp(suffix=".trace")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def testTraceFile(self):
+        corpus = FixedPointTraining("testFixedPoint").corpus()
+        with rule_trace.TraceWriter(self.path) as tracer:
+            self.learner.log.tracer = tracer
+            for pair in corpus:
+                self.learner.process(pair)
+
+        events = list(rule_trace.read_trace(self.path))
+        self.assertIn((2, "mary", None, ()), events)
+        self.assertIn((3, "john", (), ("john",)), events)
+        self.assertIn((3, "mary", (), ("mary",)), events)
+
+        walked = [event for event in events if event.word == "walked" and event.removed]
+        self.assertEqual([set(event.removed) for event in walked], [{"RUN", "john"}])
+
+    def testNoFormattingWhenDisabled(self):
+        class Unprintable:
+            def __str__(self):
+                raise AssertionError("formatted a disabled debug message")
+
+        log = self.learner.log
+        self.addCleanup(log.debug_logger.setLevel, log.debug_logger.level)
+        log.debug_logger.setLevel(logging.WARNING)
+        self.assertFalse(log.debugging())
+        log.rule_debug(Unprintable(), indent=2)
+        log.rule_debug("%s", Unprintable(), symbol="-")
+
+class LoggerChannels(unittest.TestCase):
+    def testSharedChannels(self):
+        channels = len(logging.Logger.manager.loggerDict)
+        (first, second) = (basic_learner.NPLogger(), basic_learner.NPLogger())
+
+        self.assertIs(first.debug_logger, second.debug_logger)
+        self.assertEqual(len(logging.Logger.manager.loggerDict), channels)
+        self.assertEqual(first.caller_funcname, "testSharedChannels")
+
 class ConceptualExpressionTable(unittest.TestCase):
     def setUp(self):
         self.np_learner = basic_learner.NPSymbolLearner()
@@ -290,5 +572,28 @@ class ConceptualExpressionRules(unittest.TestCase):
                          training.hypothesis.Hypothesis(["CAUSE", "x", "x"]).bound_expression)
         print general
 
+class ConstantIndex(unittest.TestCase):
+    def testSameAsScan(self):
+        hypothesis = Hypothesis(["CAUSE", "john", ["GO", ["PARTOF", ["LEFT", "arm"], "john"],
+                                                   ["TO", "ball"]]])
+        for constants in ({"GO"}, {"GO", "TO"}, {"LEFT", "PARTOF"}, {"TO", "WANT"}, set()):
+            expected = set(subexpression for subexpression in hypothesis.subexprs
+                           if constants.issubset(subexpression.counts()[0]))
+            self.assertEqual(hypothesis.subexpressions_for_constants(constants), expected)
+
+    def testMemoisedCounts(self):
+        expression = Expression(["GO", "john", ["TO", "john"]])
+        memoised = expression._memoised_counts()
+        self.assertIs(expression._memoised_counts(), memoised)
+
+        # callers get their own copies: changing one leaves the (shared) expression alone
+        (constants, variables) = expression.counts()
+        constants["GO"] += 1
+        variables.clear()
+        self.assertEqual(expression.counts(), ({"GO": 1, "TO": 1}, {"john": 2}))
+        self.assertEqual(Expression(["GO", "john", ["TO", "john"]]).counts()[1], {"john": 2})
+        self.assertFalse(hasattr(expression, "const_counts"))
+        self.assertEqual(expression.constant_signature(), {"GO", "TO"})
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
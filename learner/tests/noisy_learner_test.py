@@ -1,9 +1,14 @@
 import unittest
+import itertools
+import os
+import tempfile
 from training.expression import Expression
 from training.hypothesis import Hypothesis
 import training.pairs
 
-from learner import basic_learner, noisy_learner, symbol_table, symbol_set
+from learner import basic_learner, noisy_learner, symbol_table, symbol_set, snapshot, \
+    sense_pool
+from learner.symbol_set import ExpressionSet
 
 class SenseTable(unittest.TestCase):
     def setUp(self):
@@ -101,6 +106,57 @@ class BackupTests(unittest.TestCase):
         # initial props should be true; changes shouldn't
         self.initial_propositions()
 
+class JournalTests(BackupTests):
+    def test_rollback(self):
+        self.np_learner.begin_trial()
+        self.initial_propositions()
+
+        # make changes (in place & by replacing entries)
+        self.np_learner.necessary.add("a", "B")
+        self.np_learner.necessary["c"].update({"F"})
+        self.np_learner.possible["d"] = self.np_learner.possible["d"].intersection({"ball"})
+        self.np_learner.possible["c"] = self.np_learner.possible["d"].intersection({"hello"})
+        self.np_learner.expressions["a"] = self.np_learner.expressions["a"].intersection({"A"})
+        self.np_learner.necessary["new_word"].add("NEW")
+
+        self.assertIn("B", self.np_learner.necessary["a"])
+        self.assertIn("F", self.np_learner.necessary["c"])
+        self.assertNotIn("cross", self.np_learner.possible["d"])
+        self.assertNotIn("rand", self.np_learner.possible["c"])
+        self.assertNotIn("B", self.np_learner.expressions["a"])
+
+        # journal holds only the changed entries
+        self.assertEqual(len(self.np_learner.journal), 6)
+
+        self.np_learner.rollback()
+
+        self.initial_propositions()
+        self.assertNotIn("F", self.np_learner.necessary["c"])
+        self.assertIn("B", self.np_learner.expressions["a"])
+        self.assertNotIn("new_word", self.np_learner.necessary)
+
+    def test_held_entry_tracked(self):
+        # an entry changed in place through a reference held from before the
+        # status check & trial still has the change journalled & marked dirty
+        held = self.np_learner.necessary["a"]
+        self.assertTrue(self.np_learner.all_consistent())
+        self.np_learner.begin_trial()
+        held.update({"cross"})
+        self.assertEqual(len(self.np_learner.journal), 1)
+        self.assertFalse(self.np_learner.all_consistent())
+
+        self.np_learner.rollback()
+        self.assertNotIn("cross", self.np_learner.necessary["a"])
+        self.assertTrue(self.np_learner.all_consistent())
+
+    def test_commit(self):
+        self.np_learner.begin_trial()
+        self.np_learner.necessary.add("a", "B")
+        self.np_learner.commit()
+
+        self.assertIsNone(self.np_learner.necessary.journal)
+        self.assertIn("B", self.np_learner.necessary["a"])
+
 class SenseAssignment(unittest.TestCase):
     def setUp(self):
         self.noisy_learner = noisy_learner.NoisySymbolLearner()
@@ -141,6 +197,198 @@ class SenseAssignment(unittest.TestCase):
         print "\n"
         print self.noisy_learner.confidence
 
+class Snapshot(unittest.TestCase):
+    def setUp(self):
+        self.noisy_learner = noisy_learner.NoisySymbolLearner()
+
+        self.noisy_learner.manual_entry("john_0", {"john"}, {"john"}, 1000)
+        self.noisy_learner.manual_entry("saw_1", {}, {"SEE", "GO"}, 0)
+        self.noisy_learner.manual_entry("arrive_0", {"GO", "TO", "BE"}, {"GO", "TO", "BE"}, 10)
+        self.noisy_learner.manual_entry("the_0", {}, {}, 10000)
+        self.noisy_learner.manual_entry("ball_1", {"spherical_toy"}, {"spherical_toy"}, 1000)
+        self.noisy_learner.np_learner.possible["mary_0"]
+
+        expr = Expression(["GO", "mary", ["TO", ["BE", "mary", ["AT", "party"]]]])
+        self.noisy_learner.np_learner.expressions["arrive_0"] = ExpressionSet({expr})
+        self.noisy_learner.np_learner.expressions["mary_0"] = ExpressionSet({"mary"})
+
+        (handle, self.path) = tempfile.mkstemp(suffix=".lex")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assertSameTables(self, np_learner, loaded):
+        for table in ("necessary", "possible", "expressions"):
+            (expected, actual) = (getattr(np_learner, table), getattr(loaded, table))
+            self.assertEqual(sorted(expected.mapping), sorted(actual.mapping))
+            for word in expected.mapping:
+                self.assertEqual(str(expected.mapping[word]), str(actual.mapping[word]))
+
+    def test_np_learner(self):
+        np_learner = self.noisy_learner.np_learner
+        np_learner.save(self.path)
+        loaded = basic_learner.NPSymbolLearner.load(self.path)
+
+        self.assertSameTables(np_learner, loaded)
+        self.assertEqual(list(loaded.expressions["arrive_0"])[0],
+                         Expression(["GO", "mary", ["TO", ["BE", "mary", ["AT", "party"]]]]))
+        self.assertEqual(loaded.inconsistent_words(), np_learner.inconsistent_words())
+
+    def test_noisy_learner(self):
+        self.noisy_learner.save(self.path)
+        loaded = noisy_learner.NoisySymbolLearner.load(self.path)
+
+        self.assertSameTables(self.noisy_learner.np_learner, loaded.np_learner)
+        self.assertEqual(loaded.sense_table.table, self.noisy_learner.sense_table.table)
+        self.assertEqual(loaded.confidence.table, self.noisy_learner.confidence.table)
+
+    def test_mapped(self):
+        self.noisy_learner.save(self.path)
+        (necessary, possible, expressions, senses, confidence) = snapshot.load(self.path)
+
+        with snapshot.open_mapped(self.path) as mapped:
+            for (table, loaded) in [(mapped.necessary, necessary), (mapped.possible, possible),
+                                    (mapped.expressions, expressions)]:
+                self.assertEqual(sorted(table), sorted(loaded.mapping))
+                for word in loaded.mapping:
+                    self.assertEqual(str(table[word]), str(loaded.mapping[word]))
+            self.assertTrue(mapped.universal)
+            self.assertEqual(mapped.senses, senses)
+            self.assertEqual(mapped.confidence, confidence)
+
+            # entries are decoded afresh, so changing one leaves the snapshot as it was
+            mapped.necessary["john_0"].add("snapshot_test_changed")
+            self.assertNotIn("snapshot_test_changed", mapped.necessary["john_0"])
+            self.assertIsNone(mapped.possible.get("no_such_word"))
+
+    def test_remapped_symbols(self):
+        """bitmaps are remapped if the file's symbol ids don't match the interner's"""
+        writer = snapshot._Writer(0)
+        writer.bitmap(0b101)
+        reader = snapshot._Reader("".join(writer.chunks), self.path)
+        reader._map_symbols(["snapshot_test_new", "party", "mary"])
+
+        mask = reader.bitmap()
+        self.assertEqual(symbol_set.SymbolSet.from_mask(mask), {"snapshot_test_new", "mary"})
+
+    def test_bad_files(self):
+        self.assertRaises(ValueError, snapshot.load, self.path)     # (empty)
+        self.assertRaises(ValueError, snapshot.open_mapped, self.path)
+
+        self.noisy_learner.save(self.path)
+        with open(self.path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+        for length in (3, 20, len(data) // 2, len(data) - 1):
+            with open(self.path, "wb") as snapshot_file:
+                snapshot_file.write(data[:length])
+            self.assertRaises(ValueError, snapshot.load, self.path)
+            self.assertRaises(ValueError, snapshot.open_mapped, self.path)
+
+class SenseSearch(unittest.TestCase):
+    def setUp(self):
+        np_learner = basic_learner.NPSymbolLearner(necessary=symbol_table.FiniteSymbolTable(),
+                                                   possible=symbol_table.UniversalSymbolTable())
+        self.noisy_learner = noisy_learner.NoisySymbolLearner(np_learner=np_learner)
+
+        self.entry("john_0", {"john"}, {"john"})
+        self.entry("john_1", {"toilet"}, {"toilet"})
+        self.entry("saw_0", set(), {"wood_cutter", "hammer"})
+        self.entry("saw_1", set(), {"SEE", "GO"})
+        self.entry("saw_2", {"CUT"}, {"CUT", "wood"})
+        self.entry("mary_0", {"mary"}, {"mary"})
+        self.entry("ball_0", {"party"}, {"party"})
+        self.entry("ball_1", {"spherical_toy"}, {"spherical_toy"})
+
+        self.senses = {"john": {"john_0", "john_1"},
+                       "saw": {"saw_0", "saw_1", "saw_2"},
+                       "mary": {"mary_0"},
+                       "ball": {"ball_0", "ball_1"}}
+        self.hypotheses = {Hypothesis(["SEE", "john", ["mary", "party"]]),
+                           Hypothesis(["CUT", "john", ["mary", "spherical_toy"]])}
+
+    def entry(self, sense, n_set, p_set):
+        self.noisy_learner.np_learner.necessary.add(sense, n_set)
+        self.noisy_learner.np_learner.possible[sense] = symbol_set.SymbolSet(p_set)
+
+    def exhaustive(self):
+        """process every combination of senses: which are consistent?"""
+        np_learner = self.noisy_learner.np_learner
+        consistent = []
+        for assignment in itertools.product(*[tuple(self.senses[word]) for word in self.senses]):
+            np_learner.begin_trial()
+            pair = training.pairs.UtteranceMeaningPair(" ".join(assignment), self.hypotheses)
+            np_learner.process(pair)
+            if np_learner.all_consistent():
+                consistent.append(pair.utterance)
+            np_learner.rollback()
+        return consistent
+
+    def test_same_as_exhaustive(self):
+        expected = self.exhaustive()
+        consistent = self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses)
+
+        self.assertEqual([pair.utterance for pair in consistent], expected)
+        self.assertTrue(len(expected) > 0)
+
+    def test_pruning(self):
+        self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses)
+        search = self.noisy_learner.last_search
+
+        self.assertEqual(search.product_size, 12)
+        self.assertTrue(search.candidate_count < search.product_size)
+        self.assertTrue(search.nodes_expanded < 2 + 2*3 + 2*3*1 + 2*3*1*2)
+
+    def test_parallel_same_as_serial(self):
+        serial = self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses)
+
+        self.noisy_learner.processes = 2
+        self.noisy_learner.parallel_min_candidates = 0
+        parallel = self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses)
+
+        self.assertEqual([pair.utterance for pair in parallel],
+                         [pair.utterance for pair in serial])
+
+        # workers processed the candidates; the learner's own lexicon is unchanged
+        self.assertEqual(len(self.noisy_learner.np_learner.necessary["saw_1"]), 0)
+
+    def test_shared_workers(self):
+        serial = self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses)
+        self.noisy_learner.processes = 2
+        self.noisy_learner.parallel_min_candidates = 0
+
+        with sense_pool.SensePool(2) as workers:
+            parallel = self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses,
+                                                                      workers)
+            pool = workers.pool
+            self.assertEqual([pair.utterance for pair in parallel],
+                             [pair.utterance for pair in serial])
+
+            # the same workers, given symbols interned since they started
+            self.senses["john"] = {"john_2"}
+            self.entry("john_2", {"shared_workers_test"}, {"shared_workers_test"})
+            hypotheses = {Hypothesis(["SEE", "shared_workers_test", ["mary", "party"]])}
+            expected = self.noisy_learner._consider_sense_assignments(self.senses, hypotheses)
+            parallel = self.noisy_learner._consider_sense_assignments(self.senses, hypotheses,
+                                                                      workers)
+            self.assertIs(workers.pool, pool)
+            self.assertEqual([pair.utterance for pair in parallel],
+                             [pair.utterance for pair in expected])
+            self.assertTrue(len(expected) > 0)
+        self.assertIsNone(workers.pool)
+
+    def test_more_workers_than_batches(self):
+        # every worker gets the lexicon, even those left without a batch
+        serial = self.noisy_learner._consider_sense_assignments(self.senses, self.hypotheses)
+        self.noisy_learner.processes = 8
+        self.noisy_learner.parallel_min_candidates = 0
+        with sense_pool.SensePool(8) as workers:
+            for repeat in range(2):
+                parallel = self.noisy_learner._consider_sense_assignments(
+                    self.senses, self.hypotheses, workers)
+                self.assertEqual([pair.utterance for pair in parallel],
+                                 [pair.utterance for pair in serial])
+
 class ColourTest(unittest.TestCase):
     def setUp(self):
         self.noisy_learner = noisy_learner.NoisySymbolLearner()
@@ -33,6 +33,9 @@ parser.add_argument('--skip', dest="skip",
                     type=int, nargs="?", default=1)
 parser.add_argument('--k', dest="knearest",
                     type=int, nargs="?", default=3)
+parser.add_argument('--freeze', dest="freeze",
+                    type=int, nargs="?", default=None,
+                    help="freeze the teacher at this lookup table resolution")
 args = parser.parse_args()
 
 # set up learner
@@ -64,6 +67,10 @@ test_colours = [
 # output for learner A
 logger.log_points("langA", test_colours)
 
+# A has finished learning: (optionally) answer B's queries from a lookup table
+if args.freeze:
+    learnerA.freeze(args.freeze)
+
 logger.learner = learnerB
 
 # iteratively train learner B on A's utterances (N iterations)
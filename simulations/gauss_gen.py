@@ -37,6 +37,9 @@ parser.add_argument('--skip', dest="skip",
                     type=int, nargs="?", default=1)
 parser.add_argument('--k', dest="knearest",
                     type=int, nargs="?", default=3)
+parser.add_argument('--freeze', dest="freeze",
+                    type=int, nargs="?", default=None,
+                    help="freeze the teacher at this lookup table resolution")
 
 args = parser.parse_args()
 
@@ -72,6 +75,8 @@ logger.mean("langA")
 # generation simulation
 for generation in range(1,args.generations):
     learnerA = learnerB
+    if args.freeze:
+        learnerA.freeze(args.freeze)
     learnerB = gauss_colour.GaussianColourSemantics("L_%d" % generation, creative=True)
 
     logger.learner = learnerB
@@ -23,10 +23,10 @@ def get_colour_expression(rgb):
                                  "g_%d" % rgb[1],
                                  "b_%d" % rgb[2] ])
 
-def probe_colour(lang_name, learner, rgb):
-    """print relevant entry in appropriate CSV format to stdout"""
-    word = learner.word_for(get_colour_expression(rgb))
-    print "%s,%s" % (lang_name, word)
+def probe_colours(lang_name, learner, colours):
+    """print relevant entries in appropriate CSV format to stdout"""
+    for word in learner.word_for_many(colours):
+        print "%s,%s" % (lang_name, word)
 
 def probe_mean(lang_name, learner):
     for word in ("black", "darkblue", "green", "red", "cyan", "yellow", "magenta", "white"):
@@ -54,6 +54,9 @@ parser.add_argument('--skip', dest="skip",
                     type=int, nargs="?", default=1)
 parser.add_argument('--k', dest="knearest",
                     type=int, nargs="?", default=3)
+parser.add_argument('--freeze', dest="freeze",
+                    type=int, nargs="?", default=None,
+                    help="freeze the teacher at this lookup table resolution")
 
 args = parser.parse_args()
 
@@ -83,9 +86,11 @@ test_colours = [
      random.randint(0,255)) for i in range(args.num_samples)]
 
 # output for learner A
-for rgb_tuple in test_colours:
-    probe_colour("langA", learnerA, rgb_tuple)
-    pass
+probe_colours("langA", learnerA, test_colours)
+
+# A has finished learning: (optionally) answer B's queries from a lookup table
+if args.freeze:
+    learnerA.freeze(args.freeze)
 
 #probe_mean("langA", learnerA)
 
@@ -96,6 +101,4 @@ for i in range(0, args.training_iterations):
     #probe_mean("langB_%d" % i, learnerB)
 
     if i % args.skip == 0:
-        for rgb_tuple in test_colours:
-            probe_colour("langB_%d" % i, learnerB, rgb_tuple)
-            pass
+        probe_colours("langB_%d" % i, learnerB, test_colours)
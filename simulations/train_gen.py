@@ -38,6 +38,9 @@ parser.add_argument('--skip', dest="skip",
                     type=int, nargs="?", default=1)
 parser.add_argument('--k', dest="knearest",
                     type=int, nargs="?", default=3)
+parser.add_argument('--freeze', dest="freeze",
+                    type=int, nargs="?", default=None,
+                    help="freeze the teacher at this lookup table resolution")
 
 args = parser.parse_args()
 
@@ -74,6 +77,8 @@ logger.log_points("langL_0", test_colours)
 # generation simulation
 for generation in range(1,args.generations):
     learnerA = learnerB
+    if args.freeze:
+        learnerA.freeze(args.freeze)
     learnerB = knn_colour.KNNColourSemantics("L_%d" % generation, k=args.knearest)
     logger.learner = learnerB
     
@@ -0,0 +1,237 @@
+"""
+compiled_corpus.py - a binary form of a corpus of utterance-meaning pairs, which
+is read without any parsing. A corpus (e.g. from training.corpus.read_pairs) is
+compiled once:
+
+    compile_corpus("corpus.lfc", corpus.read_pairs("corpus.txt.gz"))
+
+and then each experiment opens the compiled file, which is read through a
+read-only memory map (so processes training on the same corpus share its pages):
+
+    with CompiledCorpus("corpus.lfc") as pairs:
+        for pair in pairs:
+            learner.process(pair)
+
+Layout (little-endian):
+    header      magic "LFCC", version uint16, pair count uint32, tables offset uint64
+    pairs       each: word count uint32, word ids uint32*, hypothesis count uint32,
+                then each hypothesis: length uint32, codes int32*
+    tables      offset of each pair uint64*,
+                symbol count uint32, then each: length uint16, bytes
+                word count uint32, then each: length uint16, bytes
+
+A hypothesis' codes are its FlatExpression encoding (see training.flat_expression),
+with leaves numbered by the file's symbol table. Whenever the loading process's
+interner agrees with that table, the codes are used as they are; otherwise each
+is mapped to its interner id.
+"""
+
+from array import array
+import mmap
+import struct
+import sys
+
+from training.flat_expression import FlatExpression
+from training.hypothesis import Hypothesis, HypothesisPool
+from training.pairs import UtteranceMeaningPair
+from training.symbols import interner
+
+MAGIC = "LFCC"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHIQ")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+def compile_corpus(path, pairs):
+    """
+    Write pairs (any iterable of UtteranceMeaningPairs: their active hypotheses,
+    in pool order) to a compiled corpus file; returns the number of pairs
+    """
+    symbol_ids = dict()     # interner id => file symbol id
+    symbols = []
+    word_ids = dict()       # word => file word id
+    words = []
+    offsets = []
+
+    with open(path, "wb") as corpus_file:
+        corpus_file.write(_HEADER.pack(MAGIC, VERSION, 0, 0))
+
+        for pair in pairs:
+            offsets.append(corpus_file.tell())
+            record = [len(pair.utterance.split(" "))]
+            for word in pair.utterance.split(" "):
+                if word not in word_ids:
+                    word_ids[word] = len(words)
+                    words.append(word)
+                record.append(word_ids[word])
+            corpus_file.write(struct.pack("<%dI" % len(record), *record))
+
+            hypotheses = [hypothesis for (index, hypothesis) in pair.indexed_hypotheses()]
+            corpus_file.write(_U32.pack(len(hypotheses)))
+            for hypothesis in hypotheses:
+                flat = hypothesis.flat_expression or \
+                    FlatExpression.from_expression(hypothesis.bound_expression)
+                codes = []
+                for code in flat.codes:
+                    if code >= 0:
+                        if code not in symbol_ids:
+                            symbol_ids[code] = len(symbols)
+                            symbols.append(interner.symbols[code])
+                        code = symbol_ids[code]
+                    codes.append(code)
+                corpus_file.write(_U32.pack(len(codes)))
+                corpus_file.write(struct.pack("<%di" % len(codes), *codes))
+
+        tables_offset = corpus_file.tell()
+        corpus_file.write(struct.pack("<%dQ" % len(offsets), *offsets))
+        for strings in (symbols, words):
+            corpus_file.write(_U32.pack(len(strings)))
+            for string in strings:
+                if not isinstance(string, str):
+                    raise TypeError("can't compile non-string symbol %r" % (string,))
+                corpus_file.write(_U16.pack(len(string)))
+                corpus_file.write(string)
+
+        corpus_file.seek(0)
+        corpus_file.write(_HEADER.pack(MAGIC, VERSION, len(offsets), tables_offset))
+
+    return len(offsets)
+
+
+class CompiledCorpus(object):
+    """
+    A compiled corpus file, as a sequence of (lazily decoded) pairs. Each access
+    gives a new CompiledPair, so pairs can be processed (changing their active
+    hypotheses) without affecting the corpus.
+    """
+
+    def __init__(self, path, max_depth=None, max_subexpressions=None):
+        """max_depth/max_subexpressions: subexpression bounds for the Hypotheses"""
+        self.path = path
+        self.max_depth = max_depth
+        self.max_subexpressions = max_subexpressions
+
+        with open(path, "rb") as corpus_file:
+            self.buffer = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, pair_count, offset) = _HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("%s is not a (version %d) compiled corpus" % (path, VERSION))
+
+        self.offsets = struct.unpack_from("<%dQ" % pair_count, self.buffer, offset)
+        offset += 8 * pair_count
+        (symbols, offset) = self._strings(offset)
+        (self.words, offset) = self._strings(offset)
+        self._map_symbols(symbols)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("compiled corpus index out of range")
+        return CompiledPair(self, self.offsets[index])
+
+    def __iter__(self):
+        for offset in self.offsets:
+            yield CompiledPair(self, offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+
+    def _strings(self, offset):
+        """(the strings in a table at offset, offset just after it)"""
+        count = _U32.unpack_from(self.buffer, offset)[0]
+        offset += 4
+        strings = []
+        for i in xrange(count):
+            length = _U16.unpack_from(self.buffer, offset)[0]
+            strings.append(self.buffer[offset + 2:offset + 2 + length])
+            offset += 2 + length
+        return (strings, offset)
+
+    def _map_symbols(self, symbols):
+        """
+        Make sure the file's symbols are interned; symbol_ids maps each file symbol
+        id to its interner id, or is None if they're the same
+        """
+        known = interner.symbols
+        if known[:len(symbols)] == symbols[:len(known)]:
+            for symbol in symbols[len(known):]:
+                interner.id_for(symbol)
+            self.symbol_ids = None
+        else:
+            self.symbol_ids = [interner.id_for(symbol) for symbol in symbols]
+
+    def _codes(self, offset, length):
+        """array('i') of the length codes at offset, numbered by interner ids"""
+        codes = array("i")
+        codes.fromstring(self.buffer[offset:offset + 4 * length])
+        if sys.byteorder != "little":
+            codes.byteswap()
+        if self.symbol_ids is not None:
+            symbol_ids = self.symbol_ids
+            codes = array("i", [code if code < 0 else symbol_ids[code] for code in codes])
+        return codes
+
+
+class CompiledPair(UtteranceMeaningPair):
+    """
+    View of one pair of a CompiledCorpus, for use wherever an UtteranceMeaningPair
+    is: the words and hypotheses are only read from the file when first used, and
+    hypotheses are kept in their flat encoding until their expression tree is needed.
+    """
+
+    def __init__(self, corpus, offset):
+        self.corpus = corpus
+        self._word_count = _U32.unpack_from(corpus.buffer, offset)[0]
+        self._word_offset = offset + 4
+        self._hypotheses_offset = self._word_offset + 4 * self._word_count
+
+        self._utterance = None
+        self._words = None
+        self._pool = None
+        self._active = (1 << _U32.unpack_from(corpus.buffer, self._hypotheses_offset)[0]) - 1
+        self._hypotheses = None
+
+    @property
+    def utterance(self):
+        if self._utterance is None:
+            words = self.corpus.words
+            word_ids = struct.unpack_from("<%dI" % self._word_count,
+                                          self.corpus.buffer, self._word_offset)
+            self._utterance = " ".join(words[word_id] for word_id in word_ids)
+        return self._utterance
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = set(self.utterance.split(" "))
+        return self._words
+
+    @property
+    def pool(self):
+        """HypothesisPool of the pair's hypotheses (read when first used)"""
+        if self._pool is None:
+            corpus = self.corpus
+            offset = self._hypotheses_offset
+            hypotheses = []
+            for i in xrange(_U32.unpack_from(corpus.buffer, offset)[0]):
+                length = _U32.unpack_from(corpus.buffer, offset + 4)[0]
+                flat = FlatExpression(corpus._codes(offset + 8, length))
+                hypotheses.append(Hypothesis(flat, corpus.max_depth, corpus.max_subexpressions))
+                offset += 4 + 4 * length
+            self._pool = HypothesisPool.from_distinct(hypotheses, corpus.max_depth,
+                                                      corpus.max_subexpressions)
+        return self._pool
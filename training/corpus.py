@@ -0,0 +1,135 @@
+"""
+corpus.py - streaming reading & writing of corpora of utterance-meaning pairs.
+
+A corpus file has one pair per line: the utterance, a tab, then the hypothesised
+meanings as s-expressions (see training.sexpr), separated by tabs, e.g.
+
+    john took the ball<TAB>(CAUSE john (GO ball (TO john)))<TAB>(WANT john ball)
+
+Blank lines and lines starting with '#' are ignored. Files whose names end in
+".gz" are gzip-compressed. Pairs are read one line at a time, so memory use
+doesn't grow with the size of the corpus:
+
+    for pair in read_pairs("corpus.txt.gz"):
+        learner.process(pair)
+
+A file can also be split between several readers, each reading one shard of it
+(see read_shard). An uncompressed file is split by byte offset (see shard_offsets):
+each reader reads the lines that start within its own range of bytes. A gzip file
+can't be read from an arbitrary offset without decompressing everything before it
+(and its size isn't known without decompressing it all), so it's split by record
+instead: each reader decompresses the whole file, but only parses every n-th record.
+"""
+
+import gzip
+import os
+
+from training import sexpr
+from training.hypothesis import HypothesisPool
+from training.pairs import UtteranceMeaningPair
+
+
+def read_pairs(path, start=0, end=None):
+    """
+    Generate the UtteranceMeaningPairs in a corpus file, in order; only those whose
+    lines start at a byte offset in [start, end) (not for gzip files: see read_shard)
+    """
+    for (offset, line) in _records(path, start, end):
+        yield _parse_record(path, offset, line)
+
+
+def read_shard(path, shard, shards):
+    """
+    Generate the UtteranceMeaningPairs of one (numbered from 0) of a number of
+    shards of a corpus file: those in its range of bytes (see shard_offsets) for
+    an uncompressed file, or every shards-th record, from the shard-th, for a gzip
+    file. Together the shards hold every pair once.
+    """
+    if not path.endswith(".gz"):
+        (start, end) = shard_offsets(path, shards)[shard]
+        for pair in read_pairs(path, start, end):
+            yield pair
+        return
+
+    for (index, (offset, line)) in enumerate(_records(path)):
+        if index % shards == shard:
+            yield _parse_record(path, offset, line)
+
+
+def _records(path, start=0, end=None):
+    """generate (byte offset, line) of the records in a corpus file (see read_pairs)"""
+    if path.endswith(".gz") and (start > 0 or end is not None):
+        raise ValueError("%s: can't read byte ranges of a gzip file (see read_shard)" % path)
+
+    with _open(path, "rb") as corpus_file:
+        offset = start
+        if start > 0:
+            # skip the rest of the line containing byte start - 1: it belongs to
+            # the previous shard (unless it ends exactly there)
+            corpus_file.seek(start - 1)
+            offset += len(corpus_file.readline()) - 1
+
+        while end is None or offset < end:
+            line = corpus_file.readline()
+            if not line:
+                break
+
+            record_offset = offset
+            offset += len(line)
+
+            line = line.rstrip("\r\n")
+            if line and not line.startswith("#"):
+                yield (record_offset, line)
+
+
+def _parse_record(path, offset, line):
+    try:
+        return parse_pair(line)
+    except ValueError as error:
+        raise ValueError("%s: bad record at byte %d (%s)" % (path, offset, error))
+
+
+def parse_pair(line):
+    """The UtteranceMeaningPair for one record (a line without its line break)"""
+    (utterance, tab, meanings) = line.partition("\t")
+    return UtteranceMeaningPair(utterance, HypothesisPool(sexpr.parse_all((meanings,))))
+
+
+def format_pair(pair):
+    """
+    The record (line, without line break) for an UtteranceMeaningPair, with its
+    active hypotheses in pool order (so a corpus is always written the same way)
+    """
+    return "\t".join([pair.utterance] + [sexpr.to_sexpr(hypothesis.bound_expression)
+                                         for (index, hypothesis) in pair.indexed_hypotheses()])
+
+
+def write_pairs(path, pairs):
+    """Write pairs (any iterable of UtteranceMeaningPairs) to a corpus file; returns the count"""
+    count = 0
+    with _open(path, "wb") as corpus_file:
+        for pair in pairs:
+            corpus_file.write(format_pair(pair))
+            corpus_file.write("\n")
+            count += 1
+    return count
+
+
+def shard_offsets(path, shards):
+    """
+    Split an uncompressed corpus file into (start, end) byte ranges for the given
+    number of readers, e.g. [read_pairs(path, start, end) for (start, end) in
+    shard_offsets(path, 4)]. Gzip files can't be split by byte (see read_shard).
+    """
+    if path.endswith(".gz"):
+        raise ValueError("%s: can't split a gzip file by byte offset (see read_shard)" % path)
+    size = os.path.getsize(path)
+    bounds = [size * shard // shards for shard in range(shards + 1)]
+    return zip(bounds[:-1], bounds[1:])
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
@@ -1,38 +1,74 @@
 from abc import ABCMeta, abstractmethod
 import collections
+import weakref
 
 class Expression(object):
-    """Takes a string/list of strings, and returns a recursive data structure of Expressions"""
-    def __init__(self, subexpressions):
+    """
+    Takes a string/list of strings, and returns a recursive data structure of Expressions.
+
+    Expressions are immutable and hash-consed: building the same tree twice gives
+    the same object, so equality is identity (O(1)) and the hash (computed once,
+    from the subexpressions') is structural.
+    """
+    # subexpression ids => live Expression; a parent keeps its subexpressions
+    # alive, so their ids can't be reused while it's in here
+    _interned = weakref.WeakValueDictionary()
 
+    def __new__(cls, subexpressions):
         # Case 1: parameter is string; this is some type of RootExpression
         if isinstance(subexpressions, str):
             # upper case symbol => constant
             if subexpressions.isupper():
-                self.subexpressions = [ConstantExpression(subexpressions)]
+                children = (ConstantExpression(subexpressions),)
             # lower case symbol => variable
             else:
-                self.subexpressions = [VariableExpression(subexpressions)]
+                children = (VariableExpression(subexpressions),)
 
         # Case 2: parameter is (nested?) list of strings; recursively make each element
-        # an Expression
-        elif isinstance(subexpressions, collections.Iterable):
-            self.subexpressions = []
-            for subexpression in subexpressions:
-                self.subexpressions.append(Expression(subexpression))
+        # an Expression (elements that already are expressions are used as they are)
+        elif isinstance(subexpressions, (list, tuple)) or \
+                isinstance(subexpressions, collections.Iterable):
+            children = tuple(map(_as_subexpression, subexpressions))
 
+        else:
+            raise TypeError("can't make an Expression from %r" % (subexpressions,))
+
+        key = tuple(map(id, children))
+        expression = cls._interned.get(key)
+        if expression is None:
+            expression = object.__new__(cls)
+            expression.subexpressions = children
+            expression._hash = hash(children)
+            expression._counts = None       # memoised by _memoised_counts()
+            expression._constants = None    # memoised by constant_signature()
+            cls._interned[key] = expression
+        return expression
+
+    def __reduce__(self):
+        # unpickling (e.g. in another process) interns the tree again
+        return (Expression, (self.subexpressions,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __getitem__(self, index):
         return self.subexpressions[index]
 
+    def __hash__(self):
+        return self._hash
+
     def __eq__(self, other):
         """
-        Equality defined recursively; two expressions are the same if
-        all subexpressions are the same. will eventually terminate from
-        RootExpressions
+        Equality defined structurally; as equal trees are always the same
+        (interned) object, that's just identity
         """
-        return all( subexp == other[index]
-            for (index, subexp) in enumerate(self.subexpressions) )
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
 
     def __contains__(self, other):
         """
@@ -55,27 +91,46 @@ class Expression(object):
         Determined recursively for all subexpressions.
 
         Returns a tuple of dictionaries counting constants & variables respectively, which
-        map a symbol to its count.
+        map a symbol to its count. As expressions are immutable, these are only counted
+        once; each call returns its own copies, which the caller may change.
         """
-        self.const_counts = dict()
-        self.var_counts = dict()
+        (const_counts, var_counts) = self._memoised_counts()
+        return (dict(const_counts), dict(var_counts))
+
+    def _memoised_counts(self):
+        """counts(), as dictionaries shared by every user of this (interned) expression"""
+        if self._counts is not None:
+            return self._counts
+
+        const_counts = dict()
+        var_counts = dict()
 
         for element in self.subexpressions:
             # get constant/variable counts from some subexpression
-            (subexpr_const_count, subexpr_var_count) = element.counts()
+            if isinstance(element, Expression):
+                (subexpr_const_count, subexpr_var_count) = element._memoised_counts()
+            else:
+                (subexpr_const_count, subexpr_var_count) = element.counts()
             for constant in subexpr_const_count.keys():
                 try: # if we have count for this const already...
-                    self.const_counts[constant] += subexpr_const_count[constant]
+                    const_counts[constant] += subexpr_const_count[constant]
                 except KeyError: # o/w add entry with subexpression's value
-                    self.const_counts[constant] = subexpr_const_count[constant]
+                    const_counts[constant] = subexpr_const_count[constant]
 
             for variable in subexpr_var_count.keys():
                 try:
-                    self.var_counts[variable] += subexpr_var_count[variable]
+                    var_counts[variable] += subexpr_var_count[variable]
                 except KeyError:
-                    self.var_counts[variable] = subexpr_var_count[variable]
+                    var_counts[variable] = subexpr_var_count[variable]
+
+        self._counts = (const_counts, var_counts)
+        return self._counts
 
-        return self.const_counts, self.var_counts
+    def constant_signature(self):
+        """frozenset of the constants in this expression (computed once)"""
+        if self._constants is None:
+            self._constants = frozenset(self._memoised_counts()[0])
+        return self._constants
 
     def general_form(self):
         if isinstance(self.subexpressions[0], ConstantExpression):
@@ -90,18 +145,38 @@ class Expression(object):
 
     def deep_subexpressions(self):
         """Determine all possible subexpressions of this Expression"""
-        subexpression_set = set()
-
-        # this expression is a subexpression of itself (trivially)
-        subexpression_set = subexpression_set.union( {self} )
-        subexpression_set = subexpression_set.union( self.general_form() )
+        return set(self.iter_subexpressions())
 
-        # recurse; this will terminate for RootExpressions
-        for subexpression in self.subexpressions:
-            recursive_subexprs = subexpression.deep_subexpressions()
-            subexpression_set = subexpression_set.union( recursive_subexprs )
-
-        return subexpression_set
+    def iter_subexpressions(self, max_depth=None):
+        """
+        Generate the subexpressions of this Expression lazily, depth first: this
+        expression itself (trivially) & its general form, then those of each of
+        its subexpressions in turn. The same subexpression may be generated more
+        than once. If max_depth is given, only subexpressions at most that many
+        levels below this one are visited.
+        """
+        stack = [(self, 0)]
+        while stack:
+            (expression, depth) = stack.pop()
+            yield expression
+            for general_expression in expression.general_form():
+                yield general_expression
+
+            # recurse; RootExpressions have no subexpressions of their own
+            if max_depth is None or depth < max_depth:
+                stack.extend((subexpression, depth + 1)
+                             for subexpression in reversed(expression.subexpressions)
+                             if isinstance(subexpression, Expression))
+
+
+def _as_subexpression(element):
+    """an element of the list given to Expression(), as a subexpression"""
+    # (cheapest checks first: RootExpression's is an ABC instance check)
+    if isinstance(element, Expression):
+        return element
+    elif not isinstance(element, str) and isinstance(element, RootExpression):
+        return element
+    return Expression(element)
 
 
 class RootExpression(object):
@@ -111,8 +186,30 @@ class RootExpression(object):
     """
     __metaclass__ = ABCMeta
 
-    def __init__(self, name):
-        self.name = name
+    # (class, name) => live root expression
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, name):
+        key = (cls, name)
+        expression = RootExpression._interned.get(key)
+        if expression is None:
+            expression = object.__new__(cls)
+            expression.name = name
+            RootExpression._interned[key] = expression
+        return expression
+
+    def __reduce__(self):
+        return (self.__class__, (self.name,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __hash__(self):
+        # consistent with equality to the name string
+        return hash(self.name)
 
     @abstractmethod
     def counts(self):
@@ -129,8 +226,13 @@ class RootExpression(object):
         """Equality of root expressions simply is string comparison"""
         if isinstance(other, str):
             return self.name == other
-        else:
+        elif isinstance(other, RootExpression):
             return self.name == other.name
+        else:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
     def deep_subexpressions(self):
         return set()
@@ -0,0 +1,192 @@
+"""
+flat_expression.py - a compact encoding of conceptual expressions, for holding
+very many candidate meanings at once. Rather than a tree of objects, an expression
+is a single array of ints in prefix order: a leaf (constant/variable) is its
+interned symbol id (>= 0), and a node with k subexpressions is -(k + 1), followed
+by the encodings of those subexpressions. So
+
+    Expression(["GO", "john"])  =>  [-3, -2, id(GO), -2, id(john)]
+
+(Expression("GO") being a node with the single leaf GO). A FlatExpressionPool
+packs many expressions end to end in one array.
+"""
+
+from array import array
+
+from training.expression import Expression, RootExpression, ConstantExpression, \
+    VariableExpression
+from training.symbols import interner
+
+
+class FlatExpression(object):
+    """An expression encoded as a prefix-order array of ints (see module docstring)"""
+    __slots__ = ("codes",)
+
+    def __init__(self, codes):
+        """codes: array('i') (or any sequence of ints) encoding the expression"""
+        self.codes = codes if isinstance(codes, array) else array("i", codes)
+
+    @classmethod
+    def from_expression(cls, expression):
+        """Encode an Expression (or anything Expression() accepts, e.g. nested lists)"""
+        if not isinstance(expression, (Expression, RootExpression)):
+            expression = Expression(expression)
+        codes = array("i")
+        _encode(expression, codes)
+        return cls(codes)
+
+    def to_expression(self):
+        """Decode into an (interned) Expression"""
+        (expression, end) = _decode(self.codes, 0)
+        return expression
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __eq__(self, other):
+        if not isinstance(other, FlatExpression):
+            return NotImplemented
+        return self.codes == other.codes
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(self.codes.tostring())
+
+    def __repr__(self):
+        return repr(self.to_expression())
+
+    def __contains__(self, symbol):
+        symbol_id = interner.ids.get(symbol)
+        return symbol_id is not None and symbol_id in self.codes
+
+    def symbol_mask(self):
+        """bitmask of the (interned) symbols in this expression"""
+        mask = 0
+        for code in self.codes:
+            if code >= 0:
+                mask |= 1 << code
+        return mask
+
+    def symbols(self):
+        """set of the symbols in this expression"""
+        return frozenset(interner.symbols_for(self.symbol_mask()))
+
+    def counts(self):
+        """
+        As Expression.counts(): a tuple of dictionaries counting the constants &
+        variables respectively, mapping each symbol to its number of instances
+        """
+        const_counts = dict()
+        var_counts = dict()
+        symbols = interner.symbols
+        for code in self.codes:
+            if code >= 0:
+                symbol = symbols[code]
+                counts = const_counts if symbol.isupper() else var_counts
+                counts[symbol] = counts.get(symbol, 0) + 1
+        return const_counts, var_counts
+
+    def subexpressions(self):
+        """
+        Generate the subexpressions of this expression (itself, each node within
+        it, & their general forms) as FlatExpressions; the same subexpressions as
+        Expression.deep_subexpressions(), though possibly with repeats
+        """
+        codes = self.codes
+        symbols = interner.symbols
+        ends = self._subtree_ends()
+        general_variable = None
+
+        for (start, code) in enumerate(codes):
+            if code >= 0:
+                continue
+            yield FlatExpression(codes[start:ends[start]])
+
+            # general form: a node headed by a constant, with every other subexpression "x"
+            if code != -1 and codes[start + 1] >= 0 and symbols[codes[start + 1]].isupper():
+                if general_variable is None:
+                    general_variable = interner.id_for("x")
+                general = array("i", (code, -2, codes[start + 1]))
+                general.extend((-2, general_variable) * (-code - 2))
+                yield FlatExpression(general)
+
+    def _subtree_ends(self):
+        """for each position, the position just after the subexpression starting there"""
+        ends = [0] * len(self.codes)
+        stack = []  # [start, subexpressions still to come] of each open node
+
+        for (position, code) in enumerate(self.codes):
+            if code < -1:
+                stack.append([position, -code - 1])
+                continue
+
+            # a whole subexpression (leaf, or node without subexpressions) ends here
+            ends[position] = position + 1
+            while stack:
+                stack[-1][1] -= 1
+                if stack[-1][1]:
+                    break
+                ends[stack.pop()[0]] = position + 1
+
+        return ends
+
+
+class FlatExpressionPool(object):
+    """Many FlatExpressions packed end to end in a single array"""
+
+    def __init__(self, expressions=()):
+        self.codes = array("i")
+        self.offsets = array("l", [0])     # expression i is codes[offsets[i]:offsets[i + 1]]
+        for expression in expressions:
+            self.add(expression)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("flat expression index out of range")
+        return FlatExpression(self.codes[self.offsets[index]:self.offsets[index + 1]])
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+
+    def add(self, expression):
+        """Append an expression (FlatExpression, Expression or nested lists); returns its index"""
+        if not isinstance(expression, FlatExpression):
+            expression = FlatExpression.from_expression(expression)
+        self.codes.extend(expression.codes)
+        self.offsets.append(len(self.codes))
+        return len(self) - 1
+
+
+def _encode(expression, codes):
+    """append the prefix-order encoding of an expression to codes"""
+    if isinstance(expression, RootExpression):
+        codes.append(interner.id_for(expression.name))
+    else:
+        codes.append(-(len(expression.subexpressions) + 1))
+        for subexpression in expression.subexpressions:
+            _encode(subexpression, codes)
+
+
+def _decode(codes, position):
+    """(expression starting at position, position just after it)"""
+    code = codes[position]
+    if code >= 0:
+        name = interner.symbols[code]
+        root = ConstantExpression(name) if name.isupper() else VariableExpression(name)
+        return (root, position + 1)
+
+    subexpressions = []
+    position += 1
+    for i in xrange(-code - 1):
+        (subexpression, position) = _decode(codes, position)
+        subexpressions.append(subexpression)
+    return (Expression(subexpressions), position)
@@ -1,19 +1,40 @@
 from training.expression import Expression
+from training.flat_expression import FlatExpression
+from training.symbols import interner
+from training import sexpr, incidence
 
 __author__ = 'sam'
 
 
-class Hypothesis:
+class Hypothesis(object):
     """
     Originally, expression is a list of strings: recursively convert to our more
-    appropriate format of a nested tuple of variables/constants; store other useful data
+    appropriate format of a nested tuple of variables/constants; store other useful data.
+
+    May also be made from a FlatExpression (compact encoding), in which case the
+    expression tree is only decoded if it's needed (e.g. for its subexpressions).
     """
-    def __init__(self, expression):
-        self.bound_expression = Expression(expression)
-        self.subexprs = self.bound_expression.deep_subexpressions()
-        (self.constants, self.variables) = self.bound_expression.counts()
+    def __init__(self, expression, max_depth=None, max_subexpressions=None):
+        """
+        max_depth/max_subexpressions optionally bound the subexpressions considered
+        (see subexprs) for very deep meanings
+        """
+        self.flat_expression = None
+        self._bound_expression = None
+        self._subexprs = None
+        self.max_depth = max_depth
+        self.max_subexpressions = max_subexpressions
+
+        if isinstance(expression, FlatExpression):
+            self.flat_expression = expression
+            (self.constants, self.variables) = expression.counts()
+        else:
+            if not isinstance(expression, Expression):
+                expression = Expression(expression)
+            self._bound_expression = expression
+            (self.constants, self.variables) = expression.counts()
 
-        self.symbols = set(self.constants.keys() + self.variables.keys())
+        self.symbols = frozenset(self.constants.keys() + self.variables.keys())
 
         self.symbol_count = dict()
         for var in self.variables.keys():
@@ -21,6 +42,41 @@ class Hypothesis:
         for const in self.constants.keys():
             self.symbol_count[const] = self.constants[const]
 
+        # bitmasks over the interned symbols: all symbols, and those appearing once
+        self.symbol_mask = interner.mask_for(self.symbols)
+        self.once_mask = interner.mask_for(symbol for symbol in self.symbols
+                                           if self.symbol_count[symbol] <= 1)
+
+        # constant => subexpressions containing it; built when first needed
+        self.constant_index = None
+
+    @property
+    def bound_expression(self):
+        """the meaning, as an Expression (decoded on first use if given flat)"""
+        if self._bound_expression is None:
+            self._bound_expression = self.flat_expression.to_expression()
+        return self._bound_expression
+
+    @property
+    def subexprs(self):
+        """
+        The (distinct) subexpressions of the meaning; only enumerated when first
+        used (most hypotheses are ruled out before then), then kept. Bounded to
+        those at most max_depth levels deep, and the first max_subexpressions
+        found (depth first), if these are set.
+        """
+        if self._subexprs is None:
+            subexpressions = self.bound_expression.iter_subexpressions(self.max_depth)
+            if self.max_subexpressions is None:
+                self._subexprs = set(subexpressions)
+            else:
+                self._subexprs = set()
+                for subexpression in subexpressions:
+                    if len(self._subexprs) >= self.max_subexpressions:
+                        break
+                    self._subexprs.add(subexpression)
+        return self._subexprs
+
     def __repr__(self):
         return repr(self.bound_expression)
 
@@ -29,16 +85,115 @@ class Hypothesis:
 
     def subexpressions_for_constants(self, word_constants):
         """
-        Return the subexpressions of this hypothesis' meaning which only
-        contain some constants.
+        Return the subexpressions of this hypothesis' meaning which contain
+        (at least) all of some constants.
         """
-        valid_subexpressions = set()
+        if not word_constants:
+            return set(self.subexprs)
+
+        if self.constant_index is None:
+            self._index_constants()
+
+        # intersect the postings for each constant, smallest first
+        postings = sorted((self.constant_index.get(constant, ()) for constant in word_constants),
+                          key=len)
+        valid_subexpressions = set(postings[0])
+        for subexpressions in postings[1:]:
+            valid_subexpressions.intersection_update(subexpressions)
+
+        return valid_subexpressions
+
+    def _index_constants(self):
+        """build the index from each constant to the subexpressions containing it"""
+        self.constant_index = dict()
         for subexpression in self.subexprs:
-            (subexpr_const_count, subexpr_var_count) = subexpression.counts()
-            subexpr_constants = subexpr_const_count.keys()
-            subexpr_constants = set(subexpr_constants)
+            for constant in subexpression.constant_signature():
+                self.constant_index.setdefault(constant, set()).add(subexpression)
+
+
+class HypothesisPool:
+    """
+    Store of hypotheses in which each distinct meaning is held only once: adding
+    an expression that's already in the pool gives back the existing Hypothesis.
+    Hypotheses are numbered in the order they were first added.
+    """
+    def __init__(self, expressions=(), max_depth=None, max_subexpressions=None):
+        """max_depth/max_subexpressions: subexpression bounds for new Hypotheses"""
+        self.hypotheses = []    # index => Hypothesis
+        self._indices = dict()  # bound expression => index (see indices)
+        self.max_depth = max_depth
+        self.max_subexpressions = max_subexpressions
+        self._incidence = None
+        for expression in expressions:
+            self.add(expression)
+
+    @classmethod
+    def from_distinct(cls, hypotheses, max_depth=None, max_subexpressions=None):
+        """
+        A pool of hypotheses already known to have distinct meanings (e.g. read from
+        a compiled corpus), which are only indexed by meaning if that's needed
+        """
+        pool = cls(max_depth=max_depth, max_subexpressions=max_subexpressions)
+        pool.hypotheses = list(hypotheses)
+        pool._indices = None
+        return pool
+
+    @property
+    def indices(self):
+        """dict from each hypothesis' bound expression to its index"""
+        if self._indices is None:
+            self._indices = dict((hypothesis.bound_expression, index)
+                                 for (index, hypothesis) in enumerate(self.hypotheses))
+        return self._indices
+
+    def __len__(self):
+        return len(self.hypotheses)
+
+    def __iter__(self):
+        return iter(self.hypotheses)
+
+    def __getitem__(self, index):
+        return self.hypotheses[index]
+
+    def __contains__(self, hypothesis):
+        return hypothesis.bound_expression in self.indices
+
+    def add(self, expression):
+        """Return the pool's Hypothesis for an expression (nested list, Expression or Hypothesis)"""
+        if isinstance(expression, Hypothesis):
+            (hypothesis, expression) = (expression, expression.bound_expression)
+        else:
+            hypothesis = None
+            if not isinstance(expression, Expression):
+                expression = Expression(expression)
+
+        index = self.indices.get(expression)
+        if index is None:
+            index = self.indices[expression] = len(self.hypotheses)
+            if hypothesis is None:
+                hypothesis = Hypothesis(expression, self.max_depth, self.max_subexpressions)
+            self.hypotheses.append(hypothesis)
+        return self.hypotheses[index]
+
+    def index(self, hypothesis):
+        """Number of a hypothesis (with the same meaning) in the pool"""
+        return self.indices[hypothesis.bound_expression]
+
+    def incidence(self):
+        """
+        IncidenceMatrix of the pool's hypotheses x symbols (needs NumPy: see
+        training.incidence); built when first needed, & again if the pool has grown
+        """
+        if self._incidence is None or len(self._incidence) != len(self.hypotheses):
+            self._incidence = incidence.IncidenceMatrix(
+                [hypothesis.symbol_mask for hypothesis in self.hypotheses])
+        return self._incidence
 
-            if word_constants.issubset(subexpr_constants):
-                valid_subexpressions.add(subexpression)
+    def parse(self, text):
+        """Return the pool's Hypothesis for an s-expression, e.g. "(WANT john ball)" """
+        return self.add(sexpr.parse(text))
 
-        return valid_subexpressions
\ No newline at end of file
+    def parse_file(self, path):
+        """Add every s-expression in a file to the pool; returns their Hypotheses in order"""
+        with open(path) as hypothesis_file:
+            return [self.add(expression) for expression in sexpr.parse_all(hypothesis_file)]
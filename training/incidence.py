@@ -0,0 +1,102 @@
+"""
+incidence.py - a hypotheses x symbols incidence matrix, held as packed bits
+(row i is the symbol bitmask of hypothesis i, as little-endian bytes) in a NumPy
+array, so tests over every hypothesis of a large pool run as a few array
+operations rather than one Python-level test per hypothesis. Sets of rows (e.g.
+a pair's active hypotheses) are given & returned as bitmasks over row indices.
+
+NumPy is optional: if it isn't installed, available is False, and callers should
+use the (equivalent) bitmask operations on each hypothesis instead.
+"""
+
+import binascii
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+available = numpy is not None
+
+
+class IncidenceMatrix(object):
+    """Packed-bit matrix of the symbols (columns) in each of some hypotheses (rows)"""
+
+    def __init__(self, symbol_masks):
+        """symbol_masks: the symbol bitmask of each hypothesis, in row order"""
+        self.row_count = len(symbol_masks)
+        self.width = max([(mask.bit_length() + 7) // 8 for mask in symbol_masks] or [1])
+
+        data = "".join(_little_endian(mask, self.width) for mask in symbol_masks)
+        self.rows = numpy.frombuffer(data, dtype=numpy.uint8).reshape(self.row_count, self.width)
+
+    def __len__(self):
+        return self.row_count
+
+    def filter(self, active, possible, necessary):
+        """
+        Bitmask of the active rows whose symbols are all in possible (a symbol mask,
+        or None if every symbol is possible), and which contain every symbol in
+        necessary
+        """
+        if necessary >> (8 * self.width):
+            return 0    # necessary symbols that no hypothesis has
+
+        selected = self._selected(active)
+        rows = self.rows[selected]
+        passed = numpy.ones(len(rows), dtype=bool)
+
+        if possible is not None:
+            impossible = ~_mask_bytes(possible & ((1 << (8 * self.width)) - 1), self.width)
+            passed &= ~(rows & impossible).any(axis=1)
+        if necessary:
+            passed &= ~(_mask_bytes(necessary, self.width) & ~rows).any(axis=1)
+
+        survivors = numpy.zeros(self.row_count, dtype=bool)
+        survivors[numpy.flatnonzero(selected)[passed]] = True
+        return _bits_mask(survivors)
+
+    def union(self, active):
+        """symbol mask of the symbols in any of the active rows"""
+        rows = self.rows[self._selected(active)]
+        if len(rows) == 0:
+            return 0
+        return _bytes_mask(numpy.bitwise_or.reduce(rows, axis=0))
+
+    def intersection(self, active):
+        """symbol mask of the symbols in every one of the active rows (-1 if none are)"""
+        rows = self.rows[self._selected(active)]
+        if len(rows) == 0:
+            return -1
+        return _bytes_mask(numpy.bitwise_and.reduce(rows, axis=0))
+
+    def _selected(self, active):
+        """boolean vector of the rows in a row bitmask"""
+        row_bytes = (self.row_count + 7) // 8
+        bits = numpy.unpackbits(_mask_bytes(active, row_bytes))
+        # unpackbits gives each byte's most significant bit first
+        return bits.reshape(-1, 8)[:, ::-1].ravel()[:self.row_count].astype(bool)
+
+
+def _little_endian(mask, width):
+    """a (non-negative) bitmask as a string of width little-endian bytes"""
+    data = "%x" % mask
+    data = binascii.unhexlify("0" * (len(data) % 2) + data)[::-1]
+    return data.ljust(width, "\0")[:width]
+
+
+def _mask_bytes(mask, width):
+    """a (non-negative) bitmask as a uint8 array of width little-endian bytes"""
+    return numpy.frombuffer(_little_endian(mask, width), dtype=numpy.uint8)
+
+
+def _bytes_mask(data):
+    """bitmask for a uint8 array of little-endian bytes"""
+    return int(binascii.hexlify(data[::-1].tostring()) or "0", 16)
+
+
+def _bits_mask(bits):
+    """bitmask with bit i set <=> bits[i] (a boolean vector)"""
+    padded = numpy.zeros((len(bits) + 7) // 8 * 8, dtype=numpy.uint8)
+    padded[:len(bits)] = bits
+    return _bytes_mask(numpy.packbits(padded.reshape(-1, 8)[:, ::-1]))
@@ -1,13 +1,31 @@
-class UtteranceMeaningPair:
+from training.hypothesis import HypothesisPool
+
+
+class UtteranceMeaningPair(object):
     """
     An element of the training corpus: a set of words said and possible hypotheses
     of its meanings as conceptual symbolic expressions.
+
+    Hypotheses are never copied or changed: they're held in a HypothesisPool (which
+    several pairs may share, e.g. one per sense assignment of an utterance), and
+    the pair only records which of the pool's hypotheses are still active, as a
+    bitmask over their indices in the pool (bit i set <=> pool[i] is active).
     """
 
-    def __init__(self, utterance, hypotheses=set()):
+    def __init__(self, utterance, hypotheses=(), active=None):
+        """
+        hypotheses: a HypothesisPool to share, or an iterable of Hypotheses (which
+        are put in a new pool); active: bitmask of the active hypotheses (default all)
+        """
         self.utterance = utterance
         self.words = set(utterance.split(" ")) # words need no order
-        self.hypotheses = hypotheses
+
+        if not isinstance(hypotheses, HypothesisPool):
+            hypotheses = HypothesisPool(hypotheses)
+        self.pool = hypotheses
+
+        self._active = active if active is not None else (1 << len(self.pool)) - 1
+        self._hypotheses = None
 
     def __repr__(self):
         return self.utterance
@@ -16,3 +34,42 @@ class UtteranceMeaningPair:
         return "\"%s\" => { %s }\n" % \
                (self.utterance, ",\n\t\t\t".join(str(hypothesis) for hypothesis in self.hypotheses))
 
+    @property
+    def active(self):
+        """bitmask of the pool's hypotheses that are still active for this pair"""
+        return self._active
+
+    @active.setter
+    def active(self, mask):
+        self._active = mask
+        self._hypotheses = None
+
+    @property
+    def hypotheses(self):
+        """frozenset of the active hypotheses"""
+        if self._hypotheses is None:
+            self._hypotheses = frozenset(hypothesis for (index, hypothesis)
+                                         in self.indexed_hypotheses())
+        return self._hypotheses
+
+    @hypotheses.setter
+    def hypotheses(self, hypotheses):
+        """make just these hypotheses active (adding any that aren't in the pool)"""
+        mask = 0
+        for hypothesis in hypotheses:
+            mask |= 1 << self.pool.index(self.pool.add(hypothesis))
+        self.active = mask
+
+    def indexed_hypotheses(self):
+        """Generate (pool index, hypothesis) for each active hypothesis, in pool order"""
+        mask = self._active
+        pool = self.pool
+        while mask:
+            low_bit = mask & -mask
+            index = low_bit.bit_length() - 1
+            yield (index, pool[index])
+            mask ^= low_bit
+
+    def with_utterance(self, utterance):
+        """A pair for another utterance, sharing this pair's pool & active hypotheses"""
+        return UtteranceMeaningPair(utterance, self.pool, self._active)
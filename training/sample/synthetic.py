@@ -0,0 +1,124 @@
+"""
+synthetic.py - seeded generation of (arbitrarily large) corpora of utterance-meaning
+pairs from a random ground-truth lexicon, for stressing the learners at scale.
+
+Each word of the vocabulary is either an object word, meaning a variable symbol
+(o0, o1, ...), or a relation word, meaning a constant symbol of arity 1 or 2 (R0,
+R1, ...). An utterance's meaning is a tree built from the meanings of its words,
+e.g. "w3 w7 w1" => (R4 o2 (R0 o9)), and its words are given in random order.
+Pairs then have:
+    - referential uncertainty: the true meaning is hidden amongst other hypotheses
+      (meanings of random utterances of the same length)
+    - noise: with probability noise_rate, the true meaning is left out entirely
+    - homonymy: a fraction homonymy_rate of the words have two senses, either of
+      which may be meant when the word is used
+
+    corpus = SyntheticCorpus(vocabulary_size=1000, utterance_length=4, seed=1)
+    for pair in corpus.pairs(10 ** 5):
+        learner.process(pair)
+"""
+
+import random
+
+from training.hypothesis import HypothesisPool
+from training.pairs import UtteranceMeaningPair
+
+
+class SyntheticCorpus(object):
+    """Random ground-truth lexicon, and a stream of pairs generated from it"""
+
+    def __init__(self, vocabulary_size=100, utterance_length=3, hypotheses=3,
+                 noise_rate=0.0, homonymy_rate=0.0, seed=0):
+        """
+        hypotheses: number of hypothesised meanings per utterance (including the
+        true one, unless left out as noise); seed: for a reproducible corpus
+        """
+        if vocabulary_size < 3:
+            raise ValueError("need at least one object word & one relation word of each arity")
+
+        self.vocabulary_size = vocabulary_size
+        self.utterance_length = utterance_length
+        self.hypotheses = hypotheses
+        self.noise_rate = noise_rate
+        self.homonymy_rate = homonymy_rate
+        self.random = random.Random(seed)
+
+        # word => [(symbol, arity), ...] of each of its senses (arity 0: object)
+        self.lexicon = dict()
+        self.objects = []       # object words
+        self.relations = {1: [], 2: []}     # arity => relation words
+        symbol_counts = {"o": 0, "R": 0}
+
+        for i in xrange(vocabulary_size):
+            word = "w%d" % i
+            # a third of the words are relations (the first few: one of each arity)
+            arity = 1 + i % 2 if i < 2 or self.random.random() < 1.0 / 3 else 0
+            prefix = "R" if arity else "o"
+            sense_count = 2 if self.random.random() < homonymy_rate else 1
+
+            senses = []
+            for sense in xrange(sense_count):
+                senses.append(("%s%d" % (prefix, symbol_counts[prefix]), arity))
+                symbol_counts[prefix] += 1
+            self.lexicon[word] = senses
+            if arity:
+                self.relations[arity].append(word)
+            else:
+                self.objects.append(word)
+
+        if not self.objects:
+            # (only possible for tiny vocabularies)
+            self.lexicon["w0"] = [("o%d" % symbol_counts["o"], 0)]
+            self.relations[1].remove("w0")
+            self.objects.append("w0")
+
+    def symbols(self, word):
+        """set of the symbols a word can mean (one per sense)"""
+        return set(symbol for (symbol, arity) in self.lexicon[word])
+
+    def pairs(self, count=None):
+        """Generate count pairs (or pairs without end, if count is None)"""
+        generated = 0
+        while count is None or generated < count:
+            yield self.pair()
+            generated += 1
+
+    def pair(self):
+        """A random UtteranceMeaningPair"""
+        words = []
+        meaning = self._meaning(self.utterance_length, words)
+        self.random.shuffle(words)
+
+        # the true meaning is at a random position amongst the hypotheses
+        meanings = [self._meaning(self.utterance_length, [])
+                    for i in xrange(self.hypotheses - 1)]
+        if self.random.random() >= self.noise_rate:
+            meanings.insert(self.random.randint(0, len(meanings)), meaning)
+        elif self.hypotheses:
+            meanings.append(self._meaning(self.utterance_length, []))
+
+        return UtteranceMeaningPair(" ".join(words), HypothesisPool(meanings))
+
+    def _meaning(self, length, words):
+        """
+        Random meaning (as nested lists) using length words, which are appended
+        to words
+        """
+        if length == 1:
+            word = self.random.choice(self.objects)
+            words.append(word)
+            return self.random.choice(self.lexicon[word])[0]
+
+        arity = 1 if length == 2 else self.random.choice((1, 2))
+        word = self.random.choice(self.relations[arity])
+        words.append(word)
+        meaning = [self.random.choice(self.lexicon[word])[0]]
+
+        # split the remaining words between the arguments
+        if arity == 1:
+            meaning.append(self._meaning(length - 1, words))
+        else:
+            first = self.random.randint(1, length - 2)
+            meaning.append(self._meaning(first, words))
+            meaning.append(self._meaning(length - 1 - first, words))
+        return meaning
@@ -0,0 +1,74 @@
+"""
+sexpr.py - reads meaning representations written as s-expressions, e.g.
+
+    (CAUSE john (GO ball (TO john)))
+
+which is the same expression as Expression(["CAUSE", "john", ["GO", "ball", ["TO", "john"]]]).
+A bare symbol (john) is the same as Expression("john"). Expressions are built
+directly as the tokens are read, with no intermediate nested lists, and text can
+be given in chunks (e.g. the lines of a file), with expressions spanning chunks.
+"""
+
+import re
+
+from training.expression import Expression, RootExpression
+
+_TOKEN = re.compile(r"[()]|[^\s()]+")
+
+
+def tokenize(text):
+    """Return the tokens in some text: parentheses & symbols"""
+    return _TOKEN.findall(text)
+
+
+def parse_all(chunks):
+    """
+    Generate every expression in an iterable of text chunks (e.g. an open file),
+    in order. Raises ValueError if the parentheses don't balance.
+    """
+    leaves = dict()     # symbol => its leaf Expression (shared, over all chunks)
+    stack = []          # subexpressions read so far, of each enclosing expression
+    subexpressions = None
+
+    for chunk in chunks:
+        for token in tokenize(chunk):
+            if token == "(":
+                stack.append(subexpressions)
+                subexpressions = []
+                continue
+
+            if token == ")":
+                if subexpressions is None:
+                    raise ValueError("unbalanced s-expression: unexpected ')'")
+                expression = Expression(subexpressions)
+                subexpressions = stack.pop()
+            else:
+                expression = leaves.get(token)
+                if expression is None:
+                    expression = leaves[token] = Expression(intern(token))
+
+            if subexpressions is None:
+                yield expression
+            else:
+                subexpressions.append(expression)
+
+    if subexpressions is not None:
+        raise ValueError("unbalanced s-expression: missing ')'")
+
+
+def parse(text):
+    """Return the expression for an s-expression (the text must contain exactly one)"""
+    expressions = list(parse_all((text,)))
+    if len(expressions) != 1:
+        raise ValueError("expected one s-expression, found %d in %r" % (len(expressions), text))
+    return expressions[0]
+
+
+def to_sexpr(expression):
+    """The s-expression text for an Expression (the inverse of parse)"""
+    subexpressions = expression.subexpressions
+    if len(subexpressions) == 1 and isinstance(subexpressions[0], RootExpression):
+        return subexpressions[0].name
+    return "(%s)" % " ".join(subexpression.name if isinstance(subexpression, RootExpression)
+                             else to_sexpr(subexpression)
+                             for subexpression in subexpressions)
@@ -0,0 +1,80 @@
+"""
+symbols.py - interning of conceptual symbols. Every symbol (string constant/
+variable, or any other hashable lexicon element) is given a small integer id
+the first time it is seen, so that sets of symbols can be stored as bitmasks
+(bit i set <=> symbol with id i is a member). A constant/variable expression is
+the same symbol as its name (which it's equal to), and is interned as that.
+"""
+
+from training.expression import RootExpression, ConstantExpression, VariableExpression
+
+
+class SymbolInterner:
+    """Two-way mapping between conceptual symbols and dense integer ids"""
+
+    def __init__(self):
+        self.ids = dict()       # symbol => id
+        self.symbols = []       # id => symbol
+
+        # bitmasks of the symbols that are constants/variables (by kind of expression,
+        # or for strings, by case)
+        self.constant_mask = 0
+        self.variable_mask = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.ids
+
+    def id_for(self, symbol):
+        """Return the id for a symbol, interning it if it hasn't been seen before"""
+        try:
+            return self.ids[symbol]
+        except KeyError:
+            if isinstance(symbol, RootExpression):
+                constant = isinstance(symbol, ConstantExpression)
+                variable = isinstance(symbol, VariableExpression)
+                symbol = symbol.name
+            else:
+                constant = isinstance(symbol, str) and symbol.isupper()
+                variable = isinstance(symbol, str) and symbol.islower()
+
+            symbol_id = len(self.symbols)
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+
+            if constant:
+                self.constant_mask |= 1 << symbol_id
+            elif variable:
+                self.variable_mask |= 1 << symbol_id
+            return symbol_id
+
+    def bit_for(self, symbol):
+        """Return the single-bit mask for a symbol (interning it if necessary)"""
+        return 1 << self.id_for(symbol)
+
+    def mask_for(self, symbols):
+        """Return the bitmask representing an iterable of symbols"""
+        mask = 0
+        for symbol in symbols:
+            mask |= 1 << self.id_for(symbol)
+        return mask
+
+    def symbols_for(self, mask):
+        """Generate the symbols represented by a bitmask, in id order"""
+        symbols = self.symbols
+        while mask:
+            low_bit = mask & -mask
+            yield symbols[low_bit.bit_length() - 1]
+            mask ^= low_bit
+
+
+# interner shared by every symbol set in the framework; symbols ids are only
+# meaningful relative to this table
+interner = SymbolInterner()
+
+
+def popcount(mask):
+    """Number of set bits in a (non-negative) bitmask"""
+    return bin(mask).count("1")
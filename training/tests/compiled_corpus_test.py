@@ -0,0 +1,78 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from training import compiled_corpus
+from training.compiled_corpus import CompiledCorpus
+from training.hypothesis import Hypothesis
+from training.pairs import UtteranceMeaningPair
+import training.sample.siskind_basic
+
+from learner import basic_learner
+
+
+class CompiledCorpusFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "corpus.lfc")
+        self.pairs = [training.sample.siskind_basic.pair1()] + \
+                     [UtteranceMeaningPair("word%d went" % i,
+                                           {Hypothesis(["GO", "w%d" % i]), Hypothesis(["w%d" % i])})
+                      for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def records(self, pairs):
+        return [(pair.utterance, pair.words,
+                 set(hypothesis.bound_expression for hypothesis in pair.hypotheses))
+                for pair in pairs]
+
+    def test_round_trip(self):
+        self.assertEqual(compiled_corpus.compile_corpus(self.path, self.pairs), len(self.pairs))
+        with CompiledCorpus(self.path) as pairs:
+            self.assertEqual(len(pairs), len(self.pairs))
+            self.assertEqual(self.records(pairs), self.records(self.pairs))
+            self.assertEqual(self.records([pairs[-1]]), self.records(self.pairs[-1:]))
+
+    def test_reproducible(self):
+        # the same corpus (in new, equal pairs) compiles to the same bytes, with
+        # hypotheses in pool order
+        compiled_corpus.compile_corpus(self.path, self.pairs)
+        with open(self.path, "rb") as corpus_file:
+            first = corpus_file.read()
+        pairs = [UtteranceMeaningPair(pair.utterance,
+                                      [Hypothesis(hypothesis.bound_expression)
+                                       for (index, hypothesis) in pair.indexed_hypotheses()])
+                 for pair in self.pairs]
+        compiled_corpus.compile_corpus(self.path, pairs)
+        with open(self.path, "rb") as corpus_file:
+            self.assertEqual(corpus_file.read(), first)
+
+        with CompiledCorpus(self.path) as compiled:
+            for (pair, original) in zip(compiled, self.pairs):
+                self.assertEqual([hypothesis.bound_expression for hypothesis in pair.pool],
+                                 [hypothesis.bound_expression
+                                  for (index, hypothesis) in original.indexed_hypotheses()])
+
+    def test_bad_file(self):
+        with open(self.path, "wb") as corpus_file:
+            corpus_file.write("not a compiled corpus")
+        self.assertRaises(ValueError, CompiledCorpus, self.path)
+
+    def test_process(self):
+        compiled_corpus.compile_corpus(self.path, self.pairs)
+
+        from_file = basic_learner.NPSymbolLearner()
+        with CompiledCorpus(self.path) as pairs:
+            for pair in pairs:
+                from_file.process(pair)
+
+        in_memory = basic_learner.NPSymbolLearner()
+        for pair in self.pairs:
+            in_memory.process(pair)
+
+        for word in ("john", "ball", "went", "word7"):
+            self.assertEqual(from_file.necessary[word], in_memory.necessary[word])
+            self.assertEqual(from_file.possible[word], in_memory.possible[word])
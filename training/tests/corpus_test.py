@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from training import corpus
+from training.expression import Expression
+from training.hypothesis import Hypothesis
+from training.pairs import UtteranceMeaningPair
+import training.sample.siskind_basic
+
+from learner import basic_learner
+
+
+class CorpusFiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pairs = [training.sample.siskind_basic.pair1()] + \
+                     [UtteranceMeaningPair("word%d went" % i,
+                                           {Hypothesis(["GO", "w%d" % i]), Hypothesis(["w%d" % i])})
+                      for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def records(self, pairs):
+        return [(pair.utterance, set(hypothesis.bound_expression for hypothesis in pair.hypotheses))
+                for pair in pairs]
+
+    def test_round_trip(self):
+        for name in ("corpus.txt", "corpus.txt.gz"):
+            path = os.path.join(self.directory, name)
+            self.assertEqual(corpus.write_pairs(path, self.pairs), len(self.pairs))
+            self.assertEqual(self.records(corpus.read_pairs(path)), self.records(self.pairs))
+
+    def test_comments(self):
+        path = os.path.join(self.directory, "corpus.txt")
+        with open(path, "w") as corpus_file:
+            corpus_file.write("# a comment\n\njohn\tjohn\t(WANT john)\n")
+        pairs = list(corpus.read_pairs(path))
+        self.assertEqual(self.records(pairs),
+                         [("john", {Expression("john"), Expression(["WANT", "john"])})])
+
+    def test_record_order(self):
+        # hypotheses are written in pool order, whatever the order of the frozenset
+        meanings = [Expression(["GO", "w%d" % i]) for i in range(20)]
+        pair = UtteranceMeaningPair("went", [Hypothesis(meaning) for meaning in meanings])
+        pair.active &= ~1
+        self.assertEqual(corpus.format_pair(pair),
+                         "\t".join(["went"] + ["(GO w%d)" % i for i in range(1, 20)]))
+
+    def test_shards(self):
+        path = os.path.join(self.directory, "corpus.txt")
+        corpus.write_pairs(path, self.pairs)
+
+        for shards in (1, 3, 7):
+            pairs = []
+            for (start, end) in corpus.shard_offsets(path, shards):
+                pairs.extend(corpus.read_pairs(path, start, end))
+            self.assertEqual(self.records(pairs), self.records(self.pairs))
+
+    def test_read_shard(self):
+        for name in ("corpus.txt", "corpus.txt.gz"):
+            path = os.path.join(self.directory, name)
+            corpus.write_pairs(path, self.pairs)
+
+            for shards in (1, 3, 7):
+                pairs = []
+                for shard in range(shards):
+                    pairs.extend(corpus.read_shard(path, shard, shards))
+                self.assertEqual(sorted(self.records(pairs)), sorted(self.records(self.pairs)))
+
+    def test_gzip_shards(self):
+        # gzip files (here, of two concatenated members) are split by record, not byte
+        path = os.path.join(self.directory, "corpus.txt.gz")
+        corpus.write_pairs(path, self.pairs[:20])
+        with open(path, "rb") as first:
+            head = first.read()
+        corpus.write_pairs(path, self.pairs[20:])
+        with open(path, "rb") as second:
+            tail = second.read()
+        with open(path, "wb") as corpus_file:
+            corpus_file.write(head + tail)
+
+        self.assertRaises(ValueError, corpus.shard_offsets, path, 2)
+        self.assertRaises(ValueError, list, corpus.read_pairs(path, 10, 20))
+        pairs = list(corpus.read_shard(path, 0, 2)) + list(corpus.read_shard(path, 1, 2))
+        self.assertEqual(sorted(self.records(pairs)), sorted(self.records(self.pairs)))
+
+    def test_process(self):
+        path = os.path.join(self.directory, "corpus.txt")
+        corpus.write_pairs(path, self.pairs)
+
+        from_file = basic_learner.NPSymbolLearner()
+        for pair in corpus.read_pairs(path):
+            from_file.process(pair)
+
+        in_memory = basic_learner.NPSymbolLearner()
+        for pair in self.pairs:
+            in_memory.process(pair)
+
+        for word in ("john", "ball", "went", "word7"):
+            self.assertEqual(from_file.necessary[word], in_memory.necessary[word])
+            self.assertEqual(from_file.possible[word], in_memory.possible[word])
@@ -0,0 +1,55 @@
+import unittest
+
+from training.expression import Expression
+from training.flat_expression import FlatExpression, FlatExpressionPool
+from training.hypothesis import Hypothesis
+
+MEANINGS = [["CAUSE", "john", ["GO", "ball", ["TO", "john"]]],
+            ["CAUSE", "john", ["GO", ["PARTOF", ["LEFT", "arm"], "john"], ["TO", "ball"]]],
+            ["WANT", ["john", "ball"]],
+            "mary"]
+
+
+class Encoding(unittest.TestCase):
+    def test_round_trip(self):
+        for meaning in MEANINGS:
+            flat = FlatExpression.from_expression(meaning)
+            self.assertIs(flat.to_expression(), Expression(meaning))
+
+    def test_counts_and_symbols(self):
+        for meaning in MEANINGS:
+            (expression, flat) = (Expression(meaning), FlatExpression.from_expression(meaning))
+            self.assertEqual(flat.counts(), expression.counts())
+            self.assertEqual(flat.symbols(), Hypothesis(meaning).symbols)
+            self.assertIn("john" if meaning != "mary" else "mary", flat)
+
+    def test_subexpressions(self):
+        for meaning in MEANINGS:
+            flat = FlatExpression.from_expression(meaning)
+            self.assertEqual(set(subexpression.to_expression()
+                                 for subexpression in flat.subexpressions()),
+                             Expression(meaning).deep_subexpressions())
+
+    def test_equality(self):
+        flat1 = FlatExpression.from_expression(MEANINGS[0])
+        flat2 = FlatExpression.from_expression(Expression(MEANINGS[0]))
+        self.assertEqual(flat1, flat2)
+        self.assertEqual(hash(flat1), hash(flat2))
+        self.assertNotEqual(flat1, FlatExpression.from_expression(MEANINGS[1]))
+
+
+class Pool(unittest.TestCase):
+    def test_pool(self):
+        pool = FlatExpressionPool(MEANINGS)
+        self.assertEqual(len(pool), len(MEANINGS))
+        self.assertEqual([flat.to_expression() for flat in pool],
+                         [Expression(meaning) for meaning in MEANINGS])
+        self.assertEqual(pool[-1], FlatExpression.from_expression("mary"))
+
+    def test_hypothesis(self):
+        for meaning in MEANINGS:
+            (hypothesis, flat_hypothesis) = (Hypothesis(meaning),
+                                             Hypothesis(FlatExpression.from_expression(meaning)))
+            self.assertEqual(flat_hypothesis.symbol_mask, hypothesis.symbol_mask)
+            self.assertEqual(flat_hypothesis.once_mask, hypothesis.once_mask)
+            self.assertEqual(flat_hypothesis.subexprs, hypothesis.subexprs)
@@ -1,6 +1,9 @@
 import unittest
+import copy
+import pickle
 
 from training.expression import Expression, VariableExpression, ConstantExpression
+from training.hypothesis import Hypothesis
 
 
 class RootExpression(unittest.TestCase):
@@ -108,4 +111,57 @@ class FullExpression(unittest.TestCase):
         for subexpr in subexpressions:
             print subexpr
 
-        self.assertTrue(False)
\ No newline at end of file
+        self.assertTrue(False)
+
+
+class InternedExpression(unittest.TestCase):
+    def test_same_object(self):
+        expr1 = Expression(["GO", "mary", ["TO", "party"]])
+        expr2 = Expression(["GO", "mary", ["TO", "party"]])
+        self.assertIs(expr1, expr2)
+        self.assertIsNot(expr1, Expression(["GO", "mary", ["TO", "john"]]))
+        self.assertEqual(len({expr1, expr2}), 1)
+
+    def test_expression_elements(self):
+        inner = Expression(["TO", "party"])
+        self.assertIs(Expression(["GO", "mary", inner]),
+                      Expression(["GO", "mary", ["TO", "party"]]))
+
+    def test_copies(self):
+        expr = Expression(["WANT", ["john", "ball"]])
+        self.assertIs(copy.deepcopy(expr), expr)
+        self.assertIs(pickle.loads(pickle.dumps(expr, pickle.HIGHEST_PROTOCOL)), expr)
+
+    def test_deduplicated_subexpressions(self):
+        expr = Expression(["CAUSE", "john", ["GO", "john"], ["GO", "john"]])
+        subexpressions = expr.deep_subexpressions()
+        self.assertEqual(len([subexpr for subexpr in subexpressions
+                              if subexpr is Expression(["GO", "john"])]), 1)
+
+class LazySubexpressions(unittest.TestCase):
+    def setUp(self):
+        self.expr = Expression(["CAUSE", "john", ["GO", ["PARTOF", ["LEFT", "arm"], "john"],
+                                                  ["TO", "ball"]]])
+
+    def test_same_as_recursive(self):
+        def recursive(expression):
+            subexpressions = {expression} | expression.general_form()
+            for subexpression in expression.subexpressions:
+                if isinstance(subexpression, Expression):
+                    subexpressions |= recursive(subexpression)
+            return subexpressions
+
+        self.assertEqual(self.expr.deep_subexpressions(), recursive(self.expr))
+
+    def test_depth_bound(self):
+        shallow = set(self.expr.iter_subexpressions(max_depth=1))
+        self.assertIn(Expression(["GO", ["PARTOF", ["LEFT", "arm"], "john"], ["TO", "ball"]]),
+                      shallow)
+        self.assertNotIn(Expression(["TO", "ball"]), shallow)
+
+    def test_hypothesis_bounds(self):
+        hypothesis = Hypothesis(self.expr, max_subexpressions=3)
+        self.assertIsNone(hypothesis._subexprs)
+        self.assertEqual(len(hypothesis.subexprs), 3)
+        self.assertIn(self.expr, hypothesis.subexprs)
+        self.assertIs(hypothesis.subexprs, hypothesis.subexprs)
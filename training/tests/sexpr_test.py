@@ -0,0 +1,64 @@
+import unittest
+import os
+import tempfile
+
+from training.expression import Expression
+from training.hypothesis import Hypothesis, HypothesisPool
+from training import sexpr
+
+
+class Parsing(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(sexpr.tokenize("(CAUSE john\t(GO ball))"),
+                         ["(", "CAUSE", "john", "(", "GO", "ball", ")", ")"])
+
+    def test_same_as_lists(self):
+        self.assertIs(sexpr.parse("(CAUSE john (GO ball (TO john)))"),
+                      Expression(["CAUSE", "john", ["GO", "ball", ["TO", "john"]]]))
+        self.assertIs(sexpr.parse("  john "), Expression("john"))
+        self.assertIs(sexpr.parse("(WANT (john ball))"), Expression(["WANT", ["john", "ball"]]))
+
+    def test_chunks(self):
+        expressions = list(sexpr.parse_all(["(WANT john", " ball) (GO", " mary) mary"]))
+        self.assertEqual(expressions, [Expression(["WANT", "john", "ball"]),
+                                       Expression(["GO", "mary"]),
+                                       Expression("mary")])
+
+    def test_unbalanced(self):
+        self.assertRaises(ValueError, sexpr.parse, "(GO (TO mary)")
+        self.assertRaises(ValueError, sexpr.parse, "(GO mary))")
+        self.assertRaises(ValueError, sexpr.parse, "(GO mary) (GO john)")
+
+
+class Pool(unittest.TestCase):
+    def test_shared_hypotheses(self):
+        pool = HypothesisPool()
+        hypothesis = pool.parse("(WANT john ball)")
+        self.assertIs(pool.add(["WANT", "john", "ball"]), hypothesis)
+        self.assertIs(pool.parse("(WANT  john ball )"), hypothesis)
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(hypothesis.symbols, {"WANT", "john", "ball"})
+
+    def test_parse_file(self):
+        (handle, path) = tempfile.mkstemp()
+        with os.fdopen(handle, "w") as hypothesis_file:
+            hypothesis_file.write("(CAUSE john (GO ball (TO john)))\n"
+                                  "(WANT john ball)\n"
+                                  "(CAUSE john\n    (GO ball (TO john)))\n")
+        try:
+            pool = HypothesisPool()
+            hypotheses = pool.parse_file(path)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(len(hypotheses), 3)
+        self.assertEqual(len(pool), 2)
+        self.assertIs(hypotheses[0], hypotheses[2])
+        self.assertEqual(pool.index(hypotheses[1]), 1)
+        self.assertIsInstance(hypotheses[1], Hypothesis)
+
+
+class Formatting(unittest.TestCase):
+    def test_round_trip(self):
+        for text in ("(CAUSE john (GO ball (TO john)))", "john", "(WANT (john ball))", "(A)"):
+            self.assertEqual(sexpr.to_sexpr(sexpr.parse(text)), text)
@@ -0,0 +1,48 @@
+import unittest
+
+from training.sample.synthetic import SyntheticCorpus
+from learner.basic_learner import NPSymbolLearner
+
+
+class Synthetic(unittest.TestCase):
+    def records(self, corpus, count):
+        return [(pair.utterance, set(hypothesis.bound_expression for hypothesis in pair.hypotheses))
+                for pair in corpus.pairs(count)]
+
+    def test_seeded(self):
+        self.assertEqual(self.records(SyntheticCorpus(seed=3), 20),
+                         self.records(SyntheticCorpus(seed=3), 20))
+        self.assertNotEqual(self.records(SyntheticCorpus(seed=3), 20),
+                            self.records(SyntheticCorpus(seed=4), 20))
+
+    def test_shape(self):
+        corpus = SyntheticCorpus(vocabulary_size=50, utterance_length=4, hypotheses=5, seed=1)
+        for pair in corpus.pairs(100):
+            words = pair.utterance.split(" ")
+            self.assertEqual(len(words), 4)
+            self.assertTrue(1 <= len(pair.hypotheses) <= 5)
+
+            # without noise, some hypothesis means exactly the words' symbols
+            symbols = set()
+            for word in words:
+                symbols.update(corpus.symbols(word))
+            self.assertTrue(any(hypothesis.symbols == symbols for hypothesis in pair.hypotheses))
+
+    def test_homonymy(self):
+        corpus = SyntheticCorpus(vocabulary_size=200, homonymy_rate=0.5, seed=2)
+        homonyms = [word for word in corpus.lexicon if len(corpus.symbols(word)) == 2]
+        self.assertTrue(50 < len(homonyms) < 150)
+
+        # every symbol belongs to a single word
+        symbols = [symbol for word in corpus.lexicon for symbol in corpus.symbols(word)]
+        self.assertEqual(len(symbols), len(set(symbols)))
+
+    def test_learnable(self):
+        corpus = SyntheticCorpus(vocabulary_size=20, utterance_length=3, seed=5)
+        learner = NPSymbolLearner()
+        for pair in corpus.pairs(500):
+            learner.process(pair)
+
+        for word in corpus.lexicon:
+            self.assertTrue(learner.converged(word))
+            self.assertEqual(set(learner.necessary[word]), corpus.symbols(word))
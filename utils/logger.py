@@ -1,6 +1,22 @@
 import logging
 import sys
-import inspect
+
+
+# subchannel => (root, debug, data) logging channels; channels are shared by
+# every Logger on the same subchannel, and only looked up once
+_channels = dict()
+
+
+def channels_for(subchannel):
+    """Return the (root, debug, data) logging channels for a subchannel name"""
+    try:
+        return _channels[subchannel]
+    except KeyError:
+        channels = (logging.getLogger("langframe.root.%s" % subchannel),
+                    logging.getLogger("langframe.debug.%s" % subchannel),
+                    logging.getLogger("langframe.data.%s" % subchannel))
+        _channels[subchannel] = channels
+        return channels
 
 
 class Logger():
@@ -9,20 +25,34 @@ class Logger():
     its own though.
     """
     def __init__(self, subchannel):
-        # find which function in which file created this logger
-        caller_funcname = inspect.stack()[2][3]
-        caller_filename = inspect.stack()[2][1]
+        # remember which function created this logger (that is, whatever called
+        # the constructor of the subclass); names are only looked up if needed
+        try:
+            self._caller = sys._getframe(2).f_code
+        except ValueError:
+            self._caller = None
 
-        self.root_logger = logging.getLogger("langframe.root.%s" % subchannel)
-        self.debug_logger = logging.getLogger("langframe.debug.%s" % subchannel)
-        self.data_logger = logging.getLogger("langframe.data.%s" % subchannel)
+        (self.root_logger, self.debug_logger, self.data_logger) = channels_for(subchannel)
 
         #self.root_logger.info("%s Initialised from %s in %s" %
-                              #(subchannel, caller_funcname, caller_filename))
+                              #(subchannel, self.caller_funcname, self.caller_filename))
+
+    @property
+    def caller_funcname(self):
+        """name of the function that created this logger"""
+        return self._caller.co_name if self._caller is not None else None
+
+    @property
+    def caller_filename(self):
+        """file containing the function that created this logger"""
+        return self._caller.co_filename if self._caller is not None else None
 
-    def info(self, message):
-        """Method to log low-priority message (for any logger)"""
-        self.root_logger.info(message)
+    def info(self, message, *args):
+        """
+        Method to log low-priority message (for any logger); as with logging,
+        args are only %-formatted into the message if it's output.
+        """
+        self.root_logger.info(message, *args)
 
 
 def display_log(*channels):